@@ -0,0 +1,105 @@
+# Importing all needed libraries.
+from werkzeug.test import EnvironBuilder
+from flask import Request
+import argparse
+import hashlib
+import timeit
+import hmac
+import json
+import sys
+
+# Importing the internal libraries.
+from cerber import SecurityManager
+
+
+def legacy_check_request(key : bytes, request : "Request") -> bool:
+    '''
+        This function reproduces the previous HMAC authentication: the body is parsed,
+        serialized again and its HMAC is compared with ==.
+            :param key: bytes
+                The secret key of the service.
+            :param request: Request
+                The request to authenticate.
+            :return: bool
+                True if the request is authenticated.
+    '''
+    headers = dict(request.headers)
+    request_body_binary = json.dumps(json.loads(request.get_data())).encode()
+    return headers["Token"] == hmac.new(key, request_body_binary, hashlib.sha256).hexdigest()
+
+
+def build_request(security_manager : SecurityManager, body_size : int) -> "Request":
+    '''
+        This function creates a signed /intent request with a body of approximately the given size.
+            :param security_manager: SecurityManager
+                The Security Manager used to sign the request.
+            :param body_size: int
+                The number of bytes of the body.
+            :return: Request
+                The signed request.
+    '''
+    body = json.dumps({"text" : "how many calories did I burn today " * (body_size // 35 + 1), "correlation_id" : "benchmark"})
+    builder = EnvironBuilder(
+        path="/intent", method="GET", data=body, content_type="application/json",
+        headers={"Token" : security_manager.encode_hmac_bytes(body.encode())}
+    )
+    return Request(builder.get_environ())
+
+
+def check_empty_body(security_manager : SecurityManager) -> None:
+    '''
+        This function checks that a request without a body is accepted with its current signature and
+        with the legacy one over json.dumps(None), like the admin calls are signed, and rejected otherwise.
+            :param security_manager: SecurityManager
+                The Security Manager used to sign the requests.
+    '''
+    for token, accepted in [(security_manager.encode_hmac_bytes(b""), True),
+                            (security_manager.encode_hmac_bytes(json.dumps(None).encode()), True),
+                            (security_manager.encode_hmac_bytes(b"{}"), False)]:
+        builder = EnvironBuilder(path="/increase", method="POST", headers={"Token" : token})
+        assert (security_manager.check_request(Request(builder.get_environ())) == "OK") == accepted
+
+
+def run(body_sizes : list, repeats : int, secret_key : str) -> dict:
+    '''
+        This function measures the authentication overhead of the previous and the current
+        implementation for every body size.
+            :param body_sizes: list
+                The body sizes in bytes.
+            :param repeats: int
+                The number of authentications measured for every body size.
+            :param secret_key: str
+                The secret key used to sign the requests.
+            :return: dict
+                The mean authentication time in microseconds for every body size.
+    '''
+    security_manager = SecurityManager(secret_key)
+    check_empty_body(security_manager)
+    results = []
+    for body_size in body_sizes:
+        request = build_request(security_manager, body_size)
+
+        # Checking that both implementations accept the request before measuring them.
+        assert security_manager.check_request(request) == "OK"
+        assert legacy_check_request(security_manager.key, request)
+
+        legacy_time = timeit.timeit(lambda: legacy_check_request(security_manager.key, request), number=repeats)
+        current_time = timeit.timeit(lambda: security_manager.check_request(request), number=repeats)
+        results.append({
+            "body_size" : len(request.get_data()),
+            "legacy_us" : legacy_time / repeats * 1e6,
+            "current_us" : current_time / repeats * 1e6,
+            "speedup" : legacy_time / current_time
+        })
+    return {"benchmark" : "auth", "repeats" : repeats, "results" : results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the HMAC authentication overhead vs the body size.")
+    parser.add_argument("--body-sizes", type=int, nargs="+", default=[128, 1024, 16384, 131072, 1048576])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--secret-key", default="benchmark-key")
+    args = parser.parse_args()
+
+    json.dump(run(args.body_sizes, args.repeats, args.secret_key), sys.stdout, indent=4)
+    print()
@@ -0,0 +1,124 @@
+# Importing all needed libraries.
+import itertools
+import tracemalloc
+import argparse
+import tempfile
+import torch
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment, SAMPLE_UTTERANCES
+from benchmarks import standins
+from executor.executor import TaskExecutorManager
+from config import ConfigManager
+
+
+def count_torch_allocations(function : "function") -> tuple:
+    '''
+        This function counts the CPU tensor allocations made by a call with the PyTorch profiler.
+            :param function: function
+                The measured function.
+            :return: tuple
+                The number of allocations and the allocated bytes.
+    '''
+    with torch.autograd.profiler.profile(profile_memory=True) as profile:
+        function()
+    allocations = [event.self_cpu_memory_usage for event in profile.function_events if event.self_cpu_memory_usage > 0]
+    return len(allocations), sum(allocations)
+
+
+def measure(task_executor : TaskExecutorManager, batch_tokens : list, use_buffer : bool, repeats : int) -> dict:
+    '''
+        This function measures the assembly of the model inputs of one batch and the forward pass
+        at steady state, with or without the preallocated buffer.
+            :param task_executor: TaskExecutorManager
+                The executor providing the embedder and the model.
+            :param batch_tokens: list
+                The tokens of the batch.
+            :param use_buffer: bool
+                If True the inputs are written into a preallocated buffer.
+            :param repeats: int
+                The number of measured batches.
+            :return: dict
+                The latency summary and the allocations per batch.
+    '''
+    buffer = task_executor.create_buffer() if use_buffer else None
+    model = task_executor.model_version.model
+
+    def run_batch():
+        with torch.no_grad():
+            model(task_executor.create_inputs(batch_tokens, buffer=buffer))
+
+    # Reaching the steady state, the buffer grows to the batch size here.
+    for _ in range(3):
+        run_batch()
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_batch()
+        latencies.append(time.perf_counter() - start)
+
+    # Counting the Python and NumPy allocations, traced by tracemalloc.
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    run_batch()
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    statistics = snapshot_after.compare_to(snapshot_before, "filename")
+
+    # Counting the tensor allocations, not visible to tracemalloc.
+    input_allocations, input_bytes = count_torch_allocations(lambda: task_executor.create_inputs(batch_tokens, buffer=buffer))
+    batch_allocations, batch_bytes = count_torch_allocations(run_batch)
+
+    summary = summarize(latencies)
+    summary.update({
+        "tracemalloc_new_blocks" : sum(max(statistic.count_diff, 0) for statistic in statistics),
+        "input_tensor_allocations" : input_allocations,
+        "input_tensor_bytes" : input_bytes,
+        "batch_tensor_allocations" : batch_allocations,
+        "batch_tensor_bytes" : batch_bytes,
+        "buffer_allocations" : buffer.allocation_number if buffer is not None else None
+    })
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Allocations and latency of the batch assembly with and without the input buffers.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--fused", action="store_true", help="Measure the model fused with the embedding table.")
+    parser.add_argument("--repeats", type=int, default=100)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    # Creating an executor without workers over the stand-ins.
+    directory = tempfile.mkdtemp(prefix="intent-buffers-")
+    config = ConfigManager(args.config)
+    config.neural_network.model_path = os.path.join(directory, "model.pth")
+    config.neural_network.task_number_limit = 0
+    config.neural_network.fused_embedding = args.fused
+    standins.create_model(config.neural_network.model_path, args.vector_dimension, args.seed)
+    task_executor = TaskExecutorManager(config.neural_network, standins.create_embedder(args.vector_dimension),
+                                        config.priority_classes_dict)
+
+    scenarios = dict()
+    for batch_size in args.batch_sizes:
+        batch_tokens = task_executor.word_embedder.tokenize_batch(list(itertools.islice(itertools.cycle(SAMPLE_UTTERANCES), batch_size)))
+        scenarios[str(batch_size)] = {
+            "allocating" : measure(task_executor, batch_tokens, False, args.repeats),
+            "buffer" : measure(task_executor, batch_tokens, True, args.repeats)
+        }
+
+    results = {"benchmark" : "input_buffers", "environment" : environment(), "parameters" : vars(args), "scenarios" : scenarios}
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
@@ -0,0 +1,94 @@
+# Importing all needed libraries.
+import subprocess
+import threading
+import argparse
+import tempfile
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment, SAMPLE_UTTERANCES
+
+
+def measure_process(args : "argparse.Namespace") -> dict:
+    '''
+        This function measures the first requests of a fresh Task Executor Manager.
+        It runs in a new process, so nothing is warm from the previous measurements.
+            :param args: argparse.Namespace
+                The command line arguments.
+            :return: dict
+                The warm-up duration, the latency of the first request and of the following ones.
+    '''
+    from benchmarks import standins
+    from executor.executor import TaskExecutorManager
+    from executor.task import Task
+    from config import ConfigManager
+
+    directory = tempfile.mkdtemp(prefix="intent-cold-start-")
+    config = ConfigManager(args.config)
+    config.neural_network.model_path = os.path.join(directory, "model.pth")
+    config.neural_network.coalesce_requests = False
+    standins.create_model(config.neural_network.model_path, args.vector_dimension, args.seed)
+    embedder = standins.create_embedder(args.vector_dimension)
+
+    task_executor = TaskExecutorManager(config.neural_network, embedder, config.priority_classes_dict)
+    warm_up = task_executor.warm_up(config.warm_up, args.max_batch_size) if args.warm_up else None
+
+    latencies = []
+    for index in range(args.requests):
+        task = Task(SAMPLE_UTTERANCES[index % len(SAMPLE_UTTERANCES)], threading.Condition())
+        task.set_timer_lock_time()
+        task_executor.try_add_to_queue(task)
+        task.wait()
+        latencies.append(time.perf_counter() - task.arrival_time)
+
+    task_executor.set_worker_number(0)
+    return {
+        "warm_up_s" : warm_up["duration"] if warm_up else None,
+        "first_request_ms" : latencies[0] * 1000,
+        "following_requests" : summarize(latencies[1:])
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start latency of the first requests with and without the warm-up.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--runs", type=int, default=3, help="The number of fresh processes for every variant.")
+    parser.add_argument("--requests", type=int, default=20, help="The number of requests sent to every process.")
+    parser.add_argument("--max-batch-size", type=int, default=1)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    parser.add_argument("--measure", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Measuring one variant inside a fresh process.
+    if args.measure is not None:
+        args.warm_up = args.measure == "warm"
+        print(json.dumps(measure_process(args)))
+        sys.exit(0)
+
+    variants = dict()
+    for variant in ["cold", "warm"]:
+        runs = []
+        for _ in range(args.runs):
+            command = [sys.executable, "-m", "benchmarks.cold_start", "--measure", variant, "--config", args.config,
+                       "--requests", str(args.requests), "--max-batch-size", str(args.max_batch_size),
+                       "--vector-dimension", str(args.vector_dimension), "--seed", str(args.seed)]
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        variants[variant] = {
+            "first_request" : summarize([run["first_request_ms"] / 1000 for run in runs]),
+            "following_requests_p50_ms" : [run["following_requests"]["p50_ms"] for run in runs],
+            "warm_up_s" : [run["warm_up_s"] for run in runs]
+        }
+
+    results = {"benchmark" : "cold_start", "environment" : environment(), "parameters" : vars(args), "scenarios" : variants}
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
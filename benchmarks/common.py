@@ -0,0 +1,91 @@
+# Importing all needed libraries.
+import subprocess
+import platform
+import datetime
+import math
+
+# Defining a sample of the chatbot utterances used as the benchmark corpus.
+SAMPLE_UTTERANCES = [
+    "hi", "hello there", "good morning", "hey, how are you?",
+    "what exercise should I do today?", "give me a workout for my legs",
+    "how do I do a proper push-up?", "show me how to do squats",
+    "how many calories did I burn today?", "how many kcals did I burn this week",
+    "how many calories did I eat today?", "what did I gain from lunch",
+    "show me my stats", "what are my statistics for this month?",
+    "how close am I to my goal?", "what's my goal progress",
+    "update my weight to 72 kg", "change my height to 180 cm",
+    "which exercises did I do yesterday?", "list the exercises I finished",
+    "what should I eat for dinner?", "suggest me some healthy meals",
+    "yes", "yeah sure", "no", "nope, not now",
+    "thank you!", "thanks a lot", "bye", "see you tomorrow",
+    "I'm so tired today", "I feel great", "I am really happy with my progress",
+    "this is so annoying, I'm angry", "what's the weather like on mars?"
+]
+
+
+def percentile(values : list, percent : float) -> float:
+    '''
+        This function computes a percentile with the nearest rank method.
+            :param values: list
+                The sorted values.
+            :param percent: float
+                The percentile to compute.
+            :return: float
+                The percentile or None if there are no values.
+    '''
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(latencies : list, duration : float = None) -> dict:
+    '''
+        This function summarizes the latencies of a scenario.
+            :param latencies: list
+                The latencies in seconds.
+            :param duration: float, default = None
+                The wall time of the scenario in seconds, used for the throughput.
+            :return: dict
+                The count, throughput, mean and percentiles in milliseconds.
+    '''
+    latencies = sorted(latencies)
+    summary = {
+        "count" : len(latencies),
+        "mean_ms" : sum(latencies) / len(latencies) * 1000 if latencies else None,
+        "p50_ms" : None if not latencies else percentile(latencies, 50) * 1000,
+        "p95_ms" : None if not latencies else percentile(latencies, 95) * 1000,
+        "p99_ms" : None if not latencies else percentile(latencies, 99) * 1000,
+        "max_ms" : None if not latencies else latencies[-1] * 1000
+    }
+    if duration is not None:
+        summary["throughput_per_s"] = len(latencies) / duration if duration > 0 else None
+    return summary
+
+
+def environment() -> dict:
+    '''
+        This function describes the environment of the benchmark run, so the results of
+        different commits can be compared.
+    '''
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    # The load generator runs on client machines, where torch might not be installed.
+    try:
+        import torch
+        torch_version, torch_threads = torch.__version__, torch.get_num_threads()
+    except ImportError:
+        torch_version, torch_threads = None, None
+
+    return {
+        "commit" : commit,
+        "timestamp" : datetime.datetime.utcnow().isoformat() + "Z",
+        "python" : platform.python_version(),
+        "torch" : torch_version,
+        "torch_threads" : torch_threads,
+        "machine" : platform.machine(),
+        "processor" : platform.processor()
+    }
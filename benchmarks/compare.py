@@ -0,0 +1,66 @@
+# Importing all needed libraries.
+import argparse
+import json
+
+
+def flatten(results : dict, prefix : str = "") -> dict:
+    '''
+        This function flattens the nested results into {path : value} for the numeric values.
+            :param results: dict
+                The nested results.
+            :param prefix: str, default = ''
+                The path of the results.
+            :return: dict
+                The flattened numeric values.
+    '''
+    values = dict()
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare(baseline : dict, candidate : dict, threshold : float) -> list:
+    '''
+        This function compares the latency and throughput values of two benchmark runs.
+            :param baseline: dict
+                The results of the baseline commit.
+            :param candidate: dict
+                The results of the candidate commit.
+            :param threshold: float
+                The relative change in percents from which a change is reported as a regression.
+            :return: list
+                The rows of the comparison.
+    '''
+    baseline_values = flatten(baseline.get("scenarios", {}))
+    candidate_values = flatten(candidate.get("scenarios", {}))
+    rows = []
+    for path in sorted(baseline_values.keys() & candidate_values.keys()):
+        if not (path.endswith("_ms") or path.endswith("_per_s")):
+            continue
+        old, new = baseline_values[path], candidate_values[path]
+        change = (new - old) / old * 100 if old else 0.0
+
+        # Higher latency or lower throughput is a regression.
+        worse = change if path.endswith("_ms") else -change
+        rows.append({"metric" : path, "baseline" : old, "candidate" : new, "change_percent" : change,
+                     "regression" : worse > threshold})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparison of two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        rows = compare(json.load(baseline_file), json.load(candidate_file), args.threshold)
+
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['metric']:<50} {row['baseline']:>12.3f} {row['candidate']:>12.3f} {row['change_percent']:>+8.1f}% {flag}")
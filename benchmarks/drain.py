@@ -0,0 +1,192 @@
+# Importing all needed libraries.
+from urllib3.exceptions import NewConnectionError
+import subprocess
+import threading
+import argparse
+import tempfile
+import requests
+import sqlite3
+import socket
+import signal
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import environment, SAMPLE_UTTERANCES
+from benchmarks import standins
+from cerber import SecurityManager
+from config import ConfigManager
+
+
+def serve(args : "argparse.Namespace") -> None:
+    '''
+        This function runs the service with the local stand-ins until it receives SIGTERM.
+        It runs in a separate process, so the signal drains it like in a rolling deploy.
+            :param args: argparse.Namespace
+                The command line arguments.
+    '''
+    service = standins.load_service(args.serve, standins.create_embedder(args.vector_dimension))
+    service.serve()
+
+
+def find_free_port() -> int:
+    '''
+        This function returns a free local TCP port.
+    '''
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+def is_refused(exception : requests.ConnectionError) -> bool:
+    '''
+        This function checks if a connection error happened before the request was sent,
+        so the request was never accepted by the service.
+            :param exception: requests.ConnectionError
+                The error raised by requests.
+    '''
+    reason = getattr(exception.args[0], "reason", None) if exception.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def send_traffic(url : str, security_manager : SecurityManager, stop_event : threading.Event, outcomes : list) -> None:
+    '''
+        This function sends /intent requests until the service drains or the event is set.
+            :param url: str
+                The url of the /intent endpoint.
+            :param security_manager: SecurityManager
+                The Security Manager signing the requests.
+            :param stop_event: threading.Event
+                The event stopping the traffic.
+            :param outcomes: list
+                The list collecting the outcome of every request.
+    '''
+    session = requests.Session()
+    index = 0
+    while not stop_event.is_set():
+        body = json.dumps({"text" : SAMPLE_UTTERANCES[index % len(SAMPLE_UTTERANCES)], "correlation_id" : str(index)}).encode()
+        index += 1
+        sent_at = time.time()
+        try:
+            response = session.get(url, data=body, timeout=60,
+                                   headers={"Token" : security_manager.encode_hmac_bytes(body), "Content-Type" : "application/json"})
+            outcome = {"status" : response.status_code, "retry_after" : response.headers.get("Retry-After")}
+        except requests.ConnectionError as exception:
+            outcome = {"status" : "refused" if is_refused(exception) else "dropped", "error" : exception.__class__.__name__}
+        except requests.RequestException as exception:
+            outcome = {"status" : "dropped", "error" : exception.__class__.__name__}
+        outcome["sent_at"] = sent_at
+        outcome["finished_at"] = time.time()
+        outcomes.append(outcome)
+
+        # Stopping like a router once the service drains or doesn't accept connections anymore,
+        # the client would retry on another replica.
+        if outcome["status"] in (503, "refused"):
+            break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that draining the service on SIGTERM answers every accepted request.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--signal-after", type=float, default=3.0, help="The number of seconds of traffic before SIGTERM.")
+    parser.add_argument("--drain-timeout", type=float, default=20.0)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Running the service inside the child process.
+    if args.serve is not None:
+        serve(args)
+        sys.exit(0)
+
+    directory = tempfile.mkdtemp(prefix="intent-drain-")
+    model_path = os.path.join(directory, "model.pth")
+    standins.create_model(model_path, args.vector_dimension, args.seed)
+    sidecar = standins.FakeSidecar(ConfigManager(args.config).service_sidecar.secret_key)
+    sidecar.start()
+    port = find_free_port()
+    config_path = standins.write_config(directory, model_path, sidecar.port, {
+        "general" : {"port" : port},
+        "neural-network" : {"coalesce_requests" : "false"},
+        "shutdown" : {"drain_timeout" : args.drain_timeout},
+        "heartbeat" : {"interval" : 0.5}
+    }, base_config=args.config)
+    config = ConfigManager(config_path)
+
+    # Starting the service and waiting until it registers with the sidecar.
+    log_path = os.path.join(directory, "service.log")
+    with open(log_path, "w") as log_file:
+        process = subprocess.Popen([sys.executable, "-m", "benchmarks.drain", "--serve", config_path,
+                                    "--vector-dimension", str(args.vector_dimension)], stdout=log_file, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}/intent"
+    deadline = time.time() + 120
+    while time.time() < deadline and process.poll() is None:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.2)
+
+    # Sending the traffic and draining the service in the middle of it.
+    outcomes = []
+    stop_event = threading.Event()
+    security_manager = SecurityManager(config.security.secret_key)
+    threads = [threading.Thread(target=send_traffic, args=(url, security_manager, stop_event, outcomes))
+               for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.signal_after)
+    signal_time = time.time()
+    process.send_signal(signal.SIGTERM)
+    exit_code = process.wait(args.drain_timeout + 30)
+    shutdown_time = time.time() - signal_time
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    sidecar.stop()
+
+    # Comparing the answered requests with the records written to the database.
+    with sqlite3.connect(os.path.join(directory, "intents.db")) as connection:
+        record_number = connection.execute("SELECT COUNT(*) FROM intents").fetchone()[0]
+    with open(log_path) as log_file:
+        drain_log = [line.strip() for line in log_file if line.startswith("drain:")]
+
+    statuses = dict()
+    for outcome in outcomes:
+        statuses[str(outcome["status"])] = statuses.get(str(outcome["status"]), 0) + 1
+    answered_during_drain = sum(1 for outcome in outcomes if outcome["status"] == 200 and outcome["finished_at"] > signal_time)
+    checks = {
+        "exited_cleanly" : exit_code == 0,
+        "no_request_dropped" : statuses.get("dropped", 0) == 0,
+        "rejections_have_retry_after" : all(outcome["retry_after"] for outcome in outcomes if outcome["status"] in (429, 503)),
+        "every_answer_written" : record_number == statuses.get("200", 0),
+        "deregistered" : any(request["path"] == sidecar.deregister_path for request in sidecar.requests)
+    }
+
+    results = {
+        "benchmark" : "graceful_drain",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "checks" : checks,
+        "statistics" : {
+            "statuses" : statuses,
+            "database_records" : record_number,
+            "shutdown_time_s" : shutdown_time,
+            "answered_during_drain" : answered_during_drain,
+            "drain_log" : drain_log
+        }
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if an accepted request was lost.
+    sys.exit(0 if all(checks.values()) else 1)
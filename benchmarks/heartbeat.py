@@ -0,0 +1,135 @@
+# Importing all needed libraries.
+import argparse
+import time
+import json
+import sys
+
+# Importing the internal libraries.
+from benchmarks.common import environment
+from benchmarks import standins
+from sidecar import SidecarClient
+from config import ConfigManager
+
+
+def wait_for(condition : "function", timeout : float) -> bool:
+    '''
+        This function waits until a condition is true.
+            :param condition: function
+                The checked condition.
+            :param timeout: float
+                The maximal number of seconds to wait.
+            :return: bool
+                True if the condition became true in time.
+    '''
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def heartbeat_requests(sidecar : standins.FakeSidecar, path : str, since : float = 0.0) -> list:
+    '''
+        This function returns the requests received by the sidecar on a path after a moment.
+    '''
+    return [request for request in list(sidecar.requests) if request["path"] == path and request["time"] >= since]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check of the sidecar registration and the load reporting heartbeats against a local fake sidecar.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--interval", type=float, default=0.1, help="The heartbeat interval, shortened to keep the check fast.")
+    parser.add_argument("--downtime", type=float, default=2.0, help="The number of seconds the sidecar is down during the restart.")
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    config = ConfigManager(args.config)
+    config.service_sidecar.host = "127.0.0.1"
+    config.heartbeat.interval = args.interval
+    config.heartbeat.timeout = 1.0
+    config.heartbeat.initial_backoff = args.interval
+
+    sidecar = standins.FakeSidecar(config.service_sidecar.secret_key, config.service_sidecar.register_endpoint,
+                                   config.service_sidecar.heartbeat_endpoint)
+    sidecar.start()
+    config.service_sidecar.port = sidecar.port
+    register_path = sidecar.register_path
+    heartbeat_path = sidecar.heartbeat_path
+
+    # Reporting a fake load that changes with every heartbeat, the load report can be made to raise once.
+    load_reports = []
+    load_failures = []
+
+    def generate_load_report() -> dict:
+        if load_failures and not load_failures[-1]:
+            load_failures[-1] = True
+            raise RuntimeError("The load report failed")
+        load_reports.append(time.time())
+        return {"queue_length" : len(load_reports) % 5, "workers" : 1, "p95_latency" : 0.01, "cache_hit_rate" : 0.5}
+
+    client = SidecarClient(config.service_sidecar, config.heartbeat, config.generate_info_for_service_discovery(),
+                           generate_load_report)
+    checks = dict()
+
+    # Checking the registration and the regular heartbeats.
+    checks["registered"] = client.register_until_success()
+    client.start()
+    checks["heartbeats_sent"] = wait_for(lambda: len(heartbeat_requests(sidecar, heartbeat_path)) >= 5, 5.0)
+    heartbeats = heartbeat_requests(sidecar, heartbeat_path)
+    checks["heartbeats_authenticated"] = all(request["authenticated"] for request in sidecar.requests)
+    checks["heartbeats_carry_load"] = all("queue_length" in request["body"]["load"] for request in heartbeats)
+    intervals = [second["time"] - first["time"] for first, second in zip(heartbeats, heartbeats[1:])]
+
+    # Failing one load report, the heartbeat thread must survive it and keep reporting.
+    failures_before = client.failed_heartbeat_number
+    load_failure_time = time.time()
+    load_failures.append(False)
+    checks["load_report_failure_counted"] = wait_for(lambda: client.failed_heartbeat_number > failures_before, 5.0)
+    checks["heartbeats_resumed_after_load_failure"] = wait_for(
+        lambda: len(heartbeat_requests(sidecar, heartbeat_path, load_failure_time)) >= 2 and client.thread.is_alive(), 5.0
+    )
+
+    # Restarting the sidecar immediately, it forgets the registration and answers 404.
+    restart_time = time.time()
+    sidecar.restart()
+    checks["registered_again_after_restart"] = wait_for(
+        lambda: len(heartbeat_requests(sidecar, register_path, restart_time)) >= 1 and client.registered, 5.0
+    )
+
+    # Making the sidecar unreachable, the heartbeats back off and the service registers again once it is back.
+    failures_before = client.failed_heartbeat_number + client.failed_registration_number
+    outage_time = time.time()
+    sidecar.restart(args.downtime)
+    recovered = wait_for(lambda: len(heartbeat_requests(sidecar, register_path, outage_time)) >= 1 and client.registered,
+                         args.downtime + config.heartbeat.max_backoff)
+    recovery_time = time.time() - outage_time
+    checks["registered_again_after_outage"] = recovered
+    checks["heartbeats_resumed"] = wait_for(lambda: len(heartbeat_requests(sidecar, heartbeat_path, outage_time)) >= 2, 5.0)
+
+    client.stop(timeout=5.0)
+    sidecar.stop()
+    checks["stopped"] = not client.thread.is_alive()
+
+    results = {
+        "benchmark" : "sidecar_heartbeat",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "checks" : checks,
+        "statistics" : {
+            "heartbeat_interval_mean_s" : sum(intervals) / len(intervals) if intervals else None,
+            "failed_attempts_during_outage" : client.failed_heartbeat_number + client.failed_registration_number - failures_before,
+            "recovery_time_s" : recovery_time,
+            "load_reports" : len(load_reports),
+            "client" : client.statistics()
+        }
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if any check didn't pass.
+    sys.exit(0 if all(checks.values()) else 1)
@@ -0,0 +1,248 @@
+# Importing all needed libraries.
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import argparse
+import requests
+import random
+import time
+import json
+import sys
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment, SAMPLE_UTTERANCES
+from cerber import SecurityManager
+from config import ConfigManager
+
+# Defining the server-reported latencies aggregated from the responses.
+SERVER_LATENCIES = ["lock_time", "queue_waiting_time", "actual_processing", "task_service_time", "database_response_time"]
+
+
+class LoadGenerator:
+    def __init__(self,
+                 url : str,
+                 secret_key : str,
+                 corpus : list,
+                 priority : str = None,
+                 deadline : float = None,
+                 timeout : float = 30.0,
+                 seed : int = 0) -> None:
+        '''
+            This class sends signed /intent requests and collects the client and server latencies.
+                :param url: str
+                    The url of the /intent endpoint.
+                :param secret_key: str
+                    The secret key of the service used to sign the requests.
+                :param corpus: list
+                    The texts sent in the requests.
+                :param priority: str, default = None
+                    The priority class of the requests.
+                :param deadline: float, default = None
+                    The deadline of the requests in seconds.
+                :param timeout: float, default = 30.0
+                    The timeout of a single request in seconds.
+                :param seed: int, default = 0
+                    The seed of the random order of the corpus.
+        '''
+        self.url = url
+        self.security_manager = SecurityManager(secret_key)
+        self.priority = priority
+        self.deadline = deadline
+        self.timeout = timeout
+
+        # Shuffling the corpus once, so the same run sends the same texts in the same order.
+        corpus = list(corpus)
+        random.Random(seed).shuffle(corpus)
+        self.texts = itertools.cycle(corpus)
+        self.request_number = itertools.count()
+
+        self.sessions = threading.local()
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.status_codes = dict()
+        self.errors = dict()
+        self.server_latencies = {name : [] for name in SERVER_LATENCIES}
+        self.stage_latencies = dict()
+
+    def create_request(self) -> tuple:
+        '''
+            This function creates the body of the next request and its HMAC token.
+            The token is computed over the exact bytes that are sent.
+                :return: tuple
+                    The raw body and the headers of the request.
+        '''
+        with self.lock:
+            text = next(self.texts)
+            index = next(self.request_number)
+        body = {"text" : text, "correlation_id" : f"loadgen-{index}"}
+        if self.priority is not None:
+            body["priority"] = self.priority
+        if self.deadline is not None:
+            body["deadline"] = self.deadline
+
+        raw_body = json.dumps(body).encode()
+        return raw_body, {"Token" : self.security_manager.encode_hmac_bytes(raw_body), "Content-Type" : "application/json"}
+
+    def send(self, scheduled_time : float = None) -> None:
+        '''
+            This function sends one request and records its outcome.
+                :param scheduled_time: float, default = None
+                    The time when the request should have been sent in the open loop. The latency is
+                    measured from this time, so the delays of the generator itself are not hidden.
+        '''
+        if not hasattr(self.sessions, "session"):
+            self.sessions.session = requests.Session()
+        raw_body, headers = self.create_request()
+
+        start = time.perf_counter() if scheduled_time is None else scheduled_time
+        try:
+            response = self.sessions.session.request("GET", self.url, data=raw_body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            with self.lock:
+                self.errors[e.__class__.__name__] = self.errors.get(e.__class__.__name__, 0) + 1
+            return
+        latency = time.perf_counter() - start
+
+        # Reading the server-reported timings of the successful requests.
+        server_latency = None
+        if response.status_code == 200:
+            try:
+                server_latency = response.json().get("latency")
+            except ValueError:
+                pass
+
+        with self.lock:
+            self.latencies.append(latency)
+            self.status_codes[response.status_code] = self.status_codes.get(response.status_code, 0) + 1
+            if server_latency:
+                for name in SERVER_LATENCIES:
+                    if server_latency.get(name) is not None:
+                        self.server_latencies[name].append(server_latency[name])
+                for stage, value in (server_latency.get("stages") or {}).items():
+                    if value is not None:
+                        self.stage_latencies.setdefault(stage, []).append(value)
+
+    def run_closed_loop(self, concurrency : int, duration : float, request_number : int = None) -> float:
+        '''
+            This function sends the requests from concurrent clients, each waiting for its
+            response before sending the next request.
+                :param concurrency: int
+                    The number of concurrent clients.
+                :param duration: float
+                    The duration of the run in seconds.
+                :param request_number: int, default = None
+                    The number of requests, if set the run ends after them instead of the duration.
+                :return: float
+                    The wall time of the run in seconds.
+        '''
+        remaining = itertools.count() if request_number is None else iter(range(request_number))
+        remaining_lock = threading.Lock()
+        end_time = time.perf_counter() + duration
+
+        def client():
+            while request_number is not None or time.perf_counter() < end_time:
+                with remaining_lock:
+                    if next(remaining, None) is None:
+                        return
+                self.send()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(client)
+        return time.perf_counter() - start
+
+    def run_open_loop(self, rate : float, duration : float, max_connections : int, poisson : bool = False, seed : int = 0) -> float:
+        '''
+            This function sends the requests at a fixed arrival rate, independently of the responses.
+                :param rate: float
+                    The number of requests per second.
+                :param duration: float
+                    The duration of the run in seconds.
+                :param max_connections: int
+                    The maximal number of requests in flight.
+                :param poisson: bool, default = False
+                    If True the inter-arrival times are exponential instead of constant.
+                :param seed: int, default = 0
+                    The seed of the inter-arrival times.
+                :return: float
+                    The wall time of the run in seconds.
+        '''
+        generator = random.Random(seed)
+        start = time.perf_counter()
+        scheduled_time = start
+        with ThreadPoolExecutor(max_connections) as pool:
+            while scheduled_time < start + duration:
+                delay = scheduled_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, scheduled_time)
+                scheduled_time += generator.expovariate(rate) if poisson else 1 / rate
+        return time.perf_counter() - start
+
+    def report(self, duration : float) -> dict:
+        '''
+            This function summarizes the collected results.
+                :param duration: float
+                    The wall time of the run in seconds.
+                :return: dict
+                    The throughput, the latency percentiles, the status codes and the server timings.
+        '''
+        sent = len(self.latencies) + sum(self.errors.values())
+        successful = self.status_codes.get(200, 0)
+        return {
+            "requests" : sent,
+            "duration_s" : duration,
+            "throughput_per_s" : successful / duration if duration > 0 else None,
+            "latency" : summarize(self.latencies, duration),
+            "status_codes" : {str(code) : count for code, count in sorted(self.status_codes.items())},
+            "rejected_rate" : self.status_codes.get(429, 0) / sent if sent else None,
+            "errors" : self.errors,
+            "server_latency" : {name : summarize(values) for name, values in self.server_latencies.items()},
+            "server_stages" : {stage : summarize(values) for stage, values in sorted(self.stage_latencies.items())}
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator of signed /intent requests.")
+    parser.add_argument("--url", default="http://localhost:6000/intent")
+    parser.add_argument("--config", default="config.ini", help="The configuration of the service holding the secret key.")
+    parser.add_argument("--secret-key", help="The secret key of the service, read from the configuration by default.")
+    parser.add_argument("--corpus", help="A file with one text per line, the sample utterances are used by default.")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--rate", type=float, default=50.0, help="The arrival rate of the open loop in requests per second.")
+    parser.add_argument("--poisson", action="store_true", help="Use exponential inter-arrival times in the open loop.")
+    parser.add_argument("--max-connections", type=int, default=256, help="The maximal number of requests in flight in the open loop.")
+    parser.add_argument("--concurrency", type=int, default=8, help="The number of clients of the closed loop.")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--requests", type=int, help="The number of requests of the closed loop, instead of the duration.")
+    parser.add_argument("--priority")
+    parser.add_argument("--deadline", type=float)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    secret_key = args.secret_key
+    if secret_key is None:
+        secret_key = ConfigManager(args.config).security.secret_key
+
+    corpus = SAMPLE_UTTERANCES
+    if args.corpus is not None:
+        with open(args.corpus, "r", encoding="utf-8") as corpus_file:
+            corpus = [line.rstrip("\n") for line in corpus_file if line.strip()]
+
+    load_generator = LoadGenerator(args.url, secret_key, corpus, args.priority, args.deadline, args.timeout, args.seed)
+    if args.mode == "open":
+        duration = load_generator.run_open_loop(args.rate, args.duration, args.max_connections, args.poisson, args.seed)
+    else:
+        duration = load_generator.run_closed_loop(args.concurrency, args.duration, args.requests)
+
+    results = {"benchmark" : "load_generator", "environment" : environment(), "parameters" : vars(args),
+               "results" : load_generator.report(duration)}
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
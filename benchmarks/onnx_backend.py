@@ -0,0 +1,134 @@
+# Importing all needed libraries.
+import argparse
+import tempfile
+import torch
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment
+from benchmarks import standins
+from executor.model_registry import OnnxModel
+from onnx_export import export_to_onnx
+
+
+def check_parity(model : "LstmModel", onnx_model : OnnxModel, batch_sizes : list, sequence_lengths : list,
+                 vector_dimension : int, tolerance : float) -> list:
+    '''
+        This function compares the outputs of the PyTorch and the ONNX models on random embeddings.
+            :param model: LstmModel
+                The PyTorch model.
+            :param onnx_model: OnnxModel
+                The exported model.
+            :param batch_sizes: list
+                The batch sizes to check.
+            :param sequence_lengths: list
+                The sequence lengths to check.
+            :param vector_dimension: int
+                The size of the embeddings.
+            :param tolerance: float
+                The maximal absolute difference of the logits.
+            :return: list
+                The maximal difference and the prediction agreement for every shape.
+    '''
+    results = []
+    for batch_size in batch_sizes:
+        for sequence_length in sequence_lengths:
+            embeds = torch.randn(batch_size, sequence_length, vector_dimension)
+            with torch.no_grad():
+                expected = model(embeds)
+            actual = onnx_model(embeds)
+            max_difference = (expected - actual).abs().max().item()
+            results.append({
+                "batch_size" : batch_size,
+                "sequence_length" : sequence_length,
+                "max_abs_difference" : max_difference,
+                "same_predictions" : bool((expected.argmax(dim=1) == actual.argmax(dim=1)).all()),
+                "passed" : max_difference <= tolerance
+            })
+    return results
+
+
+def measure(model : "function", batch_sizes : list, sequence_length : int, vector_dimension : int, repeats : int) -> dict:
+    '''
+        This function measures the forward pass of a model for several batch sizes.
+            :param model: function
+                The PyTorch or the ONNX model.
+            :param batch_sizes: list
+                The batch sizes.
+            :param sequence_length: int
+                The number of tokens of every document.
+            :param vector_dimension: int
+                The size of the embeddings.
+            :param repeats: int
+                The number of forward passes for every batch size.
+            :return: dict
+                The latency summary for every batch size.
+    '''
+    results = dict()
+    for batch_size in batch_sizes:
+        embeds = torch.randn(batch_size, sequence_length, vector_dimension)
+        latencies = []
+        with torch.no_grad():
+            # Warming up the kernels of this batch size.
+            model(embeds)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                model(embeds)
+                latencies.append(time.perf_counter() - start)
+        results[str(batch_size)] = summarize(latencies)
+        results[str(batch_size)]["documents_per_s"] = batch_size * repeats / sum(latencies)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity check and benchmark of the ONNX Runtime backend against PyTorch.")
+    parser.add_argument("--model-path", help="The PyTorch model to export, a random model with the sample architecture by default.")
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--sequence-length", type=int, default=30)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--parity-sequence-lengths", type=int, nargs="+", default=[1, 7, 30, 64])
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=0, help="The intra-op threads of ONNX Runtime, 0 lets it decide.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    directory = tempfile.mkdtemp(prefix="intent-onnx-")
+    if args.model_path is None:
+        model = standins.create_model(os.path.join(directory, "model.pth"), args.vector_dimension, args.seed)
+    else:
+        model = torch.load(args.model_path)
+        model.eval()
+
+    # Exporting the model and loading it like the executor does.
+    onnx_path = os.path.join(directory, "model.onnx")
+    export_to_onnx(model, onnx_path, args.sequence_length)
+    with open(onnx_path, "rb") as onnx_file:
+        onnx_model = OnnxModel(onnx_file.read(), args.threads)
+
+    vector_dimension = model.lstm_config["embedding_dim"]
+    parity = check_parity(model, onnx_model, args.batch_sizes, args.parity_sequence_lengths, vector_dimension, args.tolerance)
+    results = {
+        "benchmark" : "onnx_backend",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "parity" : parity,
+        "scenarios" : {
+            "torch" : measure(model, args.batch_sizes, args.sequence_length, vector_dimension, args.repeats),
+            "onnx" : measure(onnx_model, args.batch_sizes, args.sequence_length, vector_dimension, args.repeats)
+        }
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if the exported model doesn't reproduce the PyTorch outputs.
+    sys.exit(0 if all(result["passed"] for result in parity) else 1)
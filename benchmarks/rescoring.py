@@ -0,0 +1,188 @@
+# Importing all needed libraries.
+from sqlalchemy import create_engine, text, MetaData, Table, Column, String, Text, DateTime
+import datetime
+import argparse
+import tempfile
+import random
+import torch
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import environment, SAMPLE_UTTERANCES
+from benchmarks import standins
+from executor.model_registry import load_model_version
+from feature_store import build_feature_store, FeatureStore, rescore
+from config import ConfigManager
+
+
+def create_history(database_uri : str, row_number : int, intents : list, repeated_share : float = 0.7, seed : int = 0) -> "Engine":
+    '''
+        This function creates an intents table with one day of synthetic traffic.
+            :param database_uri: str
+                The sqlalchemy uri of the database.
+            :param row_number: int
+                The number of rows.
+            :param intents: list
+                The intents recorded as the previous predictions.
+            :param repeated_share: float, default = 0.7
+                The share of the rows repeating a sample utterance, the other texts are unique.
+            :param seed: int, default = 0
+                The seed of the generated texts.
+            :return: Engine
+                The sqlalchemy engine of the database.
+    '''
+    engine = create_engine(database_uri)
+    metadata = MetaData()
+    intents_table = Table(
+        "intents", metadata,
+        Column("id", String(64), primary_key=True),
+        Column("correlation_id", String(64)),
+        Column("text", Text),
+        Column("prediction", String(32)),
+        Column("created_at", DateTime, nullable=False)
+    )
+    metadata.create_all(engine)
+
+    # Generating repeated short messages and unique texts, the unique ones aren't helped by the tokenizer cache.
+    generator = random.Random(seed)
+    day_start = datetime.datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        for chunk_start in range(0, row_number, 10000):
+            connection.execute(intents_table.insert(), [{
+                "id" : f"{index:032x}",
+                "correlation_id" : f"history-{index}",
+                "text" : generator.choice(SAMPLE_UTTERANCES) if generator.random() < repeated_share else
+                         f"{generator.choice(SAMPLE_UTTERANCES)} word{generator.randrange(20000)} word{index}",
+                "prediction" : generator.choice(intents),
+                "created_at" : day_start + datetime.timedelta(seconds=86400 * index / row_number)
+            } for index in range(chunk_start, min(chunk_start + 10000, row_number))])
+    return engine
+
+
+def recompute(word_embedder : "BaseWordEmbedder", model_version : "ModelVersion", texts : list, batch_size : int) -> list:
+    '''
+        This function predicts the intents of texts by tokenizing and embedding them again, the path replaced by the feature store.
+            :param word_embedder: BaseWordEmbedder
+                The word embedder.
+            :param model_version: ModelVersion
+                The evaluated model version.
+            :param texts: list
+                The texts of the rows.
+            :param batch_size: int
+                The number of texts forwarded at once.
+            :return: list
+                The predicted intents.
+    '''
+    predictions = []
+    with torch.no_grad():
+        for batch_start in range(0, len(texts), batch_size):
+            batch_tokens = word_embedder.tokenize_batch(texts[batch_start:batch_start + batch_size])
+            inputs = torch.stack([word_embedder.embed_tokens(tokens) for tokens in batch_tokens])
+            predictions += [model_version.index2intent_mapper[str(index)] for index in model_version.model(inputs).argmax(dim=1).tolist()]
+    return predictions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-scoring of the historical traffic from the feature store compared "
+                                                 "with tokenizing and embedding the texts again.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--rows", type=int, default=100000, help="The number of rows of the synthetic day of traffic.")
+    parser.add_argument("--repeated-share", type=float, default=0.7, help="The share of the rows repeating a sample utterance.")
+    parser.add_argument("--baseline-rows", type=int, default=10000, help="The number of rows recomputed from the texts.")
+    parser.add_argument("--rows-per-day", type=int, default=1000000, help="The traffic of a day used to extrapolate the durations.")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    # Creating the history, the embedder and the evaluated checkpoint.
+    config = ConfigManager(args.config)
+    directory = tempfile.mkdtemp(prefix="intent-rescoring-")
+    embedder = standins.create_embedder(args.vector_dimension)
+    model_path = os.path.join(directory, "model.pth")
+    standins.create_model(model_path, args.vector_dimension, args.seed + 1)
+    mapper_path = config.neural_network.index2intent_mapper_path
+    with open(mapper_path, "r") as mapper_file:
+        intents = list(json.load(mapper_file).values())
+    engine = create_history(f"sqlite:///{os.path.join(directory, 'history.db')}", args.rows, intents, args.repeated_share, args.seed)
+
+    # Building the stores with the token ids and with the float16 embeddings.
+    token_ids_manifest = build_feature_store(engine, embedder, os.path.join(directory, "token_ids"), args.chunk_size)
+    embeddings_manifest = build_feature_store(engine, embedder, os.path.join(directory, "embeddings"), args.chunk_size,
+                                              embeddings=True, embedding_dtype="float16")
+
+    # Re-scoring the stores, the token ids with the model fused with the embedding table.
+    fused_model_version = load_model_version(model_path, mapper_path, embedding_vectors=embedder.embedding_vectors())
+    model_version = load_model_version(model_path, mapper_path)
+    token_ids_store = FeatureStore(os.path.join(directory, "token_ids"))
+    embeddings_store = FeatureStore(os.path.join(directory, "embeddings"))
+    token_ids_statistics = rescore(token_ids_store, fused_model_version, args.batch_size, fused=True,
+                                   changes_path=os.path.join(directory, "changes.jsonl"))
+    all_rows_statistics = rescore(token_ids_store, fused_model_version, args.batch_size, fused=True, deduplicate=False)
+    embeddings_statistics = rescore(embeddings_store, model_version, args.batch_size)
+
+    # Recomputing a sample of the rows from their texts.
+    baseline_rows = min(args.baseline_rows, args.rows)
+    with engine.connect() as connection:
+        texts = [row[0] for row in connection.execute(text(f"SELECT text FROM intents ORDER BY created_at, id LIMIT {baseline_rows}"))]
+    start = time.perf_counter()
+    baseline_predictions = recompute(embedder, model_version, texts, args.batch_size)
+    baseline_duration = time.perf_counter() - start
+
+    # Checking that the stores give the predictions of the recomputation.
+    stored_predictions = []
+    with torch.no_grad():
+        for batch_start in range(0, baseline_rows, args.batch_size):
+            inputs = token_ids_store.inputs(batch_start, min(batch_start + args.batch_size, baseline_rows), fused=True)
+            stored_predictions += [fused_model_version.index2intent_mapper[str(index)]
+                                   for index in fused_model_version.model(inputs).argmax(dim=1).tolist()]
+    half_day_start, half_day_end = token_ids_store.row_range(datetime.datetime(2024, 1, 1, 12), datetime.datetime(2024, 1, 2))
+
+    # The float16 embeddings may flip the predictions of a few rows with close logits.
+    intent_count_difference = sum(abs(embeddings_statistics["intent_counts"].get(intent, 0) - token_ids_statistics["intent_counts"].get(intent, 0))
+                                  for intent in intents)
+
+    rows_per_second = {
+        "recompute" : baseline_rows / baseline_duration,
+        "token_ids" : token_ids_statistics["rows_per_second"],
+        "token_ids_without_deduplication" : all_rows_statistics["rows_per_second"],
+        "embeddings_float16" : embeddings_statistics["rows_per_second"]
+    }
+    checks = {
+        "complete_stores" : token_ids_manifest["rows"] == args.rows and embeddings_manifest["rows"] == args.rows,
+        "token_ids_match_recompute" : stored_predictions == baseline_predictions,
+        "deduplication_keeps_predictions" : token_ids_statistics["intent_counts"] == all_rows_statistics["intent_counts"]
+                                            and token_ids_statistics["changed_rows"] == all_rows_statistics["changed_rows"],
+        "embeddings_float16_close_to_token_ids" : intent_count_difference <= 0.01 * args.rows,
+        "time_range_selects_rows" : half_day_end - half_day_start == args.rows - args.rows // 2
+    }
+
+    results = {
+        "benchmark" : "rescoring",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "checks" : checks,
+        "build" : {
+            "token_ids_seconds" : token_ids_manifest["build_duration"],
+            "embeddings_float16_seconds" : embeddings_manifest["build_duration"],
+            "token_ids_bytes" : os.path.getsize(os.path.join(directory, "token_ids", "token_ids.npy")),
+            "embeddings_float16_bytes" : os.path.getsize(os.path.join(directory, "embeddings", "embeddings.npy"))
+        },
+        "rows_per_second" : rows_per_second,
+        "day_minutes" : {name : args.rows_per_day / rate / 60 for name, rate in rows_per_second.items()},
+        "rescore" : {key : value for key, value in token_ids_statistics.items() if key != "top_changes"}
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if the stores don't reproduce the predictions.
+    sys.exit(0 if all(checks.values()) else 1)
@@ -0,0 +1,292 @@
+# Importing all needed libraries.
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server, WSGIRequestHandler
+import itertools
+import threading
+import argparse
+import tempfile
+import requests
+import torch
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment
+from benchmarks import standins
+from executor.executor import TaskExecutorManager
+from executor.task import Task
+from nn_model import FusedLstmModel
+from config import ConfigManager
+
+
+def embedder_scenario(embedder : "BaseWordEmbedder", corpus : list, repeats : int) -> dict:
+    '''
+        This function measures the tokenization and the embedding of single documents.
+            :param embedder: BaseWordEmbedder
+                The embedder to measure.
+            :param corpus: list
+                The documents.
+            :param repeats: int
+                The number of passes over the corpus.
+            :return: dict
+                The latency summaries of the tokenize and embed steps.
+    '''
+    tokenize_latencies, embed_latencies = [], []
+    for _ in range(repeats):
+        for document in corpus:
+            start = time.perf_counter()
+            tokens = embedder.tokenize(document)
+            middle = time.perf_counter()
+            embedder.embed_tokens(tokens)
+            end = time.perf_counter()
+            tokenize_latencies.append(middle - start)
+            embed_latencies.append(end - middle)
+    return {"tokenize" : summarize(tokenize_latencies), "embed" : summarize(embed_latencies)}
+
+
+def model_scenario(model : "LstmModel", batch_sizes : list, max_length : int, vector_dimension : int, repeats : int) -> dict:
+    '''
+        This function measures the forward pass of the classifier for several batch sizes.
+            :param model: LstmModel
+                The classifier to measure.
+            :param batch_sizes: list
+                The batch sizes.
+            :param max_length: int
+                The number of tokens of every document.
+            :param vector_dimension: int
+                The size of the embeddings.
+            :param repeats: int
+                The number of forward passes for every batch size.
+            :return: dict
+                The latency summary for every batch size.
+    '''
+    results = dict()
+    for batch_size in batch_sizes:
+        embeds = torch.randn(batch_size, max_length, vector_dimension)
+        latencies = []
+        with torch.no_grad():
+            # Warming up the kernels of this batch size.
+            model(embeds)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                model(embeds)
+                latencies.append(time.perf_counter() - start)
+        results[str(batch_size)] = summarize(latencies)
+        results[str(batch_size)]["documents_per_s"] = batch_size * repeats / sum(latencies)
+    return results
+
+
+def fused_scenario(model : "LstmModel", embedder : "BaseWordEmbedder", corpus : list, batch_sizes : list, repeats : int) -> dict:
+    '''
+        This function compares the embedding lookup outside the model with the model fused with the
+        embedding table, from the tokens of a batch to the logits.
+            :param model: LstmModel
+                The classifier to measure.
+            :param embedder: BaseWordEmbedder
+                The embedder with a static embedding table.
+            :param corpus: list
+                The documents.
+            :param batch_sizes: list
+                The batch sizes.
+            :param repeats: int
+                The number of batches for every batch size.
+            :return: dict
+                The latency summaries and the input size per document of both variants.
+    '''
+    fused_model = FusedLstmModel(model, embedder.embedding_vectors())
+    fused_model.eval()
+    results = dict()
+    for batch_size in batch_sizes:
+        batch_tokens = embedder.tokenize_batch(list(itertools.islice(itertools.cycle(corpus), batch_size)))
+        variants = {
+            "embeddings" : (model, lambda: torch.stack([embedder.embed_tokens(tokens) for tokens in batch_tokens])),
+            "fused" : (fused_model, lambda: torch.tensor([embedder.token_ids(tokens) for tokens in batch_tokens], dtype=torch.long))
+        }
+        results[str(batch_size)] = dict()
+        for name, (variant_model, create_inputs) in variants.items():
+            latencies = []
+            with torch.no_grad():
+                # Warming up the kernels of this batch size.
+                inputs = create_inputs()
+                variant_model(inputs)
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    variant_model(create_inputs())
+                    latencies.append(time.perf_counter() - start)
+            results[str(batch_size)][name] = summarize(latencies)
+            results[str(batch_size)][name]["input_bytes_per_document"] = inputs.element_size() * inputs.nelement() // batch_size
+    return results
+
+
+def executor_scenario(config : ConfigManager, embedder : "BaseWordEmbedder", corpus : list,
+                      worker_counts : list, concurrency : int, task_number : int) -> dict:
+    '''
+        This function measures the throughput of the Task Executor Manager for several worker
+        counts with a closed loop of concurrent submitters.
+            :param config: ConfigManager
+                The configuration of the service.
+            :param embedder: BaseWordEmbedder
+                The embedder used by the executor.
+            :param corpus: list
+                The documents.
+            :param worker_counts: list
+                The numbers of workers.
+            :param concurrency: int
+                The number of concurrent submitters.
+            :param task_number: int
+                The number of tasks submitted for every worker count.
+            :return: dict
+                The latency and throughput summary for every worker count.
+    '''
+    results = dict()
+    for worker_count in worker_counts:
+        config.neural_network.task_number_limit = worker_count
+        config.neural_network.queue_size_limit = max(config.neural_network.queue_size_limit, concurrency)
+        task_executor = TaskExecutorManager(config.neural_network, embedder, config.priority_classes_dict)
+        documents = itertools.cycle(corpus)
+        documents_lock = threading.Lock()
+        latencies = []
+
+        def submit(_):
+            with documents_lock:
+                document = next(documents)
+            task = Task(document, threading.Condition())
+            task.set_timer_lock_time()
+            while not task_executor.try_add_to_queue(task):
+                time.sleep(0.001)
+            task.wait()
+            latencies.append(time.perf_counter() - task.arrival_time)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(submit, range(task_number)))
+        duration = time.perf_counter() - start
+
+        # Stopping the workers of this executor.
+        task_executor.set_worker_number(0)
+
+        results[str(worker_count)] = summarize(latencies, duration)
+        results[str(worker_count)]["shed_tasks"] = task_executor.shed_task_number
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        '''
+            This function disables the access log of the benchmark server.
+        '''
+        pass
+
+
+def http_scenario(service : "module", corpus : list, concurrency : int, request_number : int) -> dict:
+    '''
+        This function measures full HTTP round trips of signed /intent requests, including the
+        authentication, the validation, the executor and the SQLite write.
+            :param service: module
+                The main module of the service loaded with the stand-ins.
+            :param corpus: list
+                The documents.
+            :param concurrency: int
+                The number of concurrent clients.
+            :param request_number: int
+                The number of requests.
+            :return: dict
+                The latency summary and the status codes of the responses.
+    '''
+    server = make_server("127.0.0.1", 0, service.app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, name="benchmark-http", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/intent"
+
+    sessions = threading.local()
+    status_codes = dict()
+    latencies = []
+
+    def send(index):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        body = json.dumps({"text" : corpus[index % len(corpus)], "correlation_id" : f"benchmark-{index}"}).encode()
+        headers = {"Token" : service.security_manager.encode_hmac_bytes(body), "Content-Type" : "application/json"}
+        start = time.perf_counter()
+        response = sessions.session.request("GET", url, data=body, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, range(request_number)))
+    duration = time.perf_counter() - start
+    server.shutdown()
+
+    result = summarize(latencies, duration)
+    result["status_codes"] = {str(code) : count for code, count in status_codes.items()}
+    return result
+
+
+def run(args : "argparse.Namespace") -> dict:
+    '''
+        This function runs the selected scenarios with the local stand-ins.
+            :param args: argparse.Namespace
+                The command line arguments.
+            :return: dict
+                The results of the benchmark.
+    '''
+    torch.manual_seed(args.seed)
+    directory = tempfile.mkdtemp(prefix="intent-benchmark-")
+    model_path = os.path.join(directory, "model.pth")
+    model = standins.create_model(model_path, args.vector_dimension, args.seed)
+    embedder = standins.create_embedder(args.vector_dimension, args.max_length, args.vocabulary_size)
+
+    # Writing the configuration pointing the service to the stand-ins.
+    sidecar = standins.FakeSidecar(ConfigManager(args.config).service_sidecar.secret_key)
+    sidecar.start()
+    config_path = standins.write_config(directory, model_path, sidecar.port, {
+        "neural-network" : {"coalesce_requests" : "false"},
+        "word-embedding-dict" : {"vector_dimension" : args.vector_dimension, "max_length" : args.max_length}
+    }, base_config=args.config)
+    config = ConfigManager(config_path)
+
+    results = {"benchmark" : "end_to_end", "environment" : environment(), "parameters" : vars(args), "scenarios" : dict()}
+    if "embedder" in args.scenarios:
+        results["scenarios"]["embedder"] = embedder_scenario(embedder, standins.SAMPLE_UTTERANCES, args.repeats)
+    if "model" in args.scenarios:
+        results["scenarios"]["model"] = model_scenario(model, args.batch_sizes, args.max_length, args.vector_dimension, args.repeats)
+    if "fused" in args.scenarios:
+        results["scenarios"]["fused"] = fused_scenario(model, embedder, standins.SAMPLE_UTTERANCES, args.batch_sizes, args.repeats)
+    if "executor" in args.scenarios:
+        results["scenarios"]["executor"] = executor_scenario(
+            config, embedder, standins.SAMPLE_UTTERANCES, args.worker_counts, args.concurrency, args.task_number
+        )
+    if "http" in args.scenarios:
+        service = standins.load_service(config_path, embedder)
+        results["scenarios"]["http"] = http_scenario(service, standins.SAMPLE_UTTERANCES, args.concurrency, args.task_number)
+        service.TASK_EXECUTOR.set_worker_number(0)
+    sidecar.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the intent classification with local stand-ins.")
+    parser.add_argument("--scenarios", nargs="+", default=["embedder", "model", "fused", "executor", "http"],
+                        choices=["embedder", "model", "fused", "executor", "http"])
+    parser.add_argument("--config", default="config.ini", help="The configuration of the service used as a template.")
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--max-length", type=int, default=30)
+    parser.add_argument("--vocabulary-size", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--worker-counts", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--task-number", type=int, default=500)
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
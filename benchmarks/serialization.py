@@ -0,0 +1,160 @@
+# Importing all needed libraries.
+import argparse
+import tempfile
+import msgpack
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment, SAMPLE_UTTERANCES
+from benchmarks import standins
+from config import ConfigManager
+
+# Defining the compared formats, the media type and the encoder of the request bodies.
+FORMATS = {
+    "json" : ("application/json", lambda body : json.dumps(body).encode()),
+    "msgpack" : ("application/msgpack", lambda body : msgpack.packb(body, use_bin_type=True))
+}
+
+# Defining the compared response profiles, the fields added to the request body.
+PROFILES = {
+    "full" : {},
+    "compact" : {"response_profile" : "compact"},
+    "compact_scores" : {"response_profile" : "compact", "scores" : True}
+}
+
+
+def decode_response(response : "Response") -> dict:
+    '''
+        This function decodes the body of a response in its format.
+    '''
+    if "msgpack" in response.mimetype:
+        return msgpack.unpackb(response.data, raw=False)
+    return json.loads(response.data)
+
+
+def send_requests(service : "module", body_format : str, profile : str, request_number : int) -> tuple:
+    '''
+        This function sends signed /intent requests in a format and a response profile through the Flask test client.
+            :param service: module
+                The imported service.
+            :param body_format: str
+                The format of the request and the response bodies, 'json' or 'msgpack'.
+            :param profile: str
+                The response profile.
+            :param request_number: int
+                The number of requests.
+            :return: tuple
+                The latency of every request, the sizes of the request and the response bodies and the last response.
+    '''
+    client = service.app.test_client()
+    mimetype, encode = FORMATS[body_format]
+    latencies, request_sizes, response_sizes = [], [], []
+    for index in range(request_number):
+        body = encode(dict(PROFILES[profile], text=SAMPLE_UTTERANCES[index % len(SAMPLE_UTTERANCES)],
+                           correlation_id=f"{body_format}-{profile}-{index}"))
+        headers = {"Token" : service.security_manager.encode_hmac_bytes(body), "Content-Type" : mimetype, "Accept" : mimetype}
+        start = time.perf_counter()
+        response = client.get("/intent", data=body, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise Exception(f"The request failed with status {response.status_code}!")
+        request_sizes.append(len(body))
+        response_sizes.append(len(response.data))
+    return latencies, request_sizes, response_sizes, decode_response(response)
+
+
+def measure_codec(body : dict, repeats : int) -> dict:
+    '''
+        This function measures the encoding and the decoding of a body in JSON and in MessagePack, like the service does them.
+            :param body: dict
+                The body of a response.
+            :param repeats: int
+                The number of measured encodings and decodings.
+            :return: dict
+                The mean times in microseconds and the sizes in bytes of every format.
+    '''
+    codecs = {
+        "json" : (lambda : json.dumps(body, separators=(",", ":")).encode(), json.loads),
+        "msgpack" : (lambda : msgpack.packb(body, use_bin_type=True, use_single_float=True), lambda raw : msgpack.unpackb(raw, raw=False))
+    }
+    statistics = dict()
+    for name, (encode, decode) in codecs.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            raw = encode()
+        encode_time = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            decode(raw)
+        decode_time = (time.perf_counter() - start) / repeats
+        statistics[name] = {"bytes" : len(raw), "encode_us" : encode_time * 1e6, "decode_us" : decode_time * 1e6}
+    return statistics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serialization cost and size of the /intent bodies in JSON and in MessagePack.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=10000, help="The number of encodings and decodings of every body.")
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    # Starting the service with both formats enabled.
+    directory = tempfile.mkdtemp(prefix="intent-serialization-")
+    model_path = os.path.join(directory, "model.pth")
+    standins.create_model(model_path, args.vector_dimension, args.seed)
+    sidecar = standins.FakeSidecar(ConfigManager(args.config).service_sidecar.secret_key)
+    sidecar.start()
+    config_path = standins.write_config(directory, model_path, sidecar.port, {
+        "neural-network" : {"coalesce_requests" : "false"},
+        "serialization" : {"msgpack" : "true"},
+        "heartbeat" : {"enabled" : "false"}
+    }, base_config=args.config)
+    service = standins.load_service(config_path, standins.create_embedder(args.vector_dimension))
+    send_requests(service, "json", "full", 20)
+
+    # Measuring every format and profile end to end, then the codecs alone on the returned bodies.
+    scenarios, codecs, responses = dict(), dict(), dict()
+    for profile in PROFILES:
+        for body_format in FORMATS:
+            latencies, request_sizes, response_sizes, responses[(body_format, profile)] = send_requests(
+                service, body_format, profile, args.requests
+            )
+            scenarios[f"{body_format}_{profile}"] = summarize(latencies)
+            scenarios[f"{body_format}_{profile}"]["request_bytes"] = sum(request_sizes) / len(request_sizes)
+            scenarios[f"{body_format}_{profile}"]["response_bytes"] = sum(response_sizes) / len(response_sizes)
+        codecs[profile] = measure_codec(responses[("json", profile)], args.repeats)
+
+    service.TASK_EXECUTOR.set_worker_number(0)
+    sidecar.stop()
+
+    # Checking that both formats carry the same prediction and the profiles only the asked fields.
+    checks = {
+        "same_prediction" : all(responses[("json", profile)]["prediction"] == responses[("msgpack", profile)]["prediction"]
+                                for profile in PROFILES),
+        "compact_has_only_prediction" : set(responses[("msgpack", "compact")]) == {"prediction"},
+        "scores_sum_to_one" : abs(sum(responses[("msgpack", "compact_scores")]["scores"].values()) - 1) < 1e-3
+    }
+
+    results = {
+        "benchmark" : "serialization",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "checks" : checks,
+        "scenarios" : scenarios,
+        "codecs" : codecs
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if the formats or the profiles disagree.
+    sys.exit(0 if all(checks.values()) else 1)
@@ -0,0 +1,200 @@
+# Importing all needed libraries.
+from werkzeug.serving import make_server
+import threading
+import argparse
+import tempfile
+import requests
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import environment, SAMPLE_UTTERANCES
+from benchmarks.run import QuietRequestHandler
+from benchmarks import standins
+from config import ConfigManager
+
+
+def signed_headers(service : "module", body : bytes = b"") -> dict:
+    '''
+        This function returns the headers of a request signed like the clients of the service do.
+    '''
+    return {"Token" : service.security_manager.encode_hmac_bytes(body), "Content-Type" : "application/json"}
+
+
+def take_sample(session : requests.Session, base_url : str, service : "module", start : float, top : int) -> dict:
+    '''
+        This function reads the /debug/memory endpoint and keeps the values tracked by the soak test.
+            :param session: requests.Session
+                The session of the sampler.
+            :param base_url: str
+                The url of the service.
+            :param service: module
+                The imported service.
+            :param start: float
+                The perf_counter checkpoint when the soak test started.
+            :param top: int
+                The number of top allocators.
+            :return: dict
+                The sample.
+    '''
+    statistics = session.get(f"{base_url}/debug/memory", params={"top" : top}, headers=signed_headers(service)).json()
+    return {
+        "time_s" : time.perf_counter() - start,
+        "rss_bytes" : statistics["rss_bytes"],
+        "traced_bytes" : statistics["tracemalloc"]["traced_bytes"] if statistics["tracemalloc"] else None,
+        "threads" : statistics["threads"]["count"],
+        "thread_names" : statistics["threads"]["names"],
+        "workers" : statistics["workers"]["workers"],
+        "queues" : statistics["queues"],
+        "top_growth" : statistics["tracemalloc"]["top_growth"] if statistics["tracemalloc"] else None
+    }
+
+
+def growth_per_hour(samples : list, key : str) -> float:
+    '''
+        This function fits a line to the samples with least squares and returns its slope per hour.
+    '''
+    points = [(sample["time_s"], sample[key]) for sample in samples if sample[key] is not None]
+    if len(points) < 2:
+        return None
+    mean_time = sum(point[0] for point in points) / len(points)
+    mean_value = sum(point[1] for point in points) / len(points)
+    variance = sum((point[0] - mean_time) ** 2 for point in points)
+    covariance = sum((point[0] - mean_time) * (point[1] - mean_value) for point in points)
+    return covariance / variance * 3600 if variance > 0 else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak test of the service with synthetic traffic and scaling cycles, "
+                                                 "failing if the memory or the threads keep growing.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--duration", type=float, default=3600.0, help="The number of seconds of traffic, hours for a real soak.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--think-time", type=float, default=0.005, help="The pause of every client between its requests.")
+    parser.add_argument("--cycle-interval", type=float, default=30.0, help="The period of the /increase and /decrease cycles.")
+    parser.add_argument("--sample-interval", type=float, default=10.0)
+    parser.add_argument("--warm-up", type=float, default=0.2, help="The share of the duration ignored when computing the growth.")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=16.0)
+    parser.add_argument("--max-thread-growth", type=int, default=2)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Measure the RSS without the overhead of tracemalloc.")
+    parser.add_argument("--scrape-metrics", action="store_true", help="Read /metrics at every sample like Prometheus does.")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    # Starting the service with tracemalloc in this process.
+    directory = tempfile.mkdtemp(prefix="intent-soak-")
+    model_path = os.path.join(directory, "model.pth")
+    standins.create_model(model_path, args.vector_dimension, args.seed)
+    sidecar = standins.FakeSidecar(ConfigManager(args.config).service_sidecar.secret_key)
+    sidecar.start()
+    config_path = standins.write_config(directory, model_path, sidecar.port, {
+        "debug" : {"tracemalloc" : str(not args.no_tracemalloc).lower()},
+        "heartbeat" : {"interval" : 1.0}
+    }, base_config=args.config)
+    service = standins.load_service(config_path, standins.create_embedder(args.vector_dimension))
+    server = make_server("127.0.0.1", 0, service.app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, name="soak-http", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    stop_event = threading.Event()
+    status_codes = dict()
+    status_lock = threading.Lock()
+
+    def send_traffic(client_index : int) -> None:
+        session = requests.Session()
+        index = 0
+        while not stop_event.is_set():
+            body = json.dumps({"text" : SAMPLE_UTTERANCES[index % len(SAMPLE_UTTERANCES)] + f" {index % 97}",
+                               "correlation_id" : f"soak-{client_index}-{index}"}).encode()
+            response = session.get(f"{base_url}/intent", data=body, headers=signed_headers(service, body))
+            with status_lock:
+                status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+            index += 1
+            stop_event.wait(args.think_time)
+
+    def run_scaling_cycles() -> None:
+        session = requests.Session()
+        while not stop_event.wait(args.cycle_interval / 2):
+            session.post(f"{base_url}/increase", headers=signed_headers(service))
+            if stop_event.wait(args.cycle_interval / 2):
+                session.post(f"{base_url}/decrease", headers=signed_headers(service))
+                break
+            session.post(f"{base_url}/decrease", headers=signed_headers(service))
+
+    # Sampling the idle service before the traffic.
+    sampler = requests.Session()
+    start = time.perf_counter()
+    idle_before = take_sample(sampler, base_url, service, start, args.top)
+
+    clients = [threading.Thread(target=send_traffic, args=(index,), name=f"soak-client-{index}") for index in range(args.concurrency)]
+    clients.append(threading.Thread(target=run_scaling_cycles, name="soak-scaling"))
+    for client in clients:
+        client.start()
+
+    # Sampling the service under the traffic.
+    samples = []
+    while time.perf_counter() - start < args.duration:
+        time.sleep(min(args.sample_interval, max(args.duration - (time.perf_counter() - start), 0)))
+        samples.append(take_sample(sampler, base_url, service, start, args.top))
+        if args.scrape_metrics:
+            sampler.get(f"{base_url}/metrics")
+        print(f"soak: {samples[-1]['time_s']:.0f}s rss={samples[-1]['rss_bytes'] / 2 ** 20:.1f}MB "
+              f"threads={samples[-1]['threads']} workers={samples[-1]['workers']}", file=sys.stderr)
+
+    # Stopping the traffic and sampling the idle service again, the request threads need a moment to exit.
+    stop_event.set()
+    for client in clients:
+        client.join()
+    time.sleep(1.0)
+    idle_after = take_sample(sampler, base_url, service, start, args.top)
+    server.shutdown()
+    service.TASK_EXECUTOR.set_worker_number(0)
+    sidecar.stop()
+
+    # Comparing the growth after the warm-up with the bounds.
+    steady_samples = [sample for sample in samples if sample["time_s"] >= args.warm_up * args.duration] or samples[-1:]
+    rss_growth = (steady_samples[-1]["rss_bytes"] - steady_samples[0]["rss_bytes"]) / 2 ** 20
+    traced_growth = None
+    if not args.no_tracemalloc:
+        traced_growth = (steady_samples[-1]["traced_bytes"] - steady_samples[0]["traced_bytes"]) / 2 ** 20
+    thread_growth = idle_after["threads"] - idle_before["threads"]
+    checks = {
+        "rss_growth_bounded" : rss_growth <= args.max_rss_growth_mb,
+        "traced_growth_bounded" : traced_growth is None or traced_growth <= args.max_traced_growth_mb,
+        "threads_bounded" : thread_growth <= args.max_thread_growth,
+        "workers_restored" : idle_after["workers"] == idle_before["workers"]
+    }
+
+    results = {
+        "benchmark" : "soak",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "checks" : checks,
+        "statistics" : {
+            "status_codes" : {str(code) : count for code, count in status_codes.items()},
+            "rss_growth_mb" : rss_growth,
+            "rss_growth_mb_per_hour" : growth_per_hour(steady_samples, "rss_bytes") / 2 ** 20 if len(steady_samples) > 1 else None,
+            "traced_growth_mb" : traced_growth,
+            "traced_growth_mb_per_hour" : growth_per_hour(steady_samples, "traced_bytes") / 2 ** 20 if traced_growth is not None and len(steady_samples) > 1 else None,
+            "thread_growth" : thread_growth,
+            "threads_before" : idle_before["thread_names"],
+            "threads_after" : idle_after["thread_names"],
+            "top_growth" : idle_after["top_growth"]
+        },
+        "samples" : [{key : value for key, value in sample.items() if key not in ("top_growth", "thread_names")} for sample in samples]
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if the memory or the threads grew over the bounds.
+    sys.exit(0 if all(checks.values()) else 1)
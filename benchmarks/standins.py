@@ -0,0 +1,290 @@
+# Importing all needed libraries.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from configparser import ConfigParser
+import threading
+import torch
+import time
+import json
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import SAMPLE_UTTERANCES
+from word_embedders.base import BaseWordEmbedder
+from word_embedders.tokenizers import Tokenizer
+from nn_model import LstmModel
+from cerber import SecurityManager
+
+# Defining the sample architecture of the classifier, similar to the production checkpoint.
+SAMPLE_ARCHITECTURE = {
+    "lstm_config" : {
+        "embedding_dim" : 300,
+        "lstm_hidden_dim" : 128,
+        "lstm_num_layers" : 2,
+        "lstm_bidirectional" : True,
+        "lstm_dropout" : 0.2
+    },
+    "linear_config" : [
+        {"output_dim" : 128, "dropout" : 0.2, "batch_norm" : True, "activation" : "relu"},
+        {"output_dim" : 19, "dropout" : None, "batch_norm" : False, "activation" : None}
+    ]
+}
+
+
+class SyntheticEmbedder(BaseWordEmbedder):
+    def __init__(self,
+                 vector_dimension : int,
+                 tokenize_fun : "function",
+                 max_length : int,
+                 pad_token : str = "<PAD>",
+                 vocabulary_size : int = 20000,
+                 seed : int = 0,
+                 **kwargs) -> None:
+        '''
+            This class is a static word embedder with a small random embedding table, used instead
+            of GloVe so the benchmarks run without downloading the vectors.
+            The vocabulary contains the words of the sample utterances and generated words.
+                :param vector_dimension: int
+                    The size of the vectors.
+                :param tokenize_fun: function
+                    The tokenization function.
+                :param max_length: int
+                    The number of tokens to pad the document to.
+                :param pad_token: str, default = <PAD>
+                    The string representing the pad token.
+                :param vocabulary_size: int, default = 20000
+                    The number of words in the embedding table.
+                :param seed: int, default = 0
+                    The seed of the random embedding table.
+        '''
+        super(SyntheticEmbedder, self).__init__(vector_dimension, tokenize_fun, max_length, pad_token, **kwargs)
+
+        # Creation of the vocabulary, the row 0 is the zero vector of the unknown and pad tokens.
+        words = sorted({token for utterance in SAMPLE_UTTERANCES for token in tokenize_fun(utterance)})
+        words += [f"word{i}" for i in range(max(vocabulary_size - len(words), 0))]
+        self.stoi = {word : index + 1 for index, word in enumerate(words)}
+
+        # Creation of the random embedding table.
+        generator = torch.Generator().manual_seed(seed)
+        self.vectors = torch.randn(len(words) + 1, vector_dimension, generator=generator)
+        self.vectors[0] = 0
+
+    def embed_tokens(self, tokens : list) -> "torch.Tensor":
+        '''
+            This function converts a list of tokens to a torch tensor of grade 2 (matrix).
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :return: torch.Tensor
+                    The tensor representing the word embeddings for the document.
+        '''
+        return self.vectors[torch.tensor([self.stoi.get(token, 0) for token in tokens])]
+
+    def embed_tokens_into(self, tokens : list, out : "torch.Tensor", indices : "torch.Tensor" = None) -> None:
+        '''
+            This function writes the random embeddings of a list of tokens into a preallocated tensor.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :param out: torch.Tensor
+                    The tensor of shape (max_length, vector_dimension) to write into.
+                :param indices: torch.Tensor, default = None
+                    The preallocated int64 tensor of shape (max_length,) for the token indices, if None a new one is created.
+        '''
+        if indices is None:
+            indices = torch.empty(len(tokens), dtype=torch.long)
+        indices.numpy()[:] = [self.stoi.get(token, 0) for token in tokens]
+        torch.index_select(self.vectors, 0, indices, out=out)
+
+    def embedding_vectors(self) -> "torch.Tensor":
+        '''
+            This function returns the random embedding table.
+        '''
+        return self.vectors
+
+    def token_ids(self, tokens : list) -> list:
+        '''
+            This function converts a list of tokens to their rows in the random embedding table.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :return: list
+                    The indices of the tokens, -1 for the unknown tokens.
+        '''
+        return [self.stoi.get(token, -1) for token in tokens]
+
+
+def create_embedder(vector_dimension : int = 300, max_length : int = 30, vocabulary_size : int = 20000) -> SyntheticEmbedder:
+    '''
+        This function creates the synthetic embedder with the production tokenizer.
+            :param vector_dimension: int, default = 300
+                The size of the vectors.
+            :param max_length: int, default = 30
+                The number of tokens to pad the document to.
+            :param vocabulary_size: int, default = 20000
+                The number of words in the embedding table.
+            :return: SyntheticEmbedder
+                The synthetic embedder.
+    '''
+    tokenizer = Tokenizer("nltk.wordpunct_tokenizer", lowercase=True)
+    return SyntheticEmbedder(vector_dimension, tokenizer, max_length, vocabulary_size=vocabulary_size)
+
+
+def create_model(path : str, vector_dimension : int = 300, seed : int = 0) -> LstmModel:
+    '''
+        This function creates a randomly initialized classifier and saves it like a checkpoint.
+            :param path: str
+                The path where the model is saved.
+            :param vector_dimension: int, default = 300
+                The size of the input vectors.
+            :param seed: int, default = 0
+                The seed of the random weights.
+            :return: LstmModel
+                The classifier.
+    '''
+    torch.manual_seed(seed)
+    architecture = json.loads(json.dumps(SAMPLE_ARCHITECTURE))
+    architecture["lstm_config"]["embedding_dim"] = vector_dimension
+    model = LstmModel(architecture)
+    model.eval()
+    torch.save(model, path)
+    return model
+
+
+class FakeSidecar:
+    def __init__(self, secret_key : str, register_endpoint : str = "awake", heartbeat_endpoint : str = "heartbeat",
+                 deregister_endpoint : str = "sleep") -> None:
+        '''
+            This class is a local stand-in of the ambassador sidecar. It records every POST request
+            and checks its HMAC token. Like the ambassador it answers 404 to the heartbeats of
+            services that aren't registered, and forgets the registrations when restarted.
+                :param secret_key: str
+                    The secret key of the sidecar.
+                :param register_endpoint: str, default = 'awake'
+                    The endpoint registering a service.
+                :param heartbeat_endpoint: str, default = 'heartbeat'
+                    The endpoint receiving the load reports.
+                :param deregister_endpoint: str, default = 'sleep'
+                    The endpoint removing a service.
+        '''
+        self.security_manager = SecurityManager(secret_key)
+        self.register_path = f"/{register_endpoint}"
+        self.heartbeat_path = f"/{heartbeat_endpoint}"
+        self.deregister_path = f"/{deregister_endpoint}"
+        self.requests = []
+        self.registered_services = set()
+        self.status_code = 200
+        self.port = 0
+        self.create_server()
+
+    def create_server(self) -> None:
+        '''
+            This function creates the HTTP server of the sidecar, on the same port after a restart.
+        '''
+        sidecar = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                raw_body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.loads(raw_body) if raw_body else None
+                sidecar.requests.append({
+                    "path" : self.path,
+                    "body" : body,
+                    "time" : time.time(),
+                    "authenticated" : sidecar.security_manager.verify(self.headers.get("Token", ""), raw_body)
+                })
+
+                # Registering or removing the service, or rejecting the heartbeats of unknown services.
+                name = body["general"]["name"] if body and "general" in body else None
+                status_code = sidecar.status_code
+                if status_code == 200 and self.path == sidecar.register_path:
+                    sidecar.registered_services.add(name)
+                elif status_code == 200 and self.path == sidecar.deregister_path:
+                    sidecar.registered_services.discard(name)
+                elif status_code == 200 and self.path == sidecar.heartbeat_path and name not in sidecar.registered_services:
+                    status_code = 404
+                self.send_response(status_code)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.port = self.server.server_address[1]
+
+    def start(self) -> None:
+        '''
+            This function starts serving the sidecar in a background thread.
+        '''
+        threading.Thread(target=self.server.serve_forever, name="fake-sidecar", daemon=True).start()
+
+    def stop(self) -> None:
+        '''
+            This function stops the sidecar.
+        '''
+        self.server.shutdown()
+        self.server.server_close()
+
+    def restart(self, downtime : float = 0.0) -> None:
+        '''
+            This function restarts the sidecar on the same port, losing the registrations.
+                :param downtime: float, default = 0.0
+                    The number of seconds the sidecar is unreachable.
+        '''
+        self.stop()
+        self.registered_services = set()
+        time.sleep(downtime)
+        self.create_server()
+        self.start()
+
+
+def write_config(directory : str, model_path : str, sidecar_port : int, overrides : dict = None,
+                 base_config : str = "config.ini") -> str:
+    '''
+        This function writes a configuration file pointing the service to the local stand-ins:
+        a SQLite database, the fake sidecar and the random model.
+            :param directory: str
+                The directory where the configuration and the database are created.
+            :param model_path: str
+                The path of the random model.
+            :param sidecar_port: int
+                The port of the fake sidecar.
+            :param overrides: dict, default = None
+                Additional values as {section : {key : value}}.
+            :param base_config: str, default = 'config.ini'
+                The configuration file of the service used as a template.
+            :return: str
+                The path of the written configuration file.
+    '''
+    parser = ConfigParser()
+    parser.read(base_config)
+
+    parser["database"]["uri"] = f"sqlite:///{os.path.join(os.path.abspath(directory), 'intents.db')}"
+    parser["neural-network"]["model_path"] = model_path
+    parser["service-sidecar"]["host"] = "127.0.0.1"
+    parser["service-sidecar"]["port"] = str(sidecar_port)
+    for section, values in (overrides or {}).items():
+        for key, value in values.items():
+            parser[section][key] = str(value)
+
+    config_path = os.path.join(directory, "config.ini")
+    with open(config_path, "w") as config_file:
+        parser.write(config_file)
+    return config_path
+
+
+def load_service(config_path : str, embedder : BaseWordEmbedder) -> "module":
+    '''
+        This function imports and starts the service module configured by the given file, replacing
+        the GloVe embedder created by the factory with the given embedder.
+            :param config_path: str
+                The path of the configuration file.
+            :param embedder: BaseWordEmbedder
+                The embedder used by the service.
+            :return: module
+                The imported main module of the service.
+    '''
+    from word_embedders.factory import WordEmbedderFactory
+
+    os.environ["INTENT_SERVICE_CONFIG"] = config_path
+    WordEmbedderFactory.get_word_embedding = lambda factory, word_embed_config: embedder
+
+    import main
+    main.start()
+    return main
@@ -0,0 +1,127 @@
+# Importing all needed libraries.
+import argparse
+import timeit
+import json
+import sys
+
+# Importing the internal libraries.
+from word_embedders.tokenizers import Tokenizer
+
+# Defining the tokenizer names supported by the WordEmbedderFactory.
+TOKENIZER_NAMES = [
+    "torch.basic_english",
+    "nltk.word_tokenizer",
+    "nltk.casual_tokenizer",
+    "nltk.wordpunct_tokenizer",
+    "nltk.nist_tokenizer"
+]
+
+# Defining the default corpus, chatbot utterances and the punctuation corner cases of the tokenizers.
+DEFAULT_CORPUS = [
+    "hi",
+    "Hello there!",
+    "How many calories did I burn today?",
+    "What's my goal progress... I'm curious.",
+    "show me (again) my meals: breakfast, lunch; dinner!",
+    "I don't want to do squats, it's too hard!!!",
+    "Thank you :) see you tomorrow :-D",
+    "i'm tired of \"cardio\" <br /> really",
+    "a <br\" /> b",
+    "Mr. Smith ate 2.5 kg of rice at 3:30 p.m. yesterday.",
+    "update my weight to 72,5kg and height to 1.80m",
+    "email me at user@example.com or visit https://befit.example.com/stats?id=42",
+    "@coach #fitness I'm sooooo happy today!!! 💪🔥",
+    "Ça va? Je suis très fatigué aujourd'hui.",
+    "tabs\tand\nnew lines   and   spaces",
+    "'quoted' and \"double quoted\" words",
+    "",
+    "   ",
+    "&amp; &lt;3 html entities &gt;",
+    "NO!!! why?!? ... -- ok ---",
+]
+
+
+def create_reference_tokenize_fun(name : str) -> "function":
+    '''
+        This function returns the original torchtext or nltk tokenization function.
+            :param name: str
+                The name of the tokenization function.
+            :return: function
+                The original tokenization function.
+    '''
+    if name == "torch.basic_english":
+        from torchtext.data.utils import get_tokenizer
+        return get_tokenizer("basic_english")
+    elif name == "nltk.word_tokenizer":
+        from nltk.tokenize import word_tokenize
+        return word_tokenize
+    elif name == "nltk.casual_tokenizer":
+        from nltk.tokenize import casual_tokenize
+        return casual_tokenize
+    elif name == "nltk.wordpunct_tokenizer":
+        from nltk.tokenize import wordpunct_tokenize
+        return wordpunct_tokenize
+    elif name == "nltk.nist_tokenizer":
+        from nltk.tokenize.nist import NISTTokenizer
+        return NISTTokenizer().tokenize
+    else:
+        raise Exception(f"{name} is not registered as a valid tokenizer!")
+
+
+def check_tokenizer(name : str, corpus : list, repeats : int) -> dict:
+    '''
+        This function compares the fast cached tokenizer with the original one on the corpus.
+            :param name: str
+                The name of the tokenization function.
+            :param corpus: list
+                The documents to tokenize.
+            :param repeats: int
+                The number of passes over the corpus used for the timing.
+            :return: dict
+                The mismatches and the timings of the tokenizer.
+    '''
+    reference = create_reference_tokenize_fun(name)
+    mismatches = []
+    for lowercase in [False, True]:
+        tokenizer = Tokenizer(name, lowercase=lowercase)
+        for document in corpus:
+            expected = reference(document.lower() if lowercase else document)
+
+            # Checking the uncached call, the cached call and the batch call.
+            for actual in [tokenizer(document), tokenizer(document), tokenizer.tokenize_batch([document])[0]]:
+                if actual != expected:
+                    mismatches.append({"document" : document, "lowercase" : lowercase,
+                                       "expected" : expected, "actual" : actual})
+                    break
+
+    # Measuring the original, the fast uncached and the fast cached tokenizers.
+    uncached = Tokenizer(name, cache_size=0)
+    cached = Tokenizer(name)
+    return {
+        "tokenizer" : name,
+        "documents" : len(corpus),
+        "mismatches" : mismatches,
+        "reference_us" : timeit.timeit(lambda: [reference(d) for d in corpus], number=repeats) / repeats / len(corpus) * 1e6,
+        "fast_us" : timeit.timeit(lambda: [uncached(d) for d in corpus], number=repeats) / repeats / len(corpus) * 1e6,
+        "cached_us" : timeit.timeit(lambda: [cached(d) for d in corpus], number=repeats) / repeats / len(corpus) * 1e6
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conformance check of the fast tokenizers against the originals.")
+    parser.add_argument("--corpus", help="A file with one document per line, the built-in corpus is used by default.")
+    parser.add_argument("--tokenizers", nargs="+", default=TOKENIZER_NAMES)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = DEFAULT_CORPUS
+    if args.corpus is not None:
+        with open(args.corpus, "r", encoding="utf-8") as corpus_file:
+            corpus = [line.rstrip("\n") for line in corpus_file]
+
+    results = [check_tokenizer(name, corpus, args.repeats) for name in args.tokenizers]
+    json.dump({"benchmark" : "tokenizer_conformance", "results" : results}, sys.stdout, indent=4, ensure_ascii=False)
+    print()
+
+    # Failing if any fast tokenizer doesn't produce the same tokens as the original.
+    sys.exit(1 if any(result["mismatches"] for result in results) else 0)
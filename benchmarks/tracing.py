@@ -0,0 +1,165 @@
+# Importing all needed libraries.
+import argparse
+import tempfile
+import time
+import json
+import sys
+import os
+
+# Importing the internal libraries.
+from benchmarks.common import summarize, environment, SAMPLE_UTTERANCES
+from benchmarks import standins
+from config import ConfigManager
+
+# Defining the spans every served /intent request must have.
+EXPECTED_SPANS = {"intent", "auth", "validation", "admission", "queue_wait", "tokenize", "embed", "forward", "db_write"}
+
+
+def send_requests(service : "module", request_number : int, correlation_prefix : str) -> list:
+    '''
+        This function sends signed /intent requests through the Flask test client.
+            :param service: module
+                The imported service.
+            :param request_number: int
+                The number of requests.
+            :param correlation_prefix: str
+                The prefix of the correlation ids.
+            :return: list
+                The latency of every request.
+    '''
+    client = service.app.test_client()
+    latencies = []
+    for index in range(request_number):
+        body = json.dumps({"text" : SAMPLE_UTTERANCES[index % len(SAMPLE_UTTERANCES)],
+                           "correlation_id" : f"{correlation_prefix}-{index}"}).encode()
+        headers = {"Token" : service.security_manager.encode_hmac_bytes(body), "Content-Type" : "application/json"}
+        start = time.perf_counter()
+        response = client.get("/intent", data=body, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise Exception(f"The request failed with status {response.status_code}!")
+    return latencies
+
+
+def check_malformed_trace_ids(service : "module") -> bool:
+    '''
+        This function checks that malformed B3 headers are ignored: the requests are served, and
+        their trace id is derived from the correlation id instead of the header.
+            :param service: module
+                The imported service.
+            :return: bool
+                True if every request was served with a valid trace id.
+    '''
+    client = service.app.test_client()
+    valid = True
+    for index, trace_id in enumerate(["not-hex", "80F198EE56343BA864FE8B2A57D3EFF7", "0" * 33, "a" * 4096]):
+        body = json.dumps({"text" : SAMPLE_UTTERANCES[0], "correlation_id" : f"malformed-{index}"}).encode()
+        headers = {"Token" : service.security_manager.encode_hmac_bytes(body), "Content-Type" : "application/json",
+                   "X-B3-TraceId" : trace_id, "X-B3-SpanId" : trace_id}
+        response = client.get("/intent", data=body, headers=headers)
+        expected_trace_id = service.tracer.trace_id({}, f"malformed-{index}")
+        valid = valid and response.status_code == 200 and response.headers.get("X-B3-TraceId") == expected_trace_id
+    return valid
+
+
+def check_traces(trace_path : str, correlation_prefix : str) -> dict:
+    '''
+        This function checks the exported spans of the fully sampled requests.
+            :param trace_path: str
+                The file with the spans, one Zipkin v2 span per line.
+            :param correlation_prefix: str
+                The prefix of the correlation ids of the checked requests.
+            :return: dict
+                The checks and the mean duration of every span.
+    '''
+    with open(trace_path) as trace_file:
+        spans = [json.loads(line) for line in trace_file]
+
+    traces = dict()
+    for span in spans:
+        traces.setdefault(span["traceId"], []).append(span)
+
+    checked_traces = [trace for trace in traces.values()
+                      if any(span["tags"].get("correlation_id", "").startswith(correlation_prefix) for span in trace)]
+    complete, nested = True, True
+    durations = dict()
+    for trace in checked_traces:
+        root = [span for span in trace if "parentId" not in span][0]
+        complete = complete and {span["name"] for span in trace} >= EXPECTED_SPANS
+        for span in trace:
+            durations.setdefault(span["name"], []).append(span["duration"] / 1e6)
+            if span is root:
+                continue
+            # Every child must reference the root and lie inside it, with 1 microsecond of rounding.
+            nested = nested and span["parentId"] == root["id"] and span["timestamp"] >= root["timestamp"] - 1 \
+                     and span["timestamp"] + span["duration"] <= root["timestamp"] + root["duration"] + 2
+    return {
+        "traces" : len(checked_traces),
+        "complete" : complete,
+        "nested" : nested,
+        "span_durations" : {name : summarize(values) for name, values in durations.items()}
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tracing overhead for several sample rates and check of the exported spans.")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[0.0, 0.01, 1.0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--vector-dimension", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="The file where the JSON results are written, stdout by default.")
+    args = parser.parse_args()
+
+    # Starting the service with the tracing exported to a temporary file.
+    directory = tempfile.mkdtemp(prefix="intent-tracing-")
+    model_path = os.path.join(directory, "model.pth")
+    trace_path = os.path.join(directory, "traces.jsonl")
+    standins.create_model(model_path, args.vector_dimension, args.seed)
+    sidecar = standins.FakeSidecar(ConfigManager(args.config).service_sidecar.secret_key)
+    sidecar.start()
+    config_path = standins.write_config(directory, model_path, sidecar.port, {
+        "neural-network" : {"coalesce_requests" : "false"},
+        "tracing" : {"enabled" : "true", "exporter" : "file", "output_path" : trace_path},
+        "heartbeat" : {"enabled" : "false"}
+    }, base_config=args.config)
+    service = standins.load_service(config_path, standins.create_embedder(args.vector_dimension))
+    send_requests(service, 20, "warm-up")
+
+    # Measuring the latency of the requests for every sample rate.
+    scenarios = dict()
+    for sample_rate in args.sample_rates:
+        service.tracer.sample_rate = sample_rate
+        traced_before = service.tracer.traced_request_number
+        scenarios[str(sample_rate)] = summarize(send_requests(service, args.requests, f"rate-{sample_rate}"))
+        scenarios[str(sample_rate)]["traced_requests"] = service.tracer.traced_request_number - traced_before
+
+    # Checking the spans of a fully sampled run.
+    service.tracer.sample_rate = 1.0
+    send_requests(service, 20, "check")
+    malformed_trace_ids_ignored = check_malformed_trace_ids(service)
+    service.tracer.close(10.0)
+    checks = check_traces(trace_path, "check")
+    checks["malformed_trace_ids_ignored"] = malformed_trace_ids_ignored
+
+    service.TASK_EXECUTOR.set_worker_number(0)
+    sidecar.stop()
+
+    results = {
+        "benchmark" : "tracing",
+        "environment" : environment(),
+        "parameters" : vars(args),
+        "scenarios" : scenarios,
+        "checks" : checks,
+        "tracer" : service.tracer.statistics()
+    }
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Failing if the spans are incomplete or badly nested or a malformed header broke a request.
+    sys.exit(0 if checks["traces"] == 20 and checks["complete"] and checks["nested"]
+             and checks["malformed_trace_ids_ignored"] else 1)
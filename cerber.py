@@ -1,5 +1,4 @@
 # Importing all needed libraries.
-import json
 import hmac
 import hashlib
 
@@ -13,43 +12,52 @@ class SecurityManager:
         '''
         self.key = str.encode(key)
 
-    def __encode_hmac(self, request_body) -> str:
+        # Precomputing the keyed HMAC state, it is copied for every request instead of
+        # hashing the key again.
+        self.hmac_state = hmac.new(self.key, digestmod=hashlib.sha256)
+
+        # The requests without a body were signed over json.dumps(None) before the raw body was
+        # authenticated, so the legacy signature of an empty body is accepted too.
+        self.empty_body_hmacs = [self.encode_hmac_bytes(b""), self.encode_hmac_bytes(b"null")]
+
+    def encode_hmac_bytes(self, request_body : bytes) -> str:
         '''
-            This function calculates the HMAC of the request body and returns it.
-                :param request_body: dict
-                    The body of the request.
-                :return json_hmac: str
+            This function calculates the HMAC of the raw request body and returns it.
+                :param request_body: bytes
+                    The raw body of the request.
+                :return: str
                     The HMAC of the request body.
         '''
-        request_body_binary = json.dumps(request_body).encode()
-        json_hmac = hmac.new(self.key, request_body_binary, hashlib.sha256).hexdigest()
+        request_hmac = self.hmac_state.copy()
+        request_hmac.update(request_body)
 
-        return json_hmac
+        return request_hmac.hexdigest()
 
-    def verify(self, token : str, request_body : dict) -> bool:
+    def verify(self, token : str, request_body : bytes) -> bool:
         '''
             This function authenticates the request body.
                 :param token: str
                     The token sent with the request from the headers.
-                :param request_body: dict
-                    The body of the request.
+                :param request_body: bytes
+                    The raw body of the request.
         '''
+        # Verifying the HMAC of an empty body against its current and its legacy signature.
+        if not request_body:
+            return any([hmac.compare_digest(token.encode(), empty_body_hmac.encode()) for empty_body_hmac in self.empty_body_hmacs])
+
         # Compuiting the HMAC o the request body.
-        request_hmac = self.__encode_hmac(request_body)
+        request_hmac = self.encode_hmac_bytes(request_body)
 
-        # Verifying the request HMAC.
-        if token == request_hmac:
-            return True
-        else:
-            return False
+        # Verifying the request HMAC in constant time.
+        return hmac.compare_digest(token.encode(), request_hmac.encode())
 
-    def check_access_token(self, header_dict : dict):
+    def check_access_token(self, headers : "Headers"):
         '''
             This function check is the authentication token is present.
-                :param header_dict: dict
-                    The header dictionary of the request.
+                :param headers: Headers
+                    The headers of the request.
         '''
-        if "Token" not in header_dict:
+        if "Token" not in headers:
             return {
                 "message" : "Missing Authorization token!",
                 "code" : 401
@@ -60,13 +68,14 @@ class SecurityManager:
     def check_request(self, request):
         '''
             This function implements the HMAC authentication of the request.
+            The HMAC is computed over the raw bytes of the body as they were sent.
         '''
         # Checking the presence of the authentication token.
-        check_response = self.check_access_token(dict(request.headers))
+        check_response = self.check_access_token(request.headers)
 
         if check_response != "OK":
             return check_response
-        elif not self.verify(request.headers["token"], request.json):
+        elif not self.verify(request.headers["Token"], request.get_data(cache=True)):
             # If the request didn't passed the HMAC authentication a 401 status error code is returned.
             return {
                 "message" : "401 Unauthorized",
@@ -74,4 +83,3 @@ class SecurityManager:
             }
         else:
             return "OK"
-
@@ -31,6 +31,19 @@ class BaseConfig:
     pass
 
 
+def get_database_uri(database_config : BaseConfig) -> str:
+    '''
+        This function returns the sqlalchemy database uri, an explicit uri overrides the PostgreSQL settings.
+            :param database_config: BaseConfig
+                The database configurations.
+            :return: str
+                The sqlalchemy database uri.
+    '''
+    if hasattr(database_config, "uri"):
+        return database_config.uri
+    return f"postgresql://{database_config.username}:{database_config.password}@{database_config.host}/{database_config.table}"
+
+
 class Service:
     def __init__(self, service_config : dict) -> None:
         '''
@@ -104,6 +117,8 @@ class ConfigManager:
             for key in config_dict:
                 if config_dict[key].replace(".", "").isnumeric() and config_dict[key].count(".")<=1:
                     value = float(config_dict[key]) if "." in config_dict[key] else int(config_dict[key])
+                elif config_dict[key].lower() in ["true", "false"]:
+                    value = config_dict[key].lower() == "true"
                 else:
                     value = config_dict[key]
                 setattr(
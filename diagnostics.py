@@ -0,0 +1,92 @@
+# Importing all needed libraries.
+import tracemalloc
+import threading
+import psutil
+import gc
+import re
+import os
+
+
+class MemoryDiagnostics:
+    def __init__(self, config : "BaseConfig") -> None:
+        '''
+            This class collects the memory and thread statistics of the process, used to attribute
+            the growth of the RSS on long running pods. With tracemalloc enabled it also reports
+            the top allocators and the allocations that grew since the diagnostics started.
+                :param config: BaseConfig
+                    The debug configurations.
+        '''
+        self.config = config
+        self.process = psutil.Process(os.getpid())
+        self.baseline = None
+
+        # Taking the baseline also if the tracing was started by PYTHONTRACEMALLOC or -X tracemalloc.
+        if config.tracemalloc or tracemalloc.is_tracing():
+            self.start_tracing(config.tracemalloc_frames)
+
+    def start_tracing(self, frames : int = 1) -> None:
+        '''
+            This function starts tracing the Python allocations and takes the baseline snapshot.
+                :param frames: int, default = 1
+                    The number of frames kept for every allocation.
+        '''
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = self.take_snapshot()
+
+    def take_snapshot(self) -> "tracemalloc.Snapshot":
+        '''
+            This function takes a tracemalloc snapshot without the allocations of tracemalloc itself.
+        '''
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ])
+
+    def thread_statistics(self) -> dict:
+        '''
+            This function returns the number of live threads, grouped by their name with the numbers removed.
+        '''
+        threads = threading.enumerate()
+        groups = dict()
+        for thread in threads:
+            name = re.sub(r"\d+", "N", thread.name)
+            groups[name] = groups.get(name, 0) + 1
+        return {"count" : len(threads), "daemon" : sum(1 for thread in threads if thread.daemon), "names" : groups}
+
+    def statistics(self, top : int = None) -> dict:
+        '''
+            This function returns the memory statistics of the process.
+                :param top: int, default = None
+                    The number of top allocators, if None the configured number is used.
+                :return: dict
+                    The RSS, the garbage collector counters, the threads and the tracemalloc statistics,
+                    the growth is None if the tracing started after the diagnostics.
+        '''
+        top = self.config.top_allocators if top is None else top
+        memory_info = self.process.memory_info()
+        statistics = {
+            "rss_bytes" : memory_info.rss,
+            "vms_bytes" : memory_info.vms,
+            "gc_counts" : gc.get_count(),
+            "threads" : self.thread_statistics(),
+            "tracemalloc" : None
+        }
+
+        if tracemalloc.is_tracing():
+            traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            snapshot = self.take_snapshot()
+            statistics["tracemalloc"] = {
+                "traced_bytes" : traced_bytes,
+                "peak_bytes" : peak_bytes,
+                "top_allocators" : [
+                    {"location" : str(statistic.traceback), "size_bytes" : statistic.size, "count" : statistic.count}
+                    for statistic in snapshot.statistics("lineno")[:top]
+                ],
+                "top_growth" : [
+                    {"location" : str(statistic.traceback), "size_diff_bytes" : statistic.size_diff, "count_diff" : statistic.count_diff}
+                    for statistic in snapshot.compare_to(self.baseline, "lineno")[:top]
+                ] if self.baseline is not None else None
+            }
+        return statistics
@@ -0,0 +1,62 @@
+# Importing all needed libraries.
+import threading
+import time
+
+
+class DrainGate:
+    def __init__(self) -> None:
+        '''
+            This class admits the requests and counts the ones in flight, so the service can stop
+            admitting new requests on shutdown and wait until the admitted ones are answered,
+            including their database writes.
+        '''
+        self.condition = threading.Condition()
+        self.draining = False
+        self.in_flight_number = 0
+        self.rejected_number = 0
+
+    def enter(self) -> bool:
+        '''
+            This function admits a request.
+                :return: bool
+                    True if the request is admitted, False if the service is draining.
+        '''
+        with self.condition:
+            if self.draining:
+                self.rejected_number += 1
+                return False
+            self.in_flight_number += 1
+            return True
+
+    def exit(self) -> None:
+        '''
+            This function marks an admitted request as answered.
+        '''
+        with self.condition:
+            self.in_flight_number -= 1
+            if self.in_flight_number == 0:
+                self.condition.notify_all()
+
+    def close(self) -> None:
+        '''
+            This function stops admitting new requests.
+        '''
+        with self.condition:
+            self.draining = True
+
+    def wait_idle(self, timeout : float) -> bool:
+        '''
+            This function waits until all admitted requests are answered.
+                :param timeout: float
+                    The maximal number of seconds to wait.
+                :return: bool
+                    True if no request is in flight anymore.
+        '''
+        deadline = time.perf_counter() + timeout
+        with self.condition:
+            while self.in_flight_number > 0:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
@@ -0,0 +1,137 @@
+# Importing all needed libraries.
+import threading
+import psutil
+import time
+
+
+class ExecutorAutoscaler:
+    def __init__(self, task_executor : "TaskExecutorManager", config : "BaseConfig") -> None:
+        '''
+            This class implements the controller that grows and shrinks the Task Executor Manager
+            depending on the queue length, the queue waiting time and the CPU utilization.
+            A scaling action happens only after the same signal was observed for several
+            consecutive intervals (hysteresis), followed by a cooldown period. The number of
+            workers is kept between the bounds of the Task Executor Manager.
+                :param task_executor: TaskExecutorManager
+                    The Task Executor Manager to scale.
+                :param config: BaseConfig
+                    The autoscaling configurations.
+        '''
+        self.task_executor = task_executor
+        self.config = config
+
+        # Setting up the hysteresis state.
+        self.scale_up_streak = 0
+        self.scale_down_streak = 0
+        self.hold_until = 0.0
+        self.hold_lock = threading.Lock()
+        self.failed_step_number = 0
+
+        # Priming the CPU utilization counter, the first call of cpu_percent always returns 0.
+        psutil.cpu_percent(None)
+
+    def start(self) -> None:
+        '''
+            This function starts the autoscaling controller in a background thread.
+        '''
+        threading.Thread(target=self.run, name="intent-autoscaler", daemon=True).start()
+        print(f"autoscaler started: workers=[{self.task_executor.min_workers}, {self.task_executor.max_workers}], "
+              f"batch_size=[1, {self.config.max_batch_size}]")
+
+    def hold(self, seconds : float = None) -> None:
+        '''
+            This function pauses the autoscaling decisions, used when the service is scaled manually.
+                :param seconds: float, default = None
+                    The number of seconds to pause for, if None the configured override hold is used.
+        '''
+        with self.hold_lock:
+            self.hold_until = time.perf_counter() + (self.config.override_hold if seconds is None else seconds)
+            self.scale_up_streak = 0
+            self.scale_down_streak = 0
+
+    def run(self) -> None:
+        '''
+            This function periodically observes the Task Executor Manager and scales it.
+            A failed decision is logged and counted, the next interval tries again.
+        '''
+        while True:
+            time.sleep(self.config.interval)
+            with self.hold_lock:
+                if time.perf_counter() < self.hold_until:
+                    continue
+            try:
+                self.step()
+            except Exception as e:
+                self.failed_step_number += 1
+                print(f"autoscaler: the scaling decision failed with {e!r}")
+
+    def step(self) -> None:
+        '''
+            This function makes one scaling decision based on the current signals.
+        '''
+        # Collecting the signals.
+        queue_length = self.task_executor.scheduler.qsize()
+        queue_waiting_time = self.task_executor.scheduler.oldest_queue_age()
+        cpu_utilization = psutil.cpu_percent(None)
+        worker_statistics = self.task_executor.worker_statistics()
+        signals = f"queue_length={queue_length}, queue_waiting_time={queue_waiting_time:.3f}, " \
+                  f"cpu_utilization={cpu_utilization}, workers={worker_statistics['workers']}, " \
+                  f"batch_size={worker_statistics['batch_size']}"
+
+        # Updating the hysteresis streaks.
+        if queue_length > self.config.scale_up_queue_length or queue_waiting_time > self.config.scale_up_queue_waiting_time:
+            self.scale_up_streak += 1
+            self.scale_down_streak = 0
+        elif queue_length <= self.config.scale_down_queue_length and queue_waiting_time < self.config.scale_down_queue_waiting_time:
+            self.scale_down_streak += 1
+            self.scale_up_streak = 0
+        else:
+            self.scale_up_streak = 0
+            self.scale_down_streak = 0
+
+        if self.scale_up_streak >= self.config.scale_up_intervals:
+            self.scale_up(worker_statistics, cpu_utilization, signals)
+        elif self.scale_down_streak >= self.config.scale_down_intervals:
+            self.scale_down(worker_statistics, signals)
+
+    def scale_up(self, worker_statistics : dict, cpu_utilization : float, signals : str) -> None:
+        '''
+            This function grows the Task Executor Manager. New workers are added while the CPU
+            has spare capacity, otherwise the batch size is doubled to amortize the model calls.
+                :param worker_statistics: dict
+                    The current state of the workers.
+                :param cpu_utilization: float
+                    The current CPU utilization in percents.
+                :param signals: str
+                    The description of the observed signals for the log.
+        '''
+        if cpu_utilization < self.config.cpu_limit and self.task_executor.increase() is not None:
+            print(f"autoscaler: increased workers to {worker_statistics['target_workers'] + 1} ({signals})")
+        elif worker_statistics["batch_size"] < self.config.max_batch_size:
+            batch_size = min(worker_statistics["batch_size"] * 2, self.config.max_batch_size)
+            self.task_executor.set_batch_size(batch_size)
+            print(f"autoscaler: increased batch size to {batch_size} ({signals})")
+        else:
+            print(f"autoscaler: at the upper bounds, no scaling ({signals})")
+        self.hold(self.config.cooldown)
+
+    def scale_down(self, worker_statistics : dict, signals : str) -> None:
+        '''
+            This function shrinks the Task Executor Manager. The batch size is reduced first
+            and after it the workers are stopped.
+                :param worker_statistics: dict
+                    The current state of the workers.
+                :param signals: str
+                    The description of the observed signals for the log.
+        '''
+        if worker_statistics["batch_size"] > 1:
+            batch_size = max(worker_statistics["batch_size"] // 2, 1)
+            self.task_executor.set_batch_size(batch_size)
+            print(f"autoscaler: decreased batch size to {batch_size} ({signals})")
+        elif self.task_executor.decrease() is not None:
+            print(f"autoscaler: decreased workers to {worker_statistics['target_workers'] - 1} ({signals})")
+        else:
+            # Nothing to shrink, the streak is reset without logging to keep the idle log quiet.
+            self.scale_down_streak = 0
+            return
+        self.hold(self.config.cooldown)
@@ -0,0 +1,60 @@
+# Importing all needed libraries.
+import torch
+
+
+class BatchBuffer:
+    def __init__(self, max_length : int, vector_dimension : int = None, batch_size : int = 1) -> None:
+        '''
+            This class is the preallocated input tensor of one worker. The embedder writes the batch
+            directly into it and the model reads a view of it, so assembling a batch doesn't allocate
+            new tensors. The buffer of the embeddings also keeps the token indices used for the lookup
+            of the embeddings. It grows only when the batch size grows.
+                :param max_length: int
+                    The number of tokens of every document.
+                :param vector_dimension: int, default = None
+                    The size of the embeddings, if None the buffer holds the token indices.
+                :param batch_size: int, default = 1
+                    The initial number of documents.
+        '''
+        self.max_length = max_length
+        self.vector_dimension = vector_dimension
+        self.allocation_number = 0
+        self.allocate(batch_size)
+
+    def allocate(self, batch_size : int) -> None:
+        '''
+            This function allocates the tensor for the given number of documents.
+                :param batch_size: int
+                    The number of documents.
+        '''
+        if self.vector_dimension is None:
+            self.tensor = torch.zeros(batch_size, self.max_length, dtype=torch.long)
+            self.indices = None
+        else:
+            self.tensor = torch.zeros(batch_size, self.max_length, self.vector_dimension)
+            self.indices = torch.zeros(batch_size, self.max_length, dtype=torch.long)
+        self.allocation_number += 1
+
+    def get(self, batch_size : int) -> "torch.Tensor":
+        '''
+            This function returns the view of the buffer for a batch.
+                :param batch_size: int
+                    The number of documents in the batch.
+                :return: torch.Tensor
+                    The contiguous view of the first batch_size documents.
+        '''
+        if batch_size > self.tensor.shape[0]:
+            self.allocate(batch_size)
+        return self.tensor[:batch_size]
+
+    def get_indices(self, batch_size : int) -> "torch.Tensor":
+        '''
+            This function returns the view of the token indices for a batch.
+                :param batch_size: int
+                    The number of documents in the batch.
+                :return: torch.Tensor
+                    The token indices of shape (batch_size, max_length) or None if the buffer holds the indices.
+        '''
+        if batch_size > self.tensor.shape[0]:
+            self.allocate(batch_size)
+        return self.indices[:batch_size] if self.indices is not None else None
@@ -1,12 +1,21 @@
 # Importing all needed libraries.
-import json
-from queue import PriorityQueue, Queue
+import itertools
+import math
+import time
 import threading
 import torch
 
+# Importing the internal libraries.
+from .scheduler import TaskScheduler
+from .service_rate import ServiceRateEstimator
+from .buffers import BatchBuffer
+from .workers import Worker
+from .model_registry import load_model_version, DEFAULT_SMOKE_TEXTS
+
 
 class TaskExecutorManager:
-    def __init__(self, config : "ConfigManager", word_embedder : "WordEmbeder") -> None:
+    def __init__(self, config : "ConfigManager", word_embedder : "WordEmbeder", priority_classes : dict,
+                 profiler : "SlowRequestProfiler" = None, shadow : "ShadowEvaluator" = None) -> None:
         '''
             This function creates and sets up the Task Executor Manager.
             Task Executor Manager executes all tasks that come to the service.
@@ -14,149 +23,625 @@ class TaskExecutorManager:
                     The configuration manager.
                 :parma word_embedder: WordEmbedder
                     THe Word Embedding object used to get the embeddings from text.
+                :param priority_classes: dict
+                    The mapping from priority class name to its rank, lower rank is served first.
+                :param profiler: SlowRequestProfiler, default = None
+                    The sampling profiler of the slowest requests, if None the workers aren't profiled.
+                :param shadow: ShadowEvaluator, default = None
+                    The evaluator of a second model on a sample of the batches, if None no shadow model runs.
         '''
-        # Setting up the neural network and word embedding dependencies.
-        self.model = torch.load(config.model_path)
-        self.model.eval()
-        self.index2intent_mapper = json.load(open(config.index2intent_mapper_path, "r"))
+        # Setting up the word embedding dependencies.
+        # With the fused embedding the model looks up the embeddings itself and takes the token indices.
         self.word_embedder = word_embedder
+        self.embedding_vectors = None
+        if config.fused_embedding:
+            self.embedding_vectors = word_embedder.embedding_vectors()
+            if self.embedding_vectors is None:
+                raise Exception(f"{word_embedder.__class__.__name__} doesn't have a static embedding table to fuse with the model!")
+
+        # Setting up the neural network dependencies.
+        # The model and its mapper are kept together, so they can be replaced at once.
+        self.onnx_intra_op_threads = config.onnx_intra_op_threads
+        self.model_version = load_model_version(config.model_path, config.index2intent_mapper_path, config.backend,
+                                                self.onnx_intra_op_threads, self.embedding_vectors)
+
+        # Every worker assembles its batches in its own preallocated input buffer if enabled.
+        self.input_buffers = config.input_buffers
+        self.profiler = profiler
+        self.shadow = shadow
 
         # Setting up the concurrency dependencies.
+        # The task number limit is the target number of workers, kept between the bounds on scaling.
         self.task_number_limit = config.task_number_limit
+        self.min_workers = config.min_workers
+        self.max_workers = config.max_workers
+        self.worker_stop_timeout = config.worker_stop_timeout
         self.active_task_number = 0
-        self.priority_queue = PriorityQueue()
-        self.stop_process_queue = Queue()
-        self.stop_process_queue_lock = threading.Lock()
-        self.priority_queue_lock = threading.Lock()
+        self.busy_worker_number = 0
+        self.batch_size = config.batch_size
+        self.scheduler = TaskScheduler(priority_classes, config.default_priority, config.queue_age_window,
+                                       on_expire=self.release_followers)
+        self.scheduler_poll_interval = config.scheduler_poll_interval
+
+        # Setting up the admission control dependencies.
+        self.queue_size_limit = config.queue_size_limit
+        self.max_retry_after = config.max_retry_after
+        self.shed_task_number = 0
+        self.service_rate = ServiceRateEstimator(config.service_rate_window)
+
+        # Setting up the single-flight dependencies, identical texts in flight share one inference.
+        self.coalesce_requests = config.coalesce_requests
+        self.in_flight_tasks = dict()
+        self.in_flight_lock = threading.Lock()
+        self.admitted_task_number = 0
+        self.coalesced_task_number = 0
         self.task_number_limit_lock = threading.Lock()
 
-        # Starting the prediction threads.
-        for _ in range(self.task_number_limit):
-            threading.Thread(target=self.execute).start()
+        # Starting the prediction workers, they are registered by name to be stopped and joined one by one.
+        # The scaling actions are serialized, so concurrent calls can't miss or double their target.
+        self.workers = dict()
+        self.worker_counter = itertools.count(1)
+        self.failed_worker_number = 0
+        self.failed_batch_number = 0
+        self.restarted_worker_number = 0
+        self.scale_lock = threading.RLock()
+        self.set_worker_number(self.task_number_limit)
         print("threads started")
 
-    def available_process_num(self) -> int:
+    def try_add_to_queue(self, task : "Task") -> bool:
         '''
-            This function returns the number of available threads for processing.
-                :return: int
-                    The number of available processes.
+            This function adds a Task to the execution queue if the queue isn't full.
+            Rejected tasks are counted as shed.
+                :param task: Task
+                    The task that is submitted to execution by the service.
+                :return: bool
+                    True if the task was accepted, False if it was rejected.
         '''
-        # Acquiring the queue and task number limit Locks.
-        self.priority_queue_lock.acquire()
-        self.task_number_limit_lock.acquire()
+        with self.in_flight_lock:
+            # Attaching the task to the identical task already queued or being processed.
+            leader = self.in_flight_tasks.get(task.text) if self.coalesce_requests else None
+            if leader is not None and self.can_follow(task, leader):
+                task.compute_lock_time()
+                task.set_timer_queue_waiting_time()
+                task.coalesced = True
+                leader.followers.append(task)
+                self.admitted_task_number += 1
+                self.coalesced_task_number += 1
+                return True
 
-        # Calculating the number of processes registered in the Task Executor.
-        process_num = self.active_task_number + self.priority_queue.qsize()
+            if not self.scheduler.try_put(task, self.queue_size_limit):
+                self.shed_task_number += 1
+                return False
 
-        # Releasing the queue and task number limit Locks.
-        self.task_number_limit_lock.release()
-        self.priority_queue_lock.release()
-        return self.task_number_limit - process_num
+            # Registering the task as the leader of its text.
+            self.admitted_task_number += 1
+            if self.coalesce_requests and leader is None:
+                self.in_flight_tasks[task.text] = task
+            return True
 
-    def add_to_queue(self, task : "Task") -> None:
+    def can_follow(self, task : "Task", leader : "Task") -> bool:
         '''
-            This function adds a Task to the execution queue.
+            This function checks that attaching a task to an identical one can't make it slower:
+            the leader must have the same or a higher priority and must not expire before the task.
+            The deadline of the task itself is checked when the leader releases it.
                 :param task: Task
-                    The task that is submitted to execution by the service.
+                    The task to attach.
+                :param leader: Task
+                    The identical task in flight.
+                :return: bool
+                    True if the task can reuse the result of the leader.
+        '''
+        if self.scheduler.priority_rank(leader.priority) > self.scheduler.priority_rank(task.priority):
+            return False
+        if task.return_scores and not leader.return_scores:
+            return False
+        if leader.deadline is None:
+            return True
+        return task.deadline is not None and task.deadline <= leader.deadline
+
+    def release_followers(self, leader : "Task") -> None:
         '''
-        # Acquiring the task number limit lock and checking the availability for new task.
-        self.task_number_limit_lock.acquire()
-        if self.active_task_number + self.priority_queue.qsize() < self.task_number_limit:
+            This function removes a finished, expired or failed task from the in flight tasks and
+            hands its result to the tasks attached to it. The attached tasks whose deadline has
+            passed are expired instead.
+                :param leader: Task
+                    The finished, expired or failed task.
+        '''
+        with self.in_flight_lock:
+            if self.in_flight_tasks.get(leader.text) is leader:
+                del self.in_flight_tasks[leader.text]
+            followers = leader.followers
+            leader.followers = []
+
+        for follower in followers:
+            # Dropping a follower whose own deadline passed while it waited for the leader,
+            # like the scheduler drops a queued task.
+            follower_expired = not leader.expired and follower.is_expired()
+            if follower_expired:
+                with self.scheduler.condition:
+                    self.scheduler.expired_task_number += 1
+            with follower.condition:
+                if leader.expired or follower_expired:
+                    follower.expire()
+                elif leader.failed:
+                    follower.fail(leader.error)
+                else:
+                    follower.follow(leader)
+                    follower.notify()
+
+    def coalesce_rate(self) -> float:
+        '''
+            This function returns the share of the admitted tasks that reused the result of an identical task.
+        '''
+        if self.admitted_task_number == 0:
+            return 0.0
+        return self.coalesced_task_number / self.admitted_task_number
 
-            # Adding the task to the execution queue.
-            self.priority_queue_lock.acquire()
+    def retry_after(self) -> int:
+        '''
+            This function estimates after how many seconds a rejected client should retry,
+            as the time needed to serve the current queue at the measured service rate.
+                :return: int
+                    The number of seconds to wait.
+        '''
+        service_rate = self.service_rate.rate()
+        if not service_rate:
+            return self.max_retry_after
+        retry_after = math.ceil((self.scheduler.qsize() + 1) / service_rate)
+        return min(max(retry_after, 1), self.max_retry_after)
+
+    def queue_statistics(self) -> dict:
+        '''
+            This function returns the statistics of the execution queue used to detect starvation.
+                :return: dict
+                    The queue length, the number of expired tasks and the queue waiting time percentiles.
+        '''
+        return {
+            "waiting_queue_length" : self.scheduler.qsize(),
+            "queue_size_limit" : self.queue_size_limit,
+            "expired_tasks" : self.scheduler.expired_task_number,
+            "shed_tasks" : self.shed_task_number,
+            "coalesced_tasks" : self.coalesced_task_number,
+            "coalesce_rate" : self.coalesce_rate(),
+            "service_rate" : self.service_rate.rate(),
+            "queue_waiting_time_percentiles" : self.scheduler.queue_age_percentiles()
+        }
 
-            # Computing the compute lock time and queue waiting time.
-            task.compute_lock_time()
-            task.set_timer_queue_waiting_time()
-            self.priority_queue.put((-task.arrival_time, task))
-            self.priority_queue_lock.release()
-        self.task_number_limit_lock.release()
+    def worker_statistics(self) -> dict:
+        '''
+            This function returns the current state of the execution workers.
+                :return: dict
+                    The number of running workers and their names, the target number of workers,
+                    the number of workers still finishing their batch after a stop, the number of
+                    failed workers and batches, the number of replaced workers, the number of busy
+                    workers and the batch size.
+        '''
+        with self.task_number_limit_lock:
+            workers = [worker for worker in self.workers.values() if worker.is_alive()]
+            running_workers = [worker.name for worker in workers if not worker.stopping()]
+            return {
+                "workers" : len(running_workers),
+                "target_workers" : self.task_number_limit,
+                "stopping_workers" : len(workers) - len(running_workers),
+                "failed_workers" : self.failed_worker_number,
+                "failed_batches" : self.failed_batch_number,
+                "restarted_workers" : self.restarted_worker_number,
+                "busy_workers" : self.busy_worker_number,
+                "batch_size" : self.batch_size,
+                "worker_names" : running_workers
+            }
+
+    def create_buffer(self) -> BatchBuffer:
+        '''
+            This function creates the input buffer of a worker, holding the embeddings or the token
+            indices if the model is fused with the embedding table.
+        '''
+        vector_dimension = None if self.embedding_vectors is not None else self.word_embedder.vector_dimension
+        return BatchBuffer(self.word_embedder.max_length, vector_dimension, self.batch_size)
+
+    def create_inputs(self, batch_tokens : list, tasks : list = None, buffer : BatchBuffer = None) -> "torch.Tensor":
+        '''
+            This function converts the tokens of a batch to the input of the model: the embeddings, or
+            the token indices if the model is fused with the embedding table.
+                :param batch_tokens: list
+                    The tokens of every text in the batch.
+                :param tasks: list, default = None
+                    The tasks of the batch, if set the embedding stage is recorded for every task.
+                :param buffer: BatchBuffer, default = None
+                    The preallocated buffer written by the embedder, if None new tensors are created.
+                :return: torch.Tensor
+                    The embeddings of shape (batch, sequence, vector_dimension) or the token indices
+                    of shape (batch, sequence).
+        '''
+        if buffer is not None:
+            inputs = buffer.get(len(batch_tokens))
+            input_array = inputs.numpy()
+            indices = buffer.get_indices(len(batch_tokens))
+        else:
+            inputs = []
+
+        for index, tokens in enumerate(batch_tokens):
+            if tasks is not None:
+                tasks[index].start_stage("embed")
+            if self.embedding_vectors is not None:
+                if buffer is not None:
+                    input_array[index] = self.word_embedder.token_ids(tokens)
+                else:
+                    inputs.append(self.word_embedder.token_ids(tokens))
+            else:
+                if buffer is not None:
+                    self.word_embedder.embed_tokens_into(tokens, inputs[index],
+                                                         indices[index] if indices is not None else None)
+                else:
+                    inputs.append(self.word_embedder.embed_tokens(tokens))
+            if tasks is not None:
+                tasks[index].end_stage("embed")
+
+        if buffer is not None:
+            return inputs
+        if self.embedding_vectors is not None:
+            return torch.tensor(inputs, dtype=torch.long)
+        return torch.stack(inputs)
+
+    def warm_up(self, config : "BaseConfig", max_batch_size : int) -> dict:
+        '''
+            This function runs the whole prediction path on sample utterances before the service
+            reports ready, so the first requests don't pay for the cold tokenizers, embedding pages,
+            allocators and LSTM kernels. The micro-batches can have any size up to the batch size,
+            so every size up to the maximal one is run.
+                :param config: BaseConfig
+                    The warm-up configurations.
+                :param max_batch_size: int
+                    The largest batch size the workers may use.
+                :return: dict
+                    The duration of the warm-up and the amount of work done.
+        '''
+        start = time.perf_counter()
+
+        # Loading the utterances and the hot vocabulary, by default the words of the utterances.
+        utterances = DEFAULT_SMOKE_TEXTS
+        if config.utterances_path:
+            with open(config.utterances_path, "r", encoding="utf-8") as utterances_file:
+                utterances = [line.strip() for line in utterances_file if line.strip()]
+        if config.hot_vocabulary_path:
+            with open(config.hot_vocabulary_path, "r", encoding="utf-8") as hot_vocabulary_file:
+                hot_words = [line.strip() for line in hot_vocabulary_file if line.strip()]
+        else:
+            hot_words = sorted({token for tokens in self.word_embedder.tokenize_batch(utterances) for token in tokens})
+
+        # Touching the embeddings of the hot vocabulary, one document-sized chunk at a time.
+        max_length = self.word_embedder.max_length
+        for index in range(0, len(hot_words), max_length):
+            self.word_embedder.embed_tokens(self.word_embedder.normalize_length(hot_words[index:index + max_length]))
+
+        # Running the tokenizer, the embedder and the models for every batch size.
+        model_version = self.model_version
+        for batch_size in range(1, max_batch_size + 1):
+            texts = list(itertools.islice(itertools.cycle(utterances), batch_size))
+            for _ in range(config.repeats):
+                inputs = self.create_inputs(self.word_embedder.tokenize_batch(texts))
+                with torch.no_grad():
+                    model_version.model(inputs)
+                    if self.shadow is not None:
+                        self.shadow.model_version.model(inputs)
+
+        statistics = {
+            "duration" : time.perf_counter() - start,
+            "batch_sizes" : max_batch_size,
+            "utterances" : len(utterances),
+            "hot_words" : len(hot_words)
+        }
+        print(f"warm-up finished in {statistics['duration']:.3f}s: batch_sizes=1..{max_batch_size}, "
+              f"utterances={len(utterances)}, hot_words={len(hot_words)}, repeats={config.repeats}")
+        return statistics
+
+    def swap_model(self, model_version : "ModelVersion") -> None:
+        '''
+            This function activates a new model version. The batches already running finish with
+            the previous version, the next batches use the new one.
+                :param model_version: ModelVersion
+                    The loaded and validated model version.
+        '''
+        self.model_version = model_version
 
-    def increase(self) -> None:
+    def set_batch_size(self, batch_size : int) -> None:
         '''
-            This function creates a new execution process.
+            This function changes the maximal number of tasks executed together by a worker.
+                :param batch_size: int
+                    The new batch size.
         '''
-        self.task_number_limit_lock.acquire()
-        self.task_number_limit += 1
-        self.task_number_limit_lock.release()
-        threading.Thread(target=self.execute).start()
+        with self.task_number_limit_lock:
+            self.batch_size = batch_size
 
-    def decrease(self):
+    def start_worker(self) -> Worker:
         '''
-            This function stops a execution process.
+            This function starts and registers a named execution worker. The threads are daemons,
+            so a stuck worker never keeps the process alive, the tasks are finished by the stop function instead.
+                :return: Worker
+                    The started worker.
         '''
-        self.task_number_limit_lock.acquire()
-        self.stop_process_queue_lock.acquire()
-        self.task_number_limit -=1
-        # Putting the in stop process queue the "stop" message.
-        self.stop_process_queue.put("stop")
-        self.stop_process_queue_lock.release()
-        self.task_number_limit_lock.release()
+        worker = Worker(f"intent-worker-{next(self.worker_counter)}", self.execute)
+        with self.task_number_limit_lock:
+            self.workers[worker.name] = worker
+            worker.start()
+        return worker
 
-    def execute(self) -> None:
+    def is_valid_worker_number(self, worker_number : int) -> bool:
+        '''
+            This function checks if the Task Executor Manager can be scaled to a number of workers.
+        '''
+        return self.min_workers <= worker_number <= self.max_workers
+
+    def set_worker_number(self, worker_number : int, timeout : float = None) -> dict:
+        '''
+            This function starts or stops workers until exactly the given number of them runs.
+            The surplus workers are picked idle first and newest first, each of them finishes
+            its current batch and is joined. A worker that doesn't exit in time keeps running its
+            batch and is reported as stopping, it is never counted as running again.
+                :param worker_number: int
+                    The target number of workers, not checked against the bounds.
+                :param timeout: float, default = None
+                    The maximal number of seconds to wait for the stopped workers, if None the
+                    configured worker stop timeout is used.
+                :return: dict
+                    The worker statistics after the scaling with the names of the started,
+                    stopped and still stopping workers.
+        '''
+        timeout = self.worker_stop_timeout if timeout is None else timeout
+        with self.scale_lock:
+            with self.task_number_limit_lock:
+                self.task_number_limit = worker_number
+                running_workers = [worker for worker in self.workers.values() if worker.is_alive() and not worker.stopping()]
+
+            # Starting the missing workers, including the replacements of the failed ones.
+            started_workers = [self.start_worker().name for _ in range(worker_number - len(running_workers))]
+
+            # Stopping the surplus workers, they check their stop event before taking the next batch.
+            surplus_workers = sorted(reversed(running_workers), key=lambda worker : worker.busy)
+            surplus_workers = surplus_workers[:max(len(running_workers) - worker_number, 0)]
+            for worker in surplus_workers:
+                worker.stop()
+            deadline = time.perf_counter() + timeout
+            stuck_workers = [worker.name for worker in surplus_workers if not worker.join(max(deadline - time.perf_counter(), 0))]
+
+        statistics = self.worker_statistics()
+        statistics["started"] = started_workers
+        statistics["stopped"] = [worker.name for worker in surplus_workers if worker.name not in stuck_workers]
+        statistics["stuck"] = stuck_workers
+        return statistics
+
+    def scale(self, worker_number : int, timeout : float = None) -> dict:
+        '''
+            This function scales the Task Executor Manager to a number of workers within the bounds.
+                :param worker_number: int
+                    The target number of workers.
+                :param timeout: float, default = None
+                    The maximal number of seconds to wait for the stopped workers.
+                :return: dict
+                    The worker statistics after the scaling.
+        '''
+        if not self.is_valid_worker_number(worker_number):
+            raise Exception(f"{worker_number} is not registered as a valid number of workers, "
+                            f"it must be between {self.min_workers} and {self.max_workers}!")
+        return self.set_worker_number(worker_number, timeout)
+
+    def increase(self) -> dict:
+        '''
+            This function starts one more execution worker.
+                :return: dict
+                    The worker statistics after the scaling, None if the upper bound is reached.
+        '''
+        with self.scale_lock:
+            if not self.is_valid_worker_number(self.task_number_limit + 1):
+                return None
+            return self.set_worker_number(self.task_number_limit + 1)
+
+    def decrease(self) -> dict:
+        '''
+            This function stops one execution worker and waits for it.
+                :return: dict
+                    The worker statistics after the scaling, None if the lower bound is reached.
+        '''
+        with self.scale_lock:
+            if not self.is_valid_worker_number(self.task_number_limit - 1):
+                return None
+            return self.set_worker_number(self.task_number_limit - 1)
+
+    def stop(self, timeout : float) -> bool:
+        '''
+            This function finishes the queued and the running tasks, then stops all workers and
+            waits for them. The admission of new tasks must be stopped before.
+                :param timeout: float
+                    The maximal number of seconds to wait for the tasks and the workers.
+                :return: bool
+                    True if all tasks were finished and all workers stopped in time.
+        '''
+        deadline = time.perf_counter() + timeout
+
+        # Waiting for the workers to empty the queue and finish their batches.
+        while self.scheduler.qsize() > 0 or self.active_task_number > 0:
+            if time.perf_counter() >= deadline:
+                print(f"executor: stop timeout with {self.scheduler.qsize()} queued and {self.active_task_number} running tasks")
+                return False
+            time.sleep(self.scheduler_poll_interval / 10)
+
+        # Stopping all workers, they check their stop event between the batches.
+        statistics = self.set_worker_number(0, max(deadline - time.perf_counter(), 0))
+        return not statistics["stuck"]
+
+    def execute(self, worker : Worker) -> None:
         '''
             This function executes tasks by prediction the Intent of the text
             in the task.
+                :param worker: Worker
+                    The worker running this loop, it stops when its stop event is set.
         '''
-        while True:
-            # Acquiring the stop process queue lock and checking if there are values.
-            self.stop_process_queue_lock.acquire()
-            if self.stop_process_queue.qsize() > 0:
-                # Getting the message from the queue.
-                msg = self.stop_process_queue.get()
-
-                if msg == "stop":
-                    # Stopping the process.
-                    self.stop_process_queue_lock.release()
-                    break
-            self.stop_process_queue_lock.release()
-
-            # Acquiring the execution queue lock and checking if there are any tasks in the queue.
-            self.priority_queue_lock.acquire()
-            if self.priority_queue.qsize() > 0:
-                # Getting a task from the queue.
-                task = self.priority_queue.get()[1]
-
-                # Computing the task queue waiting time.
-                task.compute_queue_waiting_time()
-                self.priority_queue_lock.release()
-
-                # Increasing the number of active tasks.
-                self.task_number_limit_lock.acquire()
-                self.active_task_number += 1
+        try:
+            self.execute_batches(worker)
+        finally:
+            # Unregistering the worker and giving back the tasks of a batch it didn't finish,
+            # an exit without a stop request means the worker failed.
+            with self.task_number_limit_lock:
+                self.workers.pop(worker.name, None)
+                if worker.busy:
+                    self.active_task_number -= worker.task_number
+                    self.busy_worker_number -= 1
+                    worker.busy = False
+                    worker.task_number = 0
+                failed = not worker.stopping()
+                if failed:
+                    self.failed_worker_number += 1
+                    print(f"executor: worker {worker.name} exited without a stop request")
+            if failed:
+                self.replace_failed_worker(worker)
+
+    def replace_failed_worker(self, worker : Worker) -> None:
+        '''
+            This function keeps the capacity of the Task Executor Manager after a worker failed.
+            A worker that finished batches before failing is replaced up to the target number of workers.
+            A worker that failed before its first batch would fail the same way again, so the target
+            number of workers is lowered instead and the admission sees the real capacity.
+                :param worker: Worker
+                    The failed worker, already unregistered.
+        '''
+        with self.scale_lock:
+            with self.task_number_limit_lock:
+                running_worker_number = len([running_worker for running_worker in self.workers.values()
+                                             if running_worker.is_alive() and not running_worker.stopping()])
+                if running_worker_number >= self.task_number_limit:
+                    return
+                if worker.batch_number == 0:
+                    self.task_number_limit = running_worker_number
+                    print(f"executor: worker {worker.name} failed before its first batch, "
+                          f"the target number of workers is lowered to {running_worker_number}")
+                    return
+                self.restarted_worker_number += 1
+            replacement = self.start_worker()
+            print(f"executor: worker {worker.name} was replaced by {replacement.name}")
+
+    def execute_batches(self, worker : Worker) -> None:
+        '''
+            This function runs the batches of a worker until it is stopped. The stop event is checked
+            before every batch and the scheduler returns within its poll interval, so a stopped worker
+            exits after at most one batch.
+                :param worker: Worker
+                    The worker running this loop.
+        '''
+        # Creating the input buffer reused by all batches of this worker.
+        buffer = self.create_buffer() if self.input_buffers else None
+
+        while not worker.stopping():
+            # Getting the next tasks from the scheduler, expired tasks are dropped by the scheduler.
+            tasks = self.scheduler.get_batch(self.batch_size, self.scheduler_poll_interval)
+            if not tasks:
+                continue
+
+            # Increasing the number of active tasks and busy workers.
+            self.task_number_limit_lock.acquire()
+            self.active_task_number += len(tasks)
+            self.busy_worker_number += 1
+            worker.busy = True
+            worker.task_number = len(tasks)
+            thread_capacity = self.busy_worker_number / max(self.task_number_limit, 1)
+            self.task_number_limit_lock.release()
+            waiting_queue_length = self.scheduler.qsize()
 
-                # Setting the active tasks number metric.
-                task.set_thread_capacity(self.active_task_number / self.task_number_limit)
+            # Running the batch, an exception fails its tasks instead of the worker, so their
+            # requests are answered and the identical texts aren't attached to a dead task.
+            batch_error = {"name" : "BatchInterrupted", "cause" : None}
+            try:
+                self.execute_batch(tasks, buffer, thread_capacity, waiting_queue_length)
+                batch_error = None
+            except Exception as e:
+                batch_error = {
+                    "name" : e.__class__.__name__,
+                    "cause" : e.__repr__()
+                }
+                print(f"executor: worker {worker.name} failed a batch of {len(tasks)} tasks: {batch_error}")
+                if self.profiler is not None:
+                    self.profiler.end([])
+            finally:
+                # Decreasing the number of active tasks and busy workers.
+                self.task_number_limit_lock.acquire()
+                self.active_task_number -= len(tasks)
+                self.busy_worker_number -= 1
+                worker.busy = False
+                worker.task_number = 0
+                worker.batch_number += 1
+                if batch_error is not None:
+                    self.failed_batch_number += 1
                 self.task_number_limit_lock.release()
+                if batch_error is None:
+                    self.service_rate.record(len(tasks))
 
-                # Setting the waiting queue length metric.
-                task.set_waiting_queue_length(
-                    self.priority_queue.qsize()
-                )
+                # Notifying the service about finished or failed execution of the tasks and their followers.
+                for task in tasks:
+                    with task.condition:
+                        if batch_error is None:
+                            task.notify()
+                        else:
+                            task.fail(batch_error)
+                    self.release_followers(task)
 
-                # Prediction of the intent.
-                task.set_timer_actual_processing()
+    def execute_batch(self, tasks : list, buffer : BatchBuffer, thread_capacity : float, waiting_queue_length : int) -> None:
+        '''
+            This function predicts the intents of a batch of tasks.
+                :param tasks: list
+                    The tasks of the batch.
+                :param buffer: BatchBuffer
+                    The input buffer of the worker, if None new tensors are created.
+                :param thread_capacity: float
+                    The share of the busy workers when the batch started.
+                :param waiting_queue_length: int
+                    The length of the waiting queue when the batch started.
+        '''
+        # Picking the active model version once, the whole batch uses the same version.
+        model_version = self.model_version
 
-                # Getting the embeddings of the text.
-                embeds = self.word_embedder.get_vectors(task.text)
+        for task in tasks:
+            # Setting the active workers and waiting queue length metrics.
+            task.set_thread_capacity(thread_capacity)
+            task.set_waiting_queue_length(waiting_queue_length)
 
-                # Predicting the intent.
-                pred = self.index2intent_mapper[
-                    str(self.model(torch.stack([embeds]))[0].argmax().item())
-                ]
-                task.prediction = pred
+            # Prediction of the intent.
+            task.set_timer_actual_processing()
 
-                # Computing the actual processing time.
-                task.compute_actual_processing()
+        # Sampling the worker while it processes the batch if the profiler is enabled.
+        if self.profiler is not None:
+            self.profiler.begin()
 
-                # Decreasing the number of active tasks.
-                self.task_number_limit_lock.acquire()
-                self.active_task_number -= 1
-                self.task_number_limit_lock.release()
+        # Getting the tokens of the texts in one call for the whole batch.
+        tokenize_start = time.perf_counter()
+        batch_tokens = self.word_embedder.tokenize_batch([task.text for task in tasks])
+        tokenize_end = time.perf_counter()
 
-                # Notifying the service about finished execution of the task.
-                with task.condition:
-                    task.notify()
-            else:
-                self.priority_queue_lock.release()
+        # Getting the embeddings or the token indices of the texts.
+        for task in tasks:
+            task.record_stage("tokenize", tokenize_start, tokenize_end)
+        inputs = self.create_inputs(batch_tokens, tasks, buffer)
+
+        # Predicting the intents, the probabilities are computed only if a task of the batch asks for them.
+        forward_start = time.perf_counter()
+        with torch.no_grad():
+            logits = model_version.model(inputs)
+            preds = logits.argmax(dim=1).tolist()
+            scores = torch.softmax(logits, dim=1).tolist() if any(task.return_scores for task in tasks) else None
+        forward_end = time.perf_counter()
+        for index, (task, pred) in enumerate(zip(tasks, preds)):
+            task.prediction = model_version.index2intent_mapper[str(pred)]
+            task.model_version = model_version.version
+            task.model_reload_duration = model_version.reload_duration
+            if task.return_scores:
+                task.scores = {model_version.index2intent_mapper[str(intent_index)] : score
+                               for intent_index, score in enumerate(scores[index])}
+            task.record_stage("forward", forward_start, forward_end)
+
+            # Computing the actual processing time.
+            task.compute_actual_processing()
+
+        # Offering the batch to the shadow model, it reuses the inputs and never blocks the worker.
+        if self.shadow is not None:
+            self.shadow.submit(inputs, [task.prediction for task in tasks], forward_end - forward_start)
+
+        if self.profiler is not None:
+            self.profiler.end(tasks)
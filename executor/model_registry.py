@@ -0,0 +1,317 @@
+# Importing all needed libraries.
+import threading
+import hashlib
+import torch
+import time
+import json
+import io
+import os
+
+# Importing the internal libraries.
+from nn_model import FusedLstmModel
+
+# Defining the default smoke set, used when the configuration doesn't point to a smoke set file.
+DEFAULT_SMOKE_TEXTS = [
+    "hi",
+    "how many calories did I burn today?",
+    "give me a workout for my legs",
+    "what should I eat for dinner?",
+    "show me my stats",
+    "thank you, bye"
+]
+
+
+class ModelValidationError(Exception):
+    pass
+
+
+class OnnxModel:
+    def __init__(self, raw_model : bytes, intra_op_threads : int = 0) -> None:
+        '''
+            This class runs an exported ONNX model with ONNX Runtime on the CPU. It is called like the
+            PyTorch model, with the embeddings tensor, and returns the logits tensor.
+                :param raw_model: bytes
+                    The content of the ONNX file.
+                :param intra_op_threads: int, default = 0
+                    The number of threads used by an operator, 0 lets ONNX Runtime decide.
+        '''
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = intra_op_threads
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(raw_model, session_options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, embeds : "torch.Tensor") -> "torch.Tensor":
+        '''
+            This function forwards the embeddings through the ONNX model.
+                :param embeds: torch.Tensor
+                    The embeddings of the batch.
+                :return: torch.Tensor
+                    The logits of the batch.
+        '''
+        logits, = self.session.run(None, {self.input_name : embeds.numpy()})
+        return torch.from_numpy(logits)
+
+    def eval(self) -> "OnnxModel":
+        '''
+            This function exists for the compatibility with the PyTorch model, the ONNX model is always in evaluation mode.
+        '''
+        return self
+
+
+class ModelVersion:
+    def __init__(self, model : "LstmModel", index2intent_mapper : dict, version : str, model_path : str, mapper_path : str,
+                 backend : str = "torch") -> None:
+        '''
+            This class keeps together a loaded model and the mapper of its outputs, so the workers
+            always use a consistent pair, even while a new version is swapped in.
+                :param model: LstmModel
+                    The loaded model in evaluation mode.
+                :param index2intent_mapper: dict
+                    The mapping from the output index to the intent name.
+                :param version: str
+                    The version of the model, the prefix of the SHA-256 hash of the model file.
+                :param model_path: str
+                    The path of the model file.
+                :param mapper_path: str
+                    The path of the mapper file.
+                :param backend: str, default = 'torch'
+                    The inference backend of the model, 'torch' or 'onnx'.
+        '''
+        self.model = model
+        self.index2intent_mapper = index2intent_mapper
+        self.version = version
+        self.model_path = model_path
+        self.mapper_path = mapper_path
+        self.backend = backend
+        self.loaded_at = time.time()
+
+        # The duration of the loading and the validation of a reloaded version, None for the version loaded at the start.
+        self.reload_duration = None
+
+    def json(self) -> dict:
+        '''
+            This function converts the model version into a dictionary.
+        '''
+        return {
+            "version" : self.version,
+            "backend" : self.backend,
+            "model_path" : self.model_path,
+            "index2intent_mapper_path" : self.mapper_path,
+            "loaded_at" : self.loaded_at,
+            "reload_duration" : self.reload_duration
+        }
+
+
+def load_model_version(model_path : str, mapper_path : str, backend : str = "torch", onnx_intra_op_threads : int = 0,
+                       embedding_vectors : "torch.Tensor" = None) -> ModelVersion:
+    '''
+        This function loads a model and its mapper from the disk.
+        The model file is read once, the same bytes are hashed for the version and deserialized.
+            :param model_path: str
+                The path of the model file, a PyTorch checkpoint or an exported ONNX file.
+            :param mapper_path: str
+                The path of the mapper file.
+            :param backend: str, default = 'torch'
+                The inference backend, 'torch' for the PyTorch checkpoint or 'onnx' for ONNX Runtime.
+            :param onnx_intra_op_threads: int, default = 0
+                The number of threads used by an ONNX Runtime operator, 0 lets ONNX Runtime decide.
+            :param embedding_vectors: torch.Tensor, default = None
+                The static embedding table, if set the PyTorch model is fused with it and takes token indices.
+            :return: ModelVersion
+                The loaded model version.
+    '''
+    with open(model_path, "rb") as model_file:
+        raw_model = model_file.read()
+    if backend == "torch":
+        model = torch.load(io.BytesIO(raw_model))
+        if embedding_vectors is not None:
+            model = FusedLstmModel(model, embedding_vectors)
+        model.eval()
+    elif backend == "onnx":
+        if embedding_vectors is not None:
+            raise Exception("The fused embedding is supported only by the torch backend!")
+        model = OnnxModel(raw_model, onnx_intra_op_threads)
+    else:
+        raise Exception(f"{backend} is not registered as a valid inference backend!")
+
+    with open(mapper_path, "r") as mapper_file:
+        index2intent_mapper = json.load(mapper_file)
+    return ModelVersion(model, index2intent_mapper, hashlib.sha256(raw_model).hexdigest()[:12], model_path, mapper_path, backend)
+
+
+class ModelReloader:
+    def __init__(self, task_executor : "TaskExecutorManager", config : "BaseConfig", on_reload : "function" = None) -> None:
+        '''
+            This class loads new versions of the model in the background, validates them on a smoke
+            set and swaps them into the Task Executor Manager. The workers pick the active version at
+            the start of every batch, so the swap happens between batches without dropping requests.
+                :param task_executor: TaskExecutorManager
+                    The Task Executor Manager whose model is reloaded.
+                :param config: BaseConfig
+                    The model reload configurations.
+                :param on_reload: function, default = None
+                    The function called with the reload statistics after every reload attempt.
+        '''
+        self.task_executor = task_executor
+        self.config = config
+        self.on_reload = on_reload
+
+        # Loading the smoke set.
+        self.smoke_texts = DEFAULT_SMOKE_TEXTS
+        smoke_set_path = getattr(config, "smoke_set_path", "")
+        if smoke_set_path:
+            with open(smoke_set_path, "r", encoding="utf-8") as smoke_set_file:
+                self.smoke_texts = [line.strip() for line in smoke_set_file if line.strip()]
+
+        # Setting up the reload state.
+        self.reload_lock = threading.Lock()
+        self.reloading = False
+        self.reload_number = 0
+        self.failed_reload_number = 0
+        self.last_reload_duration = None
+        self.last_error = None
+        self.last_agreement = None
+
+    def predict_smoke_set(self, model_version : ModelVersion) -> list:
+        '''
+            This function predicts the intents of the smoke set with a model version.
+                :param model_version: ModelVersion
+                    The model version to run.
+                :return: list
+                    The predicted intents.
+        '''
+        inputs = self.task_executor.create_inputs(self.task_executor.word_embedder.tokenize_batch(self.smoke_texts))
+        with torch.no_grad():
+            logits = model_version.model(inputs)
+
+        # Checking that the outputs match the mapper and are usable.
+        if logits.dim() != 2 or logits.shape[0] != len(self.smoke_texts):
+            raise ModelValidationError(f"Unexpected output shape {tuple(logits.shape)} on the smoke set.")
+        if logits.shape[1] != len(model_version.index2intent_mapper):
+            raise ModelValidationError(f"The model has {logits.shape[1]} outputs but the mapper "
+                                       f"has {len(model_version.index2intent_mapper)} intents.")
+        if not torch.isfinite(logits).all():
+            raise ModelValidationError("The model returned non-finite values on the smoke set.")
+
+        predictions = []
+        for index in logits.argmax(dim=1).tolist():
+            if str(index) not in model_version.index2intent_mapper:
+                raise ModelValidationError(f"The output index {index} is missing from the mapper.")
+            predictions.append(model_version.index2intent_mapper[str(index)])
+        return predictions
+
+    def reload(self, model_path : str = None, mapper_path : str = None) -> dict:
+        '''
+            This function loads, validates and activates a model version.
+            If the new version fails the validation the active version is kept.
+                :param model_path: str, default = None
+                    The path of the model file, if None the path of the active version is used.
+                :param mapper_path: str, default = None
+                    The path of the mapper file, if None the path of the active version is used.
+                :return: dict
+                    The statistics of the reload.
+        '''
+        with self.reload_lock:
+            self.reloading = True
+            active_version = self.task_executor.model_version
+            start = time.perf_counter()
+            try:
+                model_version = load_model_version(model_path or active_version.model_path,
+                                                   mapper_path or active_version.mapper_path,
+                                                   active_version.backend, self.task_executor.onnx_intra_op_threads,
+                                                   self.task_executor.embedding_vectors)
+
+                # Validating the new version and comparing its predictions with the active one.
+                new_predictions = self.predict_smoke_set(model_version)
+                old_predictions = self.predict_smoke_set(active_version)
+                self.last_agreement = sum(new == old for new, old in zip(new_predictions, old_predictions)) / len(new_predictions)
+
+                model_version.reload_duration = time.perf_counter() - start
+                self.task_executor.swap_model(model_version)
+                self.last_error = None
+                self.reload_number += 1
+                print(f"model reloaded: version {active_version.version} -> {model_version.version}, "
+                      f"smoke set agreement={self.last_agreement:.2f}")
+            except Exception as e:
+                self.last_error = {"name" : e.__class__.__name__, "cause" : str(e)}
+                self.failed_reload_number += 1
+                print(f"model reload failed: {self.last_error}")
+            finally:
+                self.last_reload_duration = time.perf_counter() - start
+                self.reloading = False
+
+            statistics = self.statistics()
+            if self.on_reload is not None:
+                self.on_reload(statistics)
+            return statistics
+
+    def reload_in_background(self, model_path : str = None, mapper_path : str = None) -> bool:
+        '''
+            This function starts a reload in a background thread.
+                :param model_path: str, default = None
+                    The path of the model file.
+                :param mapper_path: str, default = None
+                    The path of the mapper file.
+                :return: bool
+                    False if another reload is already running.
+        '''
+        if self.reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, args=(model_path, mapper_path), name="intent-model-reload", daemon=True).start()
+        return True
+
+    def start_watcher(self) -> None:
+        '''
+            This function starts watching the files of the active model version in a background thread.
+        '''
+        threading.Thread(target=self.watch, name="intent-model-watcher", daemon=True).start()
+        print(f"model watcher started: interval={self.config.watch_interval}")
+
+    def file_signature(self) -> tuple:
+        '''
+            This function returns the paths, modification times and sizes of the files of the active version.
+        '''
+        model_version = self.task_executor.model_version
+        signature = [model_version.model_path, model_version.mapper_path]
+        for path in [model_version.model_path, model_version.mapper_path]:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def watch(self) -> None:
+        '''
+            This function reloads the model when its files change. A change is acted on only when
+            the files stayed the same for a whole interval, so partially copied files aren't loaded.
+        '''
+        loaded_signature = self.file_signature()
+        previous_signature = loaded_signature
+        while True:
+            time.sleep(self.config.watch_interval)
+            signature = self.file_signature()
+            if signature[:2] != loaded_signature[:2]:
+                # The active version was loaded from other files through the admin endpoint.
+                loaded_signature = signature
+            elif signature != loaded_signature and signature == previous_signature and None not in signature:
+                self.reload()
+                loaded_signature = signature
+            previous_signature = signature
+
+    def statistics(self) -> dict:
+        '''
+            This function returns the active model version and the state of the reloads.
+        '''
+        return {
+            "active_model" : self.task_executor.model_version.json(),
+            "reloading" : self.reloading,
+            "reloads" : self.reload_number,
+            "failed_reloads" : self.failed_reload_number,
+            "last_reload_duration" : self.last_reload_duration,
+            "last_smoke_set_agreement" : self.last_agreement,
+            "last_error" : self.last_error
+        }
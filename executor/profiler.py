@@ -0,0 +1,122 @@
+# Importing all needed libraries.
+from collections import Counter
+import threading
+import hashlib
+import heapq
+import time
+import sys
+import os
+
+
+class SlowRequestProfiler:
+    def __init__(self, config : "BaseConfig") -> None:
+        '''
+            This class samples the stacks of the busy execution workers and keeps the profiles of
+            the slowest batches. Every kept profile is written in the collapsed stack format
+            ('frame;frame;frame count' lines) which is read by flamegraph.pl and speedscope.
+                :param config: BaseConfig
+                    The profiler configurations.
+        '''
+        self.interval = config.interval
+        self.slowest_requests = config.slowest_requests
+        self.output_directory = config.output_directory
+
+        # Setting up the sampling state, the samples of a batch are kept per worker thread.
+        self.samples = dict()
+        self.samples_lock = threading.Lock()
+
+        # Setting up the min heap of the slowest profiles.
+        self.slowest = []
+        self.sequence = 0
+        self.slowest_lock = threading.Lock()
+
+        os.makedirs(self.output_directory, exist_ok=True)
+
+    def start(self) -> None:
+        '''
+            This function starts the sampling thread.
+        '''
+        threading.Thread(target=self.run, name="intent-profiler", daemon=True).start()
+
+    def begin(self) -> None:
+        '''
+            This function starts sampling the current worker thread.
+        '''
+        with self.samples_lock:
+            self.samples[threading.get_ident()] = Counter()
+
+    def end(self, tasks : list) -> None:
+        '''
+            This function stops sampling the current worker thread and keeps one profile for the
+            batch if it is among the slowest ones.
+                :param tasks: list
+                    The tasks processed by the worker since the call of begin, if empty the samples are dropped.
+        '''
+        with self.samples_lock:
+            stacks = self.samples.pop(threading.get_ident(), Counter())
+
+        if tasks:
+            self.keep_if_slow(max(task.actual_processing for task in tasks), [task.text for task in tasks], stacks)
+
+    def run(self) -> None:
+        '''
+            This function periodically samples the stacks of the registered worker threads.
+        '''
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.samples_lock:
+                for thread_id, stacks in self.samples.items():
+                    if thread_id in frames:
+                        stacks[self.collapse(frames[thread_id])] += 1
+
+    def collapse(self, frame : "frame") -> str:
+        '''
+            This function converts a stack to a single line, from the outermost frame to the innermost.
+                :param frame: frame
+                    The innermost frame of the stack.
+                :return: str
+                    The collapsed stack.
+        '''
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def keep_if_slow(self, duration : float, texts : list, stacks : "Counter") -> None:
+        '''
+            This function writes the profile if the batch is among the slowest ones and
+            removes the profile of the batch that stopped being among them.
+                :param duration: float
+                    The processing time of the batch.
+                :param texts: list
+                    The texts of the batch, their hashes are saved as a comment in the profile,
+                    so the user input isn't written to the disk or the logs.
+                :param stacks: Counter
+                    The sampled collapsed stacks and their counts.
+        '''
+        if not stacks:
+            return
+
+        with self.slowest_lock:
+            if len(self.slowest) >= self.slowest_requests and duration <= self.slowest[0][0]:
+                return
+
+            # Writing the profile of the batch, the comment line doesn't end with a count, so
+            # flamegraph.pl and speedscope skip it.
+            self.sequence += 1
+            path = os.path.join(self.output_directory, f"batch-{self.sequence}-{duration * 1000:.1f}ms.folded")
+            text_hashes = [hashlib.sha256(text.encode()).hexdigest()[:16] for text in texts]
+            with open(path, "w") as profile_file:
+                profile_file.write(f"# text sha256: {' '.join(text_hashes)} ({len(texts)} tasks)\n")
+                for stack, count in stacks.items():
+                    profile_file.write(f"{stack} {count}\n")
+
+            # Removing the profile that isn't among the slowest anymore.
+            heapq.heappush(self.slowest, (duration, self.sequence, path))
+            if len(self.slowest) > self.slowest_requests:
+                _, _, evicted_path = heapq.heappop(self.slowest)
+                if os.path.exists(evicted_path):
+                    os.remove(evicted_path)
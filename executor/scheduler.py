@@ -0,0 +1,177 @@
+# Importing all needed libraries.
+from collections import deque
+import itertools
+import math
+import threading
+import heapq
+import time
+
+
+class TaskScheduler:
+    def __init__(self, priority_classes : dict, default_priority : str, queue_age_window : int = 1024,
+                 on_expire : "function" = None) -> None:
+        '''
+            This class keeps the tasks waiting for execution and decides the order in which
+            they are served. Tasks are served by priority class first and in arrival order (FIFO)
+            inside the same class. Tasks whose deadline expired are dropped before execution.
+                :param priority_classes: dict
+                    The mapping from priority class name to its rank, lower rank is served first.
+                :param default_priority: str
+                    The priority class used when the caller doesn't provide one.
+                :param queue_age_window: int, default = 1024
+                    The number of latest queue waiting times kept for the percentiles.
+                :param on_expire: function, default = None
+                    The function called with every expired task after the service was notified.
+        '''
+        self.priority_classes = priority_classes
+        self.default_priority = default_priority
+        self.on_expire = on_expire
+
+        # Setting up the heap of waiting tasks and the sequence used for FIFO ordering.
+        self.heap = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+        # Setting up the starvation statistics.
+        self.queue_ages = deque(maxlen=queue_age_window)
+        self.expired_task_number = 0
+
+    def priority_rank(self, priority_class : str = None) -> int:
+        '''
+            This function returns the rank of a priority class.
+                :param priority_class: str, default = None
+                    The name of the priority class, if None the default one is used.
+                :return: int
+                    The rank of the priority class.
+        '''
+        if priority_class is None:
+            priority_class = self.default_priority
+        return self.priority_classes[priority_class]
+
+    def qsize(self) -> int:
+        '''
+            This function returns the number of tasks waiting in the queue.
+        '''
+        with self.condition:
+            return len(self.heap)
+
+    def try_put(self, task : "Task", max_size : int) -> bool:
+        '''
+            This function adds a task to the queue if the queue isn't full.
+            The check and the insertion happen under the same lock.
+                :param task: Task
+                    The task to be scheduled for execution.
+                :param max_size: int
+                    The maximal number of tasks waiting in the queue.
+                :return: bool
+                    True if the task was accepted, False if it was rejected.
+        '''
+        with self.condition:
+            if len(self.heap) >= max_size:
+                return False
+            task.compute_lock_time()
+            task.set_timer_queue_waiting_time()
+            heapq.heappush(self.heap, (self.priority_rank(task.priority), next(self.sequence), task))
+            self.condition.notify()
+            return True
+
+    def pop_task(self, expired_tasks : list) -> "Task":
+        '''
+            This function removes and returns the next not expired task from the queue.
+            Expired tasks are removed from the queue and collected to be notified after the
+            scheduler condition is released. Must be called while holding the scheduler condition.
+                :param expired_tasks: list
+                    The list where the expired tasks are collected.
+                :return: Task
+                    The next task to execute or None if the queue is empty.
+        '''
+        while self.heap:
+            # Getting the task with the lowest rank and the earliest arrival.
+            task = heapq.heappop(self.heap)[2]
+            task.compute_queue_waiting_time()
+            self.queue_ages.append(task.queue_waiting_time)
+
+            if not task.is_expired():
+                return task
+
+            # Dropping the expired task.
+            self.expired_task_number += 1
+            expired_tasks.append(task)
+        return None
+
+    def expire_tasks(self, expired_tasks : list) -> None:
+        '''
+            This function notifies the services waiting for the expired tasks.
+                :param expired_tasks: list
+                    The tasks dropped because their deadline expired.
+        '''
+        for task in expired_tasks:
+            with task.condition:
+                task.expire()
+            if self.on_expire is not None:
+                self.on_expire(task)
+
+    def get_batch(self, batch_size : int, timeout : float) -> list:
+        '''
+            This function returns the next tasks to execute together. It waits only for the
+            first task, the rest of the batch is filled with the tasks already in the queue.
+                :param batch_size: int
+                    The maximal number of tasks to return.
+                :param timeout: float
+                    The maximal number of seconds to wait for the first task.
+                :return: list
+                    The list of tasks to execute, empty if no task arrived during the timeout.
+        '''
+        expired_tasks = []
+        with self.condition:
+            end_time = time.perf_counter() + timeout
+            batch = []
+            while not batch:
+                while not self.heap:
+                    remaining = end_time - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.heap:
+                    break
+
+                # Filling the batch with the tasks waiting in the queue.
+                while len(batch) < batch_size:
+                    task = self.pop_task(expired_tasks)
+                    if task is None:
+                        break
+                    batch.append(task)
+
+        # Notifying the expired tasks outside of the scheduler condition.
+        self.expire_tasks(expired_tasks)
+        return batch
+
+    def oldest_queue_age(self) -> float:
+        '''
+            This function returns for how many seconds the oldest task in the queue is waiting.
+        '''
+        with self.condition:
+            if not self.heap:
+                return 0.0
+            return time.perf_counter() - min(entry[2].queue_waiting_time for entry in self.heap)
+
+    def queue_age_percentiles(self, percentiles : tuple = (50, 90, 95, 99)) -> dict:
+        '''
+            This function calculates the percentiles of the latest queue waiting times.
+                :param percentiles: tuple, default = (50, 90, 95, 99)
+                    The percentiles to compute.
+                :return: dict
+                    The mapping from percentile name to the queue waiting time in seconds.
+        '''
+        with self.condition:
+            queue_ages = sorted(self.queue_ages)
+
+        # Using the nearest rank method to compute the percentiles.
+        result = dict()
+        for percentile in percentiles:
+            if queue_ages:
+                rank = max(math.ceil(percentile / 100 * len(queue_ages)) - 1, 0)
+                result[f"p{percentile}"] = queue_ages[min(rank, len(queue_ages) - 1)]
+            else:
+                result[f"p{percentile}"] = None
+        return result
@@ -0,0 +1,46 @@
+# Importing all needed libraries.
+from collections import deque
+import threading
+import time
+
+
+class ServiceRateEstimator:
+    def __init__(self, window : float, max_samples : int = 4096) -> None:
+        '''
+            This class measures how many tasks per second the Task Executor Manager finishes.
+                :param window: float
+                    The number of latest seconds used to compute the service rate.
+                :param max_samples: int, default = 4096
+                    The maximal number of finish times kept in memory.
+        '''
+        self.window = window
+        self.finish_times = deque(maxlen=max_samples)
+        self.lock = threading.Lock()
+
+    def record(self, task_number : int = 1) -> None:
+        '''
+            This function records that a number of tasks were finished now.
+                :param task_number: int, default = 1
+                    The number of finished tasks.
+        '''
+        now = time.perf_counter()
+        with self.lock:
+            self.finish_times.extend([now] * task_number)
+
+    def rate(self) -> float:
+        '''
+            This function returns the number of tasks finished per second during the window.
+                :return: float
+                    The service rate or None if no task was finished during the window.
+        '''
+        now = time.perf_counter()
+        with self.lock:
+            # Dropping the finish times that are outside of the window.
+            while self.finish_times and now - self.finish_times[0] > self.window:
+                self.finish_times.popleft()
+            if not self.finish_times:
+                return None
+
+            # Using the observed span of the window, at least one second to avoid spikes.
+            elapsed = min(max(now - self.finish_times[0], 1.0), self.window)
+            return len(self.finish_times) / elapsed
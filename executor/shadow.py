@@ -0,0 +1,143 @@
+# Importing all needed libraries.
+from collections import deque
+from queue import Queue, Full
+import threading
+import random
+import torch
+import time
+
+# Importing the internal libraries.
+from .model_registry import load_model_version
+
+
+class ShadowEvaluator:
+    def __init__(self, config : "BaseConfig", default_mapper_path : str, embedding_vectors : "torch.Tensor" = None) -> None:
+        '''
+            This class runs a second model on a sample of the live batches and compares its predictions
+            and its latency with the primary model. The shadow inference runs in its own thread on the
+            inputs already computed by the workers. The queue of the shadow thread is bounded and a
+            batch that doesn't fit into it is dropped, so the workers never wait for the shadow model.
+                :param config: BaseConfig
+                    The shadow model configurations.
+                :param default_mapper_path: str
+                    The mapper of the primary model, used if the shadow model doesn't set its own.
+                :param embedding_vectors: torch.Tensor, default = None
+                    The static embedding table, set if the primary model is fused with the embedding lookup.
+        '''
+        self.config = config
+        self.model_version = load_model_version(config.model_path, config.index2intent_mapper_path or default_mapper_path,
+                                                config.backend, config.onnx_intra_op_threads, embedding_vectors)
+        self.sample_rate = config.sample_rate
+        self.queue = Queue(maxsize=config.queue_size)
+        self.random = random.Random()
+
+        # Setting up the comparison statistics, the latency deltas are kept for a window of batches.
+        self.statistics_lock = threading.Lock()
+        self.sampled_batch_number = 0
+        self.dropped_batch_number = 0
+        self.failed_batch_number = 0
+        self.compared_prediction_number = 0
+        self.agreed_prediction_number = 0
+        self.disagreements = dict()
+        self.latency_deltas = deque(maxlen=config.latency_window)
+
+    def start(self) -> None:
+        '''
+            This function starts the shadow inference in a background thread.
+        '''
+        threading.Thread(target=self.run, name="intent-shadow", daemon=True).start()
+        print(f"shadow model started: version={self.model_version.version}, sample_rate={self.sample_rate}")
+
+    def submit(self, inputs : "torch.Tensor", predictions : list, forward_time : float) -> None:
+        '''
+            This function offers a batch processed by the primary model to the shadow model.
+            It never blocks, the batch is dropped if the shadow queue is full.
+                :param inputs: torch.Tensor
+                    The embeddings or the token indices of the batch, copied if the batch is sampled
+                    because the worker reuses its input buffer.
+                :param predictions: list
+                    The intents predicted by the primary model.
+                :param forward_time: float
+                    The duration of the forward pass of the primary model in seconds.
+        '''
+        if self.random.random() >= self.sample_rate:
+            return
+
+        # Dropping the batch before copying it if the shadow model is behind.
+        if self.queue.full():
+            with self.statistics_lock:
+                self.dropped_batch_number += 1
+            return
+        try:
+            self.queue.put_nowait((inputs.clone(), predictions, forward_time))
+            with self.statistics_lock:
+                self.sampled_batch_number += 1
+        except Full:
+            with self.statistics_lock:
+                self.dropped_batch_number += 1
+
+    def run(self) -> None:
+        '''
+            This function runs the shadow model on the submitted batches and records the comparison.
+            A failed batch doesn't stop the thread, it is skipped.
+        '''
+        while True:
+            inputs, predictions, forward_time = self.queue.get()
+
+            # Skipping a batch the shadow model fails on, the failure is logged and counted.
+            forward_start = time.perf_counter()
+            try:
+                with torch.no_grad():
+                    preds = self.model_version.model(inputs).argmax(dim=1).tolist()
+            except Exception as e:
+                with self.statistics_lock:
+                    self.failed_batch_number += 1
+                print(f"shadow model: the batch failed with {e!r}")
+                continue
+            shadow_forward_time = time.perf_counter() - forward_start
+            shadow_predictions = [self.model_version.index2intent_mapper.get(str(pred)) for pred in preds]
+
+            with self.statistics_lock:
+                self.latency_deltas.append(shadow_forward_time - forward_time)
+                for prediction, shadow_prediction in zip(predictions, shadow_predictions):
+                    self.compared_prediction_number += 1
+                    if prediction == shadow_prediction:
+                        self.agreed_prediction_number += 1
+                    else:
+                        pair = f"{prediction}->{shadow_prediction}"
+                        self.disagreements[pair] = self.disagreements.get(pair, 0) + 1
+
+    def agreement_rate(self) -> float:
+        '''
+            This function returns the share of the compared predictions on which both models agree.
+        '''
+        if self.compared_prediction_number == 0:
+            return None
+        return self.agreed_prediction_number / self.compared_prediction_number
+
+    def statistics(self) -> dict:
+        '''
+            This function returns the comparison of the shadow model with the primary model.
+                :return: dict
+                    The sampling counters, the agreement rate, the most frequent disagreements and the
+                    forward latency deltas (shadow minus primary) in seconds.
+        '''
+        with self.statistics_lock:
+            latency_deltas = sorted(self.latency_deltas)
+            disagreements = sorted(self.disagreements.items(), key=lambda item: item[1], reverse=True)[:10]
+            return {
+                "shadow_model" : self.model_version.json(),
+                "sample_rate" : self.sample_rate,
+                "sampled_batches" : self.sampled_batch_number,
+                "dropped_batches" : self.dropped_batch_number,
+                "failed_batches" : self.failed_batch_number,
+                "pending_batches" : self.queue.qsize(),
+                "compared_predictions" : self.compared_prediction_number,
+                "agreement_rate" : self.agreement_rate(),
+                "top_disagreements" : dict(disagreements),
+                "forward_latency_delta" : {
+                    "mean" : sum(latency_deltas) / len(latency_deltas) if latency_deltas else None,
+                    "p50" : latency_deltas[len(latency_deltas) // 2] if latency_deltas else None,
+                    "p95" : latency_deltas[min(int(len(latency_deltas) * 0.95), len(latency_deltas) - 1)] if latency_deltas else None
+                }
+            }
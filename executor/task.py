@@ -4,7 +4,8 @@ import psutil
 
 
 class Task:
-    def __init__(self, text : str, condition : "threading.Condition") -> None:
+    def __init__(self, text : str, condition : "threading.Condition", priority : str = None, deadline : float = None,
+                 return_scores : bool = False) -> None:
         '''
             This class is and abstraction of the task executed by Task Execution Manager for
             keeping together all attributes of the task.
@@ -12,14 +13,39 @@ class Task:
                     The text on which is needed to make prediction.
                 :param condition: threading.Condition
                     The threading Condition used to notify the service of the task execution end.
+                :param priority: str, default = None
+                    The priority class of the task, if None the default priority class is used.
+                :param deadline: float, default = None
+                    The number of seconds after arrival when the task is no longer worth processing.
+                :param return_scores: bool, default = False
+                    If True the probabilities of all intents are kept next to the prediction.
         '''
         self.text = text
-        self.arrival_time = time.time()
+        self.arrival_time = time.perf_counter()
         self.condition = condition
         self.prediction = None
+        self.model_version = None
+        self.model_reload_duration = None
+        self.return_scores = return_scores
+        self.scores = None
+
+        # Setting up the scheduling attributes.
+        self.priority = priority
+        self.deadline = self.arrival_time + deadline if deadline is not None else None
+        self.done = False
+        self.expired = False
+        self.failed = False
+        self.error = None
+
+        # Setting up the single-flight attributes, followers reuse the prediction of this task.
+        self.followers = []
+        self.coalesced = False
 
         self.db_error = None
 
+        # Setting up the fine-grained processing stage timers.
+        self.stages = dict()
+
     def add_db_error(self, db_error_description : dict) -> None:
         '''
             This function adds to the task the error that appeared in the data base.
@@ -31,55 +57,101 @@ class Task:
             This function sets the time checkpoint when the task started to wait for a lock
             to release.
         '''
-        self.lock_time_per_process = time.time()
+        self.lock_time_per_process = time.perf_counter()
 
     def compute_lock_time(self) -> None:
         '''
             This function calculates the lock time per process.
         '''
-        self.lock_time_per_process = time.time() - self.lock_time_per_process
+        self.lock_time_per_process = time.perf_counter() - self.lock_time_per_process
 
     def set_timer_queue_waiting_time(self) -> None:
         '''
             This function sets the time checkpoint when the task was added to the queue.
         '''
-        self.queue_waiting_time = time.time()
+        self.queue_waiting_time = time.perf_counter()
 
     def compute_queue_waiting_time(self) -> None:
         '''
             This function calculates the queue waiting time of the process.
         '''
-        self.queue_waiting_time = time.time() - self.queue_waiting_time
+        self.queue_waiting_time = time.perf_counter() - self.queue_waiting_time
 
     def set_timer_actual_processing(self) -> None:
         '''
             This function sets the time checkpoint when the prediction of the intent started.
         '''
-        self.actual_processing = time.time()
+        self.actual_processing = time.perf_counter()
 
     def compute_actual_processing(self) -> None:
         '''
             This function calculates the actual processing time of the task.
         '''
-        self.actual_processing = time.time() - self.actual_processing
+        self.actual_processing = time.perf_counter() - self.actual_processing
+
+    def start_stage(self, stage : str) -> None:
+        '''
+            This function sets the time checkpoint when a processing stage of the task started.
+                :param stage: str
+                    The name of the stage, for example 'tokenize', 'embed' or 'forward'.
+        '''
+        self.stages[stage] = [time.perf_counter(), None]
+
+    def end_stage(self, stage : str) -> None:
+        '''
+            This function sets the time checkpoint when a processing stage of the task ended.
+                :param stage: str
+                    The name of the stage.
+        '''
+        self.stages[stage][1] = time.perf_counter()
+
+    def record_stage(self, stage : str, start : float, end : float) -> None:
+        '''
+            This function saves a processing stage that was shared by a batch of tasks.
+                :param stage: str
+                    The name of the stage.
+                :param start: float
+                    The perf_counter time checkpoint when the stage started.
+                :param end: float
+                    The perf_counter time checkpoint when the stage ended.
+        '''
+        self.stages[stage] = [start, end]
+
+    def stage_time(self, stage : str) -> float:
+        '''
+            This function returns the duration of a processing stage in seconds.
+                :param stage: str
+                    The name of the stage.
+                :return: float
+                    The duration of the stage or None if the stage wasn't recorded.
+        '''
+        if stage not in self.stages or self.stages[stage][1] is None:
+            return None
+        return self.stages[stage][1] - self.stages[stage][0]
+
+    def stage_timings(self) -> dict:
+        '''
+            This function returns the durations of all recorded processing stages.
+        '''
+        return {stage : self.stage_time(stage) for stage in self.stages}
 
     def compute_task_service_time(self) -> None:
         '''
             This function calculates the task service time.
         '''
-        self.task_service_time = time.time() - self.arrival_time
+        self.task_service_time = time.perf_counter() - self.arrival_time
 
     def set_timer_db_response_time(self) -> None:
         '''
             This function sets up te time checkpoint of when the write to the database started.
         '''
-        self.db_response_time = time.time()
+        self.db_response_time = time.perf_counter()
 
     def compute_db_response_time(self) -> None:
         '''
             This function calculates the database response time of the task.
         '''
-        self.db_response_time = time.time() - self.db_response_time
+        self.db_response_time = time.perf_counter() - self.db_response_time
 
     def set_waiting_queue_length(self, queue_length) -> None:
         '''
@@ -93,28 +165,119 @@ class Task:
         '''
         self.thread_capacity = thread_capacity
 
+    def follow(self, leader : "Task") -> None:
+        '''
+            This function copies the result of the identical task this task was attached to.
+            The follower didn't run any processing stage, its whole wait counts as queue waiting time.
+                :param leader: Task
+                    The task whose result is reused.
+        '''
+        self.compute_queue_waiting_time()
+        self.prediction = leader.prediction
+        self.model_version = leader.model_version
+        self.model_reload_duration = leader.model_reload_duration
+        self.scores = leader.scores if self.return_scores else None
+        self.actual_processing = 0.0
+        self.queue_waiting_length = leader.queue_waiting_length
+        self.thread_capacity = leader.thread_capacity
+
+    def compact_json(self) -> dict:
+        '''
+            This function converts the task into the smallest dictionary, for the high traffic clients
+            that need only the prediction. The scores and the database error are added only if present.
+        '''
+        self.compute_task_service_time()
+        response = {"prediction" : self.prediction}
+        if self.scores is not None:
+            response["scores"] = self.scores
+        if self.db_error is not None:
+            response["db_error"] = self.db_error
+        return response
+
+    def is_expired(self) -> bool:
+        '''
+            This function checks if the deadline of the task has passed.
+        '''
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def expire(self) -> None:
+        '''
+            This function marks the task as dropped because of the deadline and notifies the service.
+        '''
+        self.expired = True
+        self.notify()
+
+    def fail(self, error : dict) -> None:
+        '''
+            This function marks the task as failed by the prediction and notifies the service.
+                :param error: dict
+                    The name and the cause of the exception raised by the batch of the task.
+        '''
+        self.failed = True
+        self.error = error
+        self.notify()
+
+    def wait(self, timeout : float = None) -> bool:
+        '''
+            This function blocks the service until the processing of the task has ended.
+            The deadline of the wait is fixed when it starts, so a lost notification can't block the service forever.
+                :param timeout: float, default = None
+                    The maximal number of seconds to wait, if None the service waits until the end.
+                :return: bool
+                    True if the processing of the task has ended.
+        '''
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        with self.condition:
+            while not self.done:
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
     def notify(self) -> None:
         '''
             This function notifies the service that the processing of the task has ended.
         '''
+        self.done = True
         self.condition.notify()
 
-    def json(self) -> dict:
+    def json(self, include_metrics : bool = True) -> dict:
         '''
             This function converts the task into a dictionary.
+                :param include_metrics: bool, default = True
+                    If False the latency and saturation metrics are left out of the dictionary.
         '''
-        # Calculating the CPU utilization.
-        cpu_utilization = psutil.cpu_percent(2)
-
         # Computing the task service time.
         self.compute_task_service_time()
+        if not include_metrics:
+            return {
+                "text" : self.text,
+                "prediction" : self.prediction,
+                "model_version" : self.model_version,
+                "model_reload_duration" : self.model_reload_duration,
+                "scores" : self.scores,
+                "errors" : {
+                    "db_error" : self.db_error
+                }
+            }
+
+        # Calculating the CPU utilization since the previous call without blocking the response.
+        cpu_utilization = psutil.cpu_percent(None)
         return {
             "text" : self.text,
             "prediction" : self.prediction,
+            "model_version" : self.model_version,
+            "model_reload_duration" : self.model_reload_duration,
+            "scores" : self.scores,
             "latency" : {
                 "lock_time" : self.lock_time_per_process,
                 "queue_waiting_time" : self.queue_waiting_time,
                 "actual_processing" : self.actual_processing,
+                "stages" : self.stage_timings(),
                 "task_service_time" : self.task_service_time,
                 "database_response_time" : self.db_response_time
             },
@@ -127,4 +290,4 @@ class Task:
             "errors" : {
                 "db_error" : self.db_error
             }
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,55 @@
+# Importing all needed libraries.
+import threading
+
+
+class Worker:
+    def __init__(self, name : str, target : "callable") -> None:
+        '''
+            This class is one execution thread of the Task Executor Manager with its own stop event,
+            so a scaling action stops exactly the chosen worker instead of whichever polls first.
+                :param name: str
+                    The name of the thread.
+                :param target: callable
+                    The loop of the worker, called with the worker itself.
+        '''
+        self.name = name
+        self.stop_event = threading.Event()
+        self.busy = False
+        self.task_number = 0
+        self.batch_number = 0
+        self.thread = threading.Thread(target=target, args=(self,), name=name, daemon=True)
+
+    def start(self) -> None:
+        '''
+            This function starts the thread of the worker.
+        '''
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''
+            This function asks the worker to stop after its current batch.
+        '''
+        self.stop_event.set()
+
+    def stopping(self) -> bool:
+        '''
+            This function checks if the worker was asked to stop.
+        '''
+        return self.stop_event.is_set()
+
+    def is_alive(self) -> bool:
+        '''
+            This function checks if the thread of the worker is still running.
+        '''
+        return self.thread.is_alive()
+
+    def join(self, timeout : float = None) -> bool:
+        '''
+            This function waits for the thread of the worker to exit.
+                :param timeout: float, default = None
+                    The maximal number of seconds to wait.
+                :return: bool
+                    True if the thread exited.
+        '''
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
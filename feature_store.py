@@ -0,0 +1,381 @@
+# Importing all needed libraries.
+from sqlalchemy import create_engine, table, column, func, and_, String, Text, DateTime
+from numpy.lib.format import open_memmap
+import numpy as np
+import argparse
+import datetime
+import torch
+import time
+import json
+import os
+
+# Importing the internal libraries.
+from executor.model_registry import load_model_version
+from word_embedders.factory import WordEmbedderFactory
+from config import ConfigManager, get_database_uri
+
+# Describing the columns of the intents table read by the feature store, without the Flask model of the service.
+INTENTS_TABLE = table(
+    "intents",
+    column("id", String),
+    column("text", Text),
+    column("prediction", String),
+    column("created_at", DateTime)
+)
+
+# Defining the files of a feature store, every array is a .npy file memory-mapped when read.
+MANIFEST_FILE = "manifest.json"
+ARRAY_FILES = {
+    "ids" : "ids.npy",
+    "predictions" : "predictions.npy",
+    "created_at" : "created_at.npy",
+    "token_ids" : "token_ids.npy",
+    "embeddings" : "embeddings.npy"
+}
+ID_DTYPE = "S64"
+PREDICTION_DTYPE = "S32"
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def to_microseconds(timestamp : datetime.datetime) -> int:
+    '''
+        This function converts a naive UTC datetime to the number of microseconds since the epoch.
+    '''
+    return (timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def build_feature_store(engine : "Engine", word_embedder : "BaseWordEmbedder", path : str, chunk_size : int = 10000,
+                        embeddings : bool = False, embedding_dtype : str = "float32", since : datetime.datetime = None,
+                        until : datetime.datetime = None, word_embedding_config : dict = None) -> dict:
+    '''
+        This function streams the rows of the intents table in chunks and stores their token ids,
+        and optionally their embeddings, in memory-mapped files ordered like the rows by (created_at, id).
+        The rows are read with a server-side cursor, so the memory doesn't grow with the table.
+        The manifest is written last, a store without it is incomplete and can't be opened.
+            :param engine: Engine
+                The sqlalchemy engine of the database.
+            :param word_embedder: BaseWordEmbedder
+                The word embedder of the service.
+            :param path: str
+                The directory of the feature store.
+            :param chunk_size: int, default = 10000
+                The number of rows fetched and tokenized at once.
+            :param embeddings: bool, default = False
+                If True the embeddings are stored next to the token ids.
+            :param embedding_dtype: str, default = 'float32'
+                The type of the stored embeddings, 'float16' halves the size of the store.
+            :param since: datetime, default = None
+                The first creation time of the stored rows, inclusive.
+            :param until: datetime, default = None
+                The last creation time of the stored rows, exclusive, if None the start of the build.
+            :param word_embedding_config: dict, default = None
+                The configuration of the word embedder, recorded to check that the token ids match the embedding table.
+            :return: dict
+                The manifest of the feature store.
+    '''
+    start = time.perf_counter()
+    until = until or datetime.datetime.utcnow()
+    has_token_ids = word_embedder.embedding_vectors() is not None
+    if not has_token_ids and not embeddings:
+        raise Exception(f"{word_embedder.__class__.__name__} doesn't have a static embedding table, the feature store needs the embeddings!")
+    if embedding_dtype not in ["float16", "float32"]:
+        raise Exception(f"{embedding_dtype} is not registered as a valid embedding type!")
+
+    # Counting the rows to allocate the files, the rows created later are excluded by the until bound.
+    condition = INTENTS_TABLE.c.created_at < until
+    if since is not None:
+        condition = and_(INTENTS_TABLE.c.created_at >= since, condition)
+    with engine.connect() as connection:
+        row_number = connection.execute(func.count().select().select_from(INTENTS_TABLE).where(condition)).scalar()
+
+    # Allocating the memory-mapped arrays.
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        os.remove(os.path.join(path, MANIFEST_FILE))
+    max_length = word_embedder.max_length
+    arrays = {
+        "ids" : open_memmap(os.path.join(path, ARRAY_FILES["ids"]), "w+", ID_DTYPE, (row_number,)),
+        "predictions" : open_memmap(os.path.join(path, ARRAY_FILES["predictions"]), "w+", PREDICTION_DTYPE, (row_number,)),
+        "created_at" : open_memmap(os.path.join(path, ARRAY_FILES["created_at"]), "w+", np.int64, (row_number,))
+    }
+    if has_token_ids:
+        arrays["token_ids"] = open_memmap(os.path.join(path, ARRAY_FILES["token_ids"]), "w+", np.int32, (row_number, max_length))
+    if embeddings:
+        arrays["embeddings"] = open_memmap(os.path.join(path, ARRAY_FILES["embeddings"]), "w+", embedding_dtype,
+                                           (row_number, max_length, word_embedder.vector_dimension))
+        document_buffer = torch.zeros(max_length, word_embedder.vector_dimension)
+
+    # Streaming the rows in chunks and storing their features.
+    query = INTENTS_TABLE.select().where(condition).order_by(INTENTS_TABLE.c.created_at, INTENTS_TABLE.c.id)
+    written_row_number = 0
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(query)
+        while written_row_number < row_number:
+            rows = result.fetchmany(min(chunk_size, row_number - written_row_number))
+            if not rows:
+                break
+            chunk = slice(written_row_number, written_row_number + len(rows))
+            arrays["ids"][chunk] = [row.id.encode() for row in rows]
+            arrays["predictions"][chunk] = [(row.prediction or "").encode() for row in rows]
+            arrays["created_at"][chunk] = [to_microseconds(row.created_at) for row in rows]
+
+            # Tokenizing the chunk in one call, like the workers do for a batch.
+            batch_tokens = word_embedder.tokenize_batch([row.text or "" for row in rows])
+            if has_token_ids:
+                arrays["token_ids"][chunk] = np.asarray([word_embedder.token_ids(tokens) for tokens in batch_tokens], dtype=np.int32)
+
+            # Writing the float32 embeddings directly into the mapped file, the float16 ones through one document buffer.
+            if embeddings:
+                for row, tokens in enumerate(batch_tokens, chunk.start):
+                    if embedding_dtype == "float32":
+                        word_embedder.embed_tokens_into(tokens, torch.from_numpy(arrays["embeddings"][row]))
+                    else:
+                        word_embedder.embed_tokens_into(tokens, document_buffer)
+                        arrays["embeddings"][row] = document_buffer.numpy()
+
+            written_row_number += len(rows)
+            print(f"feature store: stored {written_row_number}/{row_number} rows")
+        result.close()
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    # Writing the manifest last, it marks the store as complete.
+    manifest = {
+        "rows" : written_row_number,
+        "max_length" : max_length,
+        "vector_dimension" : word_embedder.vector_dimension,
+        "token_ids" : has_token_ids,
+        "embeddings" : embeddings,
+        "embedding_dtype" : embedding_dtype if embeddings else None,
+        "word_embedder" : word_embedder.__class__.__name__,
+        "word_embedding" : word_embedding_config,
+        "since" : since.isoformat() if since is not None else None,
+        "until" : until.isoformat(),
+        "built_at" : datetime.datetime.utcnow().isoformat(),
+        "build_duration" : time.perf_counter() - start
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    return manifest
+
+
+class FeatureStore:
+    def __init__(self, path : str) -> None:
+        '''
+            This class reads a feature store built by build_feature_store. The arrays are memory-mapped,
+            so opening a store is instant and only the rows of the read batches are loaded.
+                :param path: str
+                    The directory of the feature store.
+        '''
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise Exception(f"{path} is not a complete feature store, its manifest is missing!")
+        with open(manifest_path, "r") as manifest_file:
+            self.manifest = json.load(manifest_file)
+
+        # Memory-mapping the arrays, the files can be longer than the rows if the table shrank during the build.
+        self.row_number = self.manifest["rows"]
+        self.arrays = dict()
+        for name, file_name in ARRAY_FILES.items():
+            if name in ["token_ids", "embeddings"] and not self.manifest[name]:
+                continue
+            self.arrays[name] = np.load(os.path.join(path, file_name), mmap_mode="r")[:self.row_number]
+
+    def row_range(self, since : datetime.datetime = None, until : datetime.datetime = None) -> tuple:
+        '''
+            This function finds the rows created in a time range, the rows are sorted by their creation time.
+                :param since: datetime, default = None
+                    The first creation time, inclusive.
+                :param until: datetime, default = None
+                    The last creation time, exclusive.
+                :return: tuple
+                    The first and the end row of the range.
+        '''
+        created_at = self.arrays["created_at"]
+        start = 0 if since is None else int(np.searchsorted(created_at, to_microseconds(since), side="left"))
+        end = self.row_number if until is None else int(np.searchsorted(created_at, to_microseconds(until), side="left"))
+        return start, max(start, end)
+
+    def inputs(self, start : int, end : int, fused : bool = False) -> "torch.Tensor":
+        '''
+            This function reads the input of the model for a range of rows.
+                :param start: int
+                    The first row.
+                :param end: int
+                    The end row, exclusive.
+                :param fused: bool, default = False
+                    If True the token ids are returned for a model fused with the embedding table,
+                    otherwise the embeddings.
+                :return: torch.Tensor
+                    The token ids of shape (batch, sequence) or the embeddings of shape (batch, sequence, vector_dimension).
+        '''
+        if fused:
+            return torch.from_numpy(np.asarray(self.arrays["token_ids"][start:end], dtype=np.int64))
+        return torch.from_numpy(np.asarray(self.arrays["embeddings"][start:end], dtype=np.float32))
+
+
+def distinct_rows(array : "np.ndarray") -> tuple:
+    '''
+        This function finds the distinct rows of a matrix by comparing the bytes of the rows.
+            :param array: np.ndarray
+                The matrix of shape (rows, columns).
+            :return: tuple
+                The first occurrence of every distinct row and the distinct row of every row.
+    '''
+    array = np.ascontiguousarray(array)
+    rows = array.view(np.dtype((np.void, array.dtype.itemsize * array.shape[1]))).ravel()
+    _, first_rows, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first_rows, inverse.ravel()
+
+
+def rescore(feature_store : FeatureStore, model_version : "ModelVersion", batch_size : int = 1024, fused : bool = False,
+            since : datetime.datetime = None, until : datetime.datetime = None, changes_path : str = None,
+            deduplicate : bool = True) -> dict:
+    '''
+        This function predicts the intents of the stored rows with a model version in large batches,
+        without tokenizing or embedding the texts again, and compares them with the recorded predictions.
+        The traffic repeats the same short messages a lot, so with the token ids every distinct row is
+        forwarded only once, which needs the token ids of the whole range in memory.
+            :param feature_store: FeatureStore
+                The feature store of the historical traffic.
+            :param model_version: ModelVersion
+                The model version to evaluate, fused with the embedding table if the store has only the token ids.
+            :param batch_size: int, default = 1024
+                The number of rows forwarded at once.
+            :param fused: bool, default = False
+                If True the model takes the token ids, otherwise the embeddings.
+            :param since: datetime, default = None
+                The first creation time of the rescored rows, inclusive.
+            :param until: datetime, default = None
+                The last creation time of the rescored rows, exclusive.
+            :param changes_path: str, default = None
+                The JSON lines file where the rows with a changed prediction are written, if None they aren't written.
+            :param deduplicate: bool, default = True
+                If True and the model takes the token ids, the identical rows are forwarded once.
+            :return: dict
+                The number of rows, the throughput, the agreement with the recorded predictions and the most frequent changes.
+    '''
+    start_time = time.perf_counter()
+    start, end = feature_store.row_range(since, until)
+
+    # Forwarding the rows in batches, the memory-mapped pages are read only once.
+    # The embeddings of the unknown words may differ for the same token ids, so only the token ids are deduplicated.
+    if fused and deduplicate:
+        token_ids = np.asarray(feature_store.arrays["token_ids"][start:end])
+        first_rows, inverse = distinct_rows(token_ids)
+        distinct_indices = np.empty(len(first_rows), dtype=np.int64)
+        with torch.no_grad():
+            for batch_start in range(0, len(first_rows), batch_size):
+                batch_rows = first_rows[batch_start:batch_start + batch_size]
+                logits = model_version.model(torch.from_numpy(token_ids[batch_rows].astype(np.int64)))
+                distinct_indices[batch_start:batch_start + len(batch_rows)] = logits.argmax(dim=1).numpy()
+        indices = distinct_indices[inverse]
+        forwarded_row_number = len(first_rows)
+    else:
+        indices = np.empty(end - start, dtype=np.int64)
+        with torch.no_grad():
+            for batch_start in range(start, end, batch_size):
+                batch_end = min(batch_start + batch_size, end)
+                logits = model_version.model(feature_store.inputs(batch_start, batch_end, fused))
+                indices[batch_start - start:batch_end - start] = logits.argmax(dim=1).numpy()
+        forwarded_row_number = end - start
+
+    # Comparing the new predictions with the recorded ones.
+    intents = np.array([model_version.index2intent_mapper[str(index)] for index in range(len(model_version.index2intent_mapper))],
+                       dtype=PREDICTION_DTYPE)
+    predictions = intents[indices]
+    previous_predictions = np.asarray(feature_store.arrays["predictions"][start:end])
+    changed_rows = np.flatnonzero(predictions != previous_predictions)
+
+    changes = dict()
+    for row in changed_rows:
+        change = (previous_predictions[row].decode(), predictions[row].decode())
+        changes[change] = changes.get(change, 0) + 1
+    if changes_path is not None:
+        with open(changes_path, "w") as changes_file:
+            for row in changed_rows:
+                changes_file.write(json.dumps({
+                    "id" : feature_store.arrays["ids"][start + row].decode(),
+                    "previous_prediction" : previous_predictions[row].decode(),
+                    "prediction" : predictions[row].decode()
+                }) + "\n")
+
+    duration = time.perf_counter() - start_time
+    intent_names, intent_counts = np.unique(predictions, return_counts=True)
+    return {
+        "model_version" : model_version.version,
+        "rows" : end - start,
+        "forwarded_rows" : forwarded_row_number,
+        "duration" : duration,
+        "rows_per_second" : (end - start) / duration if duration > 0 else None,
+        "agreement" : 1 - len(changed_rows) / (end - start) if end > start else None,
+        "changed_rows" : len(changed_rows),
+        "intent_counts" : {name.decode() : int(count) for name, count in zip(intent_names, intent_counts)},
+        "top_changes" : [
+            {"previous_prediction" : previous, "prediction" : prediction, "rows" : count}
+            for (previous, prediction), count in sorted(changes.items(), key=lambda item : -item[1])[:20]
+        ]
+    }
+
+
+def parse_datetime(value : str) -> datetime.datetime:
+    '''
+        This function parses a naive UTC datetime in the ISO format, the type of the since and until arguments.
+    '''
+    return datetime.datetime.fromisoformat(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature store of the tokenized historical traffic and its re-scoring with a model checkpoint.")
+    parser.add_argument("--config", default="config.ini")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    build_parser = subparsers.add_parser("build", help="Stores the token ids and the embeddings of the intents table.")
+    build_parser.add_argument("path", help="The directory of the feature store.")
+    build_parser.add_argument("--chunk-size", type=int, default=10000)
+    build_parser.add_argument("--embeddings", action="store_true", help="Stores the embeddings, needed for the models taking embeddings.")
+    build_parser.add_argument("--embedding-dtype", choices=["float16", "float32"], default="float32")
+    build_parser.add_argument("--since", type=parse_datetime)
+    build_parser.add_argument("--until", type=parse_datetime)
+
+    rescore_parser = subparsers.add_parser("rescore", help="Predicts the intents of the stored rows with a model checkpoint.")
+    rescore_parser.add_argument("path", help="The directory of the feature store.")
+    rescore_parser.add_argument("model_path", help="The path of the PyTorch model saved with torch.save.")
+    rescore_parser.add_argument("--index2intent-mapper-path", help="The mapper of the model, by default the one of the configuration.")
+    rescore_parser.add_argument("--batch-size", type=int, default=1024)
+    rescore_parser.add_argument("--threads", type=int, help="The number of intra-op threads of PyTorch.")
+    rescore_parser.add_argument("--since", type=parse_datetime)
+    rescore_parser.add_argument("--until", type=parse_datetime)
+    rescore_parser.add_argument("--changes-path", help="The JSON lines file of the rows with a changed prediction.")
+    args = parser.parse_args()
+
+    config = ConfigManager(args.config)
+    if args.command == "build":
+        manifest = build_feature_store(
+            create_engine(get_database_uri(config.database)),
+            WordEmbedderFactory().get_word_embedding(config.word_embedding_dict),
+            args.path, args.chunk_size, args.embeddings, args.embedding_dtype, args.since, args.until,
+            config.word_embedding_dict
+        )
+        print(json.dumps(manifest, indent=4))
+    else:
+        if args.threads is not None:
+            torch.set_num_threads(args.threads)
+        feature_store = FeatureStore(args.path)
+
+        # Fusing the model with the embedding table if the store has only the token ids.
+        # The token ids are rows of the table of the embedder that built the store.
+        embedding_vectors = None
+        fused = not feature_store.manifest["embeddings"]
+        if fused:
+            if feature_store.manifest["word_embedding"] != config.word_embedding_dict:
+                raise Exception(f"The feature store was built with {feature_store.manifest['word_embedding']}, "
+                                f"its token ids don't match the configured word embedding!")
+            embedding_vectors = WordEmbedderFactory().get_word_embedding(config.word_embedding_dict).embedding_vectors()
+        model_version = load_model_version(args.model_path, args.index2intent_mapper_path or config.neural_network.index2intent_mapper_path,
+                                           embedding_vectors=embedding_vectors)
+        statistics = rescore(feature_store, model_version, args.batch_size, fused, args.since, args.until, args.changes_path)
+        print(json.dumps(statistics, indent=4))
@@ -1,46 +1,199 @@
 # Importing the external libraries.
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_script import Manager
 from flask_migrate import Migrate
+from sqlalchemy import and_, or_, inspect
+from werkzeug.serving import make_server
 import threading
-import requests
+import signal
+import datetime
 import uuid
+import time
+import json
+import os
 
 # Importing the internal libraries.
 from executor.executor import TaskExecutorManager
+from executor.autoscaler import ExecutorAutoscaler
+from executor.profiler import SlowRequestProfiler
+from executor.model_registry import ModelReloader
+from executor.shadow import ShadowEvaluator
 from executor.task import Task
 from word_embedders.factory import WordEmbedderFactory
 from cerber import SecurityManager
-from schemas import IntentTextSchema
-from config import ConfigManager
+from sidecar import SidecarClient
+from drain import DrainGate
+from tracing import Tracer, NOOP_TRACE
+from diagnostics import MemoryDiagnostics
+from serialization import ContentNegotiator
+from schemas import IntentTextSchema, IntentQuerySchema, KeysetCursor, ModelReloadSchema
+from metrics import MetricsRegistry
+from config import ConfigManager, get_database_uri
 
 # Loading the configuration from the configuration file.
-config = ConfigManager("config.ini")
+config = ConfigManager(os.environ.get("INTENT_SERVICE_CONFIG", "config.ini"))
 
 # Creation of the Security Manager.
 security_manager = SecurityManager(config.security.secret_key)
 
-# Setting up the sqlalchemy database uri.
-sqlalchemy_database_uri = f"postgresql://{config.database.username}:{config.database.password}@{config.database.host}/{config.database.table}"
+# Setting up the sqlalchemy database uri, an explicit uri overrides the PostgreSQL settings.
+sqlalchemy_database_uri = get_database_uri(config.database)
+
+# Setting up the connection pool of the database engine, SQLite uses its own pool without these options.
+sqlalchemy_engine_options = dict()
+if not sqlalchemy_database_uri.startswith("sqlite"):
+    for option in ["pool_size", "max_overflow", "pool_timeout", "pool_pre_ping", "pool_recycle"]:
+        if hasattr(config.database, option):
+            sqlalchemy_engine_options[option] = getattr(config.database, option)
+
+    # Limiting the duration of every statement on the PostgreSQL server, in milliseconds.
+    if hasattr(config.database, "statement_timeout") and sqlalchemy_database_uri.startswith("postgresql"):
+        sqlalchemy_engine_options["connect_args"] = {"options" : f"-c statement_timeout={config.database.statement_timeout}"}
 
 # Creation of the intent schema.
-intent_schema = IntentTextSchema()
+intent_schema = IntentTextSchema(context={"priority_classes" : config.priority_classes_dict})
+intent_query_schema = IntentQuerySchema(context={
+    "default_page_size" : config.query.default_page_size,
+    "max_page_size" : config.query.max_page_size
+})
+keyset_cursor = KeysetCursor()
+model_reload_schema = ModelReloadSchema()
+
+# Creation of the content negotiator of the /intent bodies, JSON or MessagePack.
+content_negotiator = ContentNegotiator(config.serialization)
 
 # Setting up the Flask dependencies.
 app = Flask(__name__)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config["SQLALCHEMY_DATABASE_URI"] = sqlalchemy_database_uri
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqlalchemy_engine_options
 app.secret_key = config.security.secret_key
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
-# Loading the word embedding.
-glove = WordEmbedderFactory().get_word_embedding(config.word_embedding_dict)
+# The components loading the models and running threads are created by the start function,
+# so importing the module, like `flask db upgrade` does, doesn't load or announce an instance.
+glove = None
+profiler = None
+shadow = None
+tracer = None
+TASK_EXECUTOR = None
+DIAGNOSTICS = None
+AUTOSCALER = None
+MODEL_RELOADER = None
+SIDECAR = None
+
+# Creation of the metrics registry and the latency histograms.
+METRICS = MetricsRegistry()
+LATENCY_HISTOGRAMS = {
+    "lock_time_per_process" : METRICS.histogram("intent_lock_time_seconds", "Time spent waiting for the admission lock."),
+    "queue_waiting_time" : METRICS.histogram("intent_queue_waiting_time_seconds", "Time spent by tasks in the execution queue."),
+    "db_response_time" : METRICS.histogram("intent_database_response_time_seconds", "Time spent writing the prediction to the database."),
+    "task_service_time" : METRICS.histogram("intent_task_service_time_seconds", "Total time spent serving an /intent request.")
+}
+STAGE_HISTOGRAMS = {
+    "tokenize" : METRICS.histogram("intent_tokenize_time_seconds", "Time spent tokenizing a text."),
+    "embed" : METRICS.histogram("intent_embedding_time_seconds", "Time spent getting the embeddings of the tokens."),
+    "forward" : METRICS.histogram("intent_model_time_seconds", "Time spent in the forward pass of the model.")
+}
+
+# Registering the gauges read from the Task Executor.
+METRICS.gauge("intent_waiting_queue_length", "Number of tasks waiting in the execution queue.",
+              lambda: TASK_EXECUTOR.scheduler.qsize())
+METRICS.gauge("intent_workers", "Number of running execution workers.",
+              lambda: TASK_EXECUTOR.worker_statistics()["workers"])
+METRICS.gauge("intent_target_workers", "Number of execution workers requested by the last scaling action.",
+              lambda: TASK_EXECUTOR.worker_statistics()["target_workers"])
+METRICS.gauge("intent_stopping_workers", "Number of stopped execution workers still finishing their batch.",
+              lambda: TASK_EXECUTOR.worker_statistics()["stopping_workers"])
+METRICS.gauge("intent_failed_workers_total", "Number of execution workers that exited without a stop request.",
+              lambda: TASK_EXECUTOR.worker_statistics()["failed_workers"], metric_type="counter")
+METRICS.gauge("intent_restarted_workers_total", "Number of failed execution workers replaced by a new worker.",
+              lambda: TASK_EXECUTOR.worker_statistics()["restarted_workers"], metric_type="counter")
+METRICS.gauge("intent_failed_batches_total", "Number of batches whose prediction raised an exception.",
+              lambda: TASK_EXECUTOR.worker_statistics()["failed_batches"], metric_type="counter")
+METRICS.gauge("intent_busy_workers", "Number of execution workers processing a batch.",
+              lambda: TASK_EXECUTOR.worker_statistics()["busy_workers"])
+METRICS.gauge("intent_batch_size", "Maximal number of tasks executed together by a worker.",
+              lambda: TASK_EXECUTOR.worker_statistics()["batch_size"])
+METRICS.gauge("intent_autoscaler_failed_steps_total", "Number of autoscaling decisions that raised an exception.",
+              lambda: AUTOSCALER.failed_step_number, metric_type="counter")
+METRICS.gauge("intent_service_rate", "Number of tasks finished per second.",
+              lambda: TASK_EXECUTOR.service_rate.rate())
+METRICS.gauge("intent_shed_tasks_total", "Number of requests rejected because the queue was full.",
+              lambda: TASK_EXECUTOR.shed_task_number, metric_type="counter")
+METRICS.gauge("intent_admitted_tasks_total", "Number of requests admitted to the Task Executor.",
+              lambda: TASK_EXECUTOR.admitted_task_number, metric_type="counter")
+METRICS.gauge("intent_coalesced_tasks_total", "Number of requests that reused the inference of an identical request in flight.",
+              lambda: TASK_EXECUTOR.coalesced_task_number, metric_type="counter")
+METRICS.gauge("intent_coalesce_rate", "Share of the admitted requests that reused the inference of an identical request.",
+              lambda: TASK_EXECUTOR.coalesce_rate())
+METRICS.gauge("intent_expired_tasks_total", "Number of tasks dropped because their deadline expired.",
+              lambda: TASK_EXECUTOR.scheduler.expired_task_number, metric_type="counter")
+MODEL_RELOAD_HISTOGRAM = METRICS.histogram("intent_model_reload_time_seconds",
+                                           "Time spent loading and validating a new model version.")
+
+METRICS.gauge("intent_model_reloads_total", "Number of successful model reloads.",
+              lambda: MODEL_RELOADER.reload_number, metric_type="counter")
+METRICS.gauge("intent_model_failed_reloads_total", "Number of model reloads rejected by the loading or the validation.",
+              lambda: MODEL_RELOADER.failed_reload_number, metric_type="counter")
+DB_ERRORS = METRICS.counter("intent_database_errors_total", "Number of failed writes to the database.")
+DB_POOL_WAIT_HISTOGRAM = METRICS.histogram("intent_database_pool_wait_time_seconds",
+                                           "Time spent waiting for a connection from the database pool.")
+
+
+def get_pool_statistic(statistic : str):
+    '''
+        This function returns a statistic of the database connection pool.
+            :param statistic: str
+                The name of the pool method, like checkedout or overflow.
+            :return: int
+                The statistic or None if the pool doesn't provide it.
+    '''
+    pool_statistic = getattr(db.engine.pool, statistic, None)
+    return pool_statistic() if pool_statistic is not None else None
+
+
+# Registering the gauges of the process.
+METRICS.gauge("intent_process_rss_bytes", "Resident set size of the service process.",
+              lambda: DIAGNOSTICS.process.memory_info().rss)
+METRICS.gauge("intent_threads", "Number of live threads of the service process.",
+              lambda: threading.active_count())
+
+# Registering the gauges of the database connection pool.
+METRICS.gauge("intent_database_pool_size", "Number of connections kept open in the database pool.",
+              lambda: get_pool_statistic("size"))
+METRICS.gauge("intent_database_pool_checked_out", "Number of database connections in use.",
+              lambda: get_pool_statistic("checkedout"))
+METRICS.gauge("intent_database_pool_overflow", "Number of database connections opened over the pool size.",
+              lambda: get_pool_statistic("overflow"))
+
 
-# Creation of the Task Executor.
-TASK_EXECUTOR = TaskExecutorManager(config.neural_network, glove)
+FIRST_REQUEST_LOCK = threading.Lock()
+first_request_served = False
+
+
+def observe_task_metrics(task : Task) -> None:
+    '''
+        This function records the latency metrics of a served task in the histograms.
+        The latency of the first request is logged, to compare the cold start with and without the warm-up.
+            :param task: Task
+                The served task.
+    '''
+    global first_request_served
+    with FIRST_REQUEST_LOCK:
+        first_request = not first_request_served
+        first_request_served = True
+    if first_request:
+        print(f"first request served in {task.task_service_time * 1000:.1f}ms "
+              f"(actual processing {task.actual_processing * 1000:.1f}ms, warm-up enabled={config.warm_up.enabled})")
+
+    for attribute, histogram in LATENCY_HISTOGRAMS.items():
+        histogram.observe(getattr(task, attribute, None))
+    for stage, histogram in STAGE_HISTOGRAMS.items():
+        histogram.observe(task.stage_time(stage))
 
 # Defining the IntentModel Dadabase.
 class IntentsModel(db.Model):
@@ -49,9 +202,13 @@ class IntentsModel(db.Model):
 
     # Setting up the column names and data types.
     id = db.Column(db.String(64), primary_key=True)
-    correlation_id = db.Column(db.String(64), unique=False)
+    correlation_id = db.Column(db.String(64), unique=False, index=True)
     text = db.Column(db.Text, unique=False)
     prediction = db.Column(db.String(32), unique=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    # Setting up the index used by the time range filters and the keyset pagination.
+    __table_args__ = (db.Index("ix_intents_created_at_id", "created_at", "id"),)
 
     def __init__(self, index : str, text : str, correlation_id : str, prediction : str):
         '''
@@ -76,103 +233,444 @@ class IntentsModel(db.Model):
         '''
         return f"<text id={self.id} text={self.text} prediction={self.prediction} correlation_id={self.correlation_id}>"
 
+    def json(self) -> dict:
+        '''
+            This function converts the record into a dictionary.
+        '''
+        return {
+            "id" : self.id,
+            "correlation_id" : self.correlation_id,
+            "text" : self.text,
+            "prediction" : self.prediction,
+            "created_at" : self.created_at.isoformat()
+        }
+
 
-# Creation of the tables in the database.
-with app.app_context():
-    db.create_all()
-    db.session.commit()
+# The totals of the previous load report, the heartbeats report the latency and the cache hit rate of the last interval.
+load_report_state = {"service_time_totals" : None, "cache_statistics" : None}
 
-while True:
-    sidecar_hmac = SecurityManager(config.service_sidecar.secret_key)._SecurityManager__encode_hmac(
-        config.generate_info_for_service_discovery()
-    )
-    resp = requests.post(
-        f"http://{config.service_sidecar.host}:{config.service_sidecar.port}/{config.service_sidecar.register_endpoint}",
-        json = config.generate_info_for_service_discovery(),
-        headers={"Token" : sidecar_hmac}
-    )
-    if resp.status_code == 200:
-        break
+
+def generate_load_report() -> dict:
+    '''
+        This function returns the load of the service sent to the sidecar with every heartbeat.
+        The p95 latency and the tokenization cache hit rate are computed over the interval
+        since the previous report.
+    '''
+    worker_statistics = TASK_EXECUTOR.worker_statistics()
+
+    # Computing the p95 service time of the interval.
+    service_time_histogram = LATENCY_HISTOGRAMS["task_service_time"]
+    service_time_totals = service_time_histogram.totals()
+    if load_report_state["service_time_totals"] is not None:
+        interval_totals = [total - previous for total, previous in zip(service_time_totals, load_report_state["service_time_totals"])]
+    else:
+        interval_totals = service_time_totals
+    load_report_state["service_time_totals"] = service_time_totals
+
+    # Computing the tokenization cache hit rate of the interval.
+    cache_hit_rate = None
+    if hasattr(glove.tokenize_fun, "cache_statistics"):
+        cache_statistics = glove.tokenize_fun.cache_statistics()
+        previous_statistics = load_report_state["cache_statistics"] or {"hits" : 0, "misses" : 0}
+        hits = cache_statistics["hits"] - previous_statistics["hits"]
+        lookups = hits + cache_statistics["misses"] - previous_statistics["misses"]
+        cache_hit_rate = hits / lookups if lookups > 0 else None
+        load_report_state["cache_statistics"] = cache_statistics
+
+    return {
+        "queue_length" : TASK_EXECUTOR.scheduler.qsize(),
+        "queue_size_limit" : TASK_EXECUTOR.queue_size_limit,
+        "workers" : worker_statistics["workers"],
+        "busy_workers" : worker_statistics["busy_workers"],
+        "batch_size" : worker_statistics["batch_size"],
+        "service_rate" : TASK_EXECUTOR.service_rate.rate(),
+        "p95_latency" : service_time_histogram.quantile(0.95, interval_totals),
+        "cache_hit_rate" : cache_hit_rate,
+        "shed_tasks" : TASK_EXECUTOR.shed_task_number
+    }
+
+
+METRICS.gauge("intent_sidecar_registered", "1 if the service is registered with the sidecar.",
+              lambda: int(SIDECAR.registered))
+METRICS.gauge("intent_sidecar_registrations_total", "Number of registrations with the sidecar, more than 1 after sidecar restarts.",
+              lambda: SIDECAR.registration_number, metric_type="counter")
+METRICS.gauge("intent_sidecar_heartbeats_total", "Number of load reports accepted by the sidecar.",
+              lambda: SIDECAR.heartbeat_number, metric_type="counter")
+METRICS.gauge("intent_sidecar_failed_heartbeats_total", "Number of load reports that failed or were rejected.",
+              lambda: SIDECAR.failed_heartbeat_number, metric_type="counter")
+
+# Creation of the gate admitting the /intent requests, it is closed when the service drains.
+DRAIN_GATE = DrainGate()
+METRICS.gauge("intent_in_flight_requests", "Number of admitted /intent requests not answered yet.",
+              lambda: DRAIN_GATE.in_flight_number)
+METRICS.gauge("intent_drain_rejected_requests_total", "Number of /intent requests rejected while the service drained.",
+              lambda: DRAIN_GATE.rejected_number, metric_type="counter")
+
+
+@app.before_request
+def admit_request():
+    '''
+        This function admits the /intent requests, while the service drains they are rejected
+        with 503 so the client retries on another replica.
+    '''
+    if request.endpoint != "intent":
+        return None
+    if not DRAIN_GATE.enter():
+        return {
+            "error_code" : 503,
+            "message" : "The service is shutting down"
+        }, 503, {"Retry-After" : str(config.shutdown.retry_after)}
+    g.drain_admitted = True
+    return None
+
+
+@app.teardown_request
+def release_request(exception : Exception = None) -> None:
+    '''
+        This function marks an admitted /intent request as answered, after its database write.
+    '''
+    if g.pop("drain_admitted", False):
+        DRAIN_GATE.exit()
+
+
+@app.before_request
+def start_trace():
+    '''
+        This function starts the trace of a sampled /intent request, keyed on its correlation id.
+    '''
+    if tracer is None or request.endpoint != "intent":
+        return None
+    body = content_negotiator.load_body(request)
+    correlation_id = body.get("correlation_id") if isinstance(body, dict) else None
+    g.trace = tracer.start_trace("intent", request.headers, correlation_id)
+    return None
+
+
+@app.after_request
+def tag_trace(response : Response) -> Response:
+    '''
+        This function tags the trace with the status of the response and returns its trace id to the caller.
+    '''
+    trace = g.get("trace", NOOP_TRACE)
+    if trace.trace_id is not None:
+        trace.tag("http.status_code", response.status_code)
+        response.headers["X-B3-TraceId"] = trace.trace_id
+    return response
+
+
+@app.teardown_request
+def finish_trace(exception : Exception = None) -> None:
+    '''
+        This function exports the trace of the request.
+    '''
+    trace = g.pop("trace", NOOP_TRACE)
+    if exception is not None:
+        trace.tag("error", exception.__class__.__name__)
+    trace.finish()
 
 
 @app.route("/intent", methods=["GET"])
 def intent():
     '''
         This function triggers when the /intent endpoint is called.
+        The bodies are JSON or MessagePack, the response is written in the format negotiated with the client.
+    '''
+    return content_negotiator.make_response(request, *serve_intent())
+
+def serve_intent() -> tuple:
+    '''
+        This function serves an /intent request.
+            :return: tuple
+                The body of the response, its status code and optionally its headers.
     '''
+    # Getting the trace of the request, the spans of the requests that aren't sampled do nothing.
+    trace = g.get("trace", NOOP_TRACE)
+
     # Checking the access token.
-    check_response = security_manager.check_request(request)
+    with trace.span("auth"):
+        check_response = security_manager.check_request(request)
     if check_response != "OK":
         return check_response, check_response["code"]
+    elif not content_negotiator.is_supported(request):
+        return {
+            "message" : f"The content type {request.mimetype} isn't supported",
+            "code" : 415
+        }, 415
     else:
         status_code = 200
 
-        # Validation of the json.
-        result, status_code = intent_schema.validate_json(request.json)
+        # Validation of the body, decoded from its content type.
+        with trace.span("validation"):
+            result, status_code = intent_schema.validate_json(content_negotiator.load_body(request))
         if status_code != 200:
             # If the request body didn't passed the json validation a error is returned.
             return result, status_code
         else:
-            # Checking the number of available processes.
-            if TASK_EXECUTOR.available_process_num() > 0:
-                # Creation of the task.
-                task = Task(
-                    result["text"],
-                    threading.Condition()
-                )
-
-                # Setting the time checkpoint for lock time metric.
-                task.set_timer_lock_time()
-
-                # Adding the task to queue.
-                TASK_EXECUTOR.add_to_queue(task)
-
-                # Waiting for the task to process.
-                with task.condition:
-                    task.condition.wait()
-
-                # Generating the universally unique identifier.
-                index = str(uuid.uuid4())
-
-                # Setting the time checkpoint for database response metric.
-                task.set_timer_db_response_time()
-
-                # Creating a new record of Intent.
-                new_intent_record = IntentsModel(
-                    index,
-                    result["text"],
-                    request.json["correlation_id"],
-                    task.prediction
-                )
-
-                # Adding the record to the database.
+            # Creation of the task.
+            task = Task(
+                result["text"],
+                threading.Condition(),
+                priority=result.get("priority"),
+                deadline=result.get("deadline"),
+                return_scores=result.get("scores", False)
+            )
+
+            # Setting the time checkpoint for lock time metric.
+            task.set_timer_lock_time()
+
+            # Adding the task to queue, if the queue is full the request is shed.
+            with trace.span("admission") as admission_tags:
+                admitted = TASK_EXECUTOR.try_add_to_queue(task)
+                admission_tags["admitted"] = admitted
+            if not admitted:
+                # Returning error if there are to many requests.
+                return {
+                    "error_code" : 429,
+                    "message" : "To much requests"
+                }, 429, {"Retry-After" : str(TASK_EXECUTOR.retry_after())}
+
+            # Waiting for the task to process, at most for the task wait timeout.
+            queue_start = time.perf_counter()
+            finished = task.wait(config.neural_network.task_wait_timeout)
+            trace.add_task_spans(task, queue_start)
+
+            # Returning error if the task wasn't processed in time.
+            if not finished:
+                return {
+                    "error_code" : 504,
+                    "message" : "The request wasn't processed before the task wait timeout"
+                }, 504
+
+            # Returning error if the task was dropped because its deadline expired.
+            if task.expired:
+                return {
+                    "error_code" : 504,
+                    "message" : "The deadline of the request expired before processing"
+                }, 504
+
+            # Returning error if the prediction of the task failed.
+            if task.failed:
+                return {
+                    "error_code" : 500,
+                    "message" : "The prediction of the request failed",
+                    "errors" : {
+                        "prediction_error" : task.error
+                    }
+                }, 500
+
+            # Generating the universally unique identifier.
+            index = str(uuid.uuid4())
+
+            # Setting the time checkpoint for database response metric.
+            task.set_timer_db_response_time()
+
+            # Creating a new record of Intent.
+            new_intent_record = IntentsModel(
+                index,
+                result["text"],
+                result["correlation_id"],
+                task.prediction
+            )
+
+            # Adding the record to the database.
+            with trace.span("db_write") as db_write_tags:
                 db.session.add(new_intent_record)
                 try:
+                    # Getting the connection of the session explicitly to measure the wait for the pool.
+                    pool_wait_start = time.perf_counter()
+                    db.session.connection()
+                    DB_POOL_WAIT_HISTOGRAM.observe(time.perf_counter() - pool_wait_start)
+
                     db.session.commit()
                 except Exception as e:
+                    # Rolling back the session, so its connection returns to the pool in a clean state.
+                    db.session.rollback()
+
                     error = {
                         "name" : e.__class__.__name__,
                         "cause" : e.__cause__.__repr__()
                     }
                     print(error)
+                    db_write_tags["error"] = error["name"]
                     # Calculating the database response time metric.
                     task.compute_db_response_time()
 
                     # Adding the database error.
                     task.add_db_error(error)
+                    DB_ERRORS.inc()
 
-                    return task.json(), 500
+                    response = task_response(task, result)
+                    observe_task_metrics(task)
+                    return response, 500
 
-                # Calculating the database response time metric.
-                task.compute_db_response_time()
+            # Calculating the database response time metric.
+            task.compute_db_response_time()
 
-                return task.json(), status_code
-            else:
-                # Returning error if there are to many requests.
-                return {
-                    "error_code" : 429,
-                    "message" : "To much requests"
-                }, 429
+            response = task_response(task, result)
+            observe_task_metrics(task)
+            return response, status_code
+
+def task_response(task : Task, result : dict) -> dict:
+    '''
+        This function converts a served task into the response body of the profile asked by the client.
+            :param task: Task
+                The served task.
+            :param result: dict
+                The validated body of the request.
+            :return: dict
+                The full body with the metrics or the compact body with only the prediction.
+    '''
+    if result.get("response_profile", config.serialization.default_response_profile) == "compact":
+        return task.compact_json()
+    return task.json(config.metrics.response_metrics)
+
+def generate_intents_page(query : "Query", limit : int):
+    '''
+        This function streams a page of stored predictions as a JSON document, fetching the
+        records from the database in chunks instead of loading the whole page.
+            :param query: Query
+                The ordered query of the page, limited to one record more than the page size.
+            :param limit: int
+                The page size.
+    '''
+    yield '{"intents" : ['
+    last_record, next_cursor = None, None
+    for number, record in enumerate(query):
+        # The additional record only shows that there is a next page.
+        if number == limit:
+            next_cursor = keyset_cursor.serialize("cursor", {"cursor" : (last_record.created_at, last_record.id)})
+            break
+        yield ("," if number else "") + json.dumps(record.json())
+        last_record = record
+    yield f'], "next_cursor" : {json.dumps(next_cursor)}}}'
+
+@app.route("/intents", methods=["GET"])
+def intents():
+    '''
+        This function is triggered when the /intents endpoint is called.
+        It returns the stored predictions filtered by the query parameters, ordered by the
+        creation time and paginated with the cursor of the previous page.
+    '''
+    # Checking the access token.
+    check_response = security_manager.check_request(request)
+    if check_response != "OK":
+        return check_response, check_response["code"]
+
+    # Validation of the query parameters.
+    result, status_code = intent_query_schema.validate_json(request.args.to_dict())
+    if status_code != 200:
+        return result, status_code
+
+    # Filtering the predictions.
+    query = IntentsModel.query
+    if "correlation_id" in result:
+        query = query.filter(IntentsModel.correlation_id == result["correlation_id"])
+    if "prediction" in result:
+        query = query.filter(IntentsModel.prediction == result["prediction"])
+    if "since" in result:
+        query = query.filter(IntentsModel.created_at >= result["since"])
+    if "until" in result:
+        query = query.filter(IntentsModel.created_at < result["until"])
+
+    # Continuing after the last record of the previous page.
+    if "cursor" in result:
+        created_at, index = result["cursor"]
+        query = query.filter(or_(
+            IntentsModel.created_at > created_at,
+            and_(IntentsModel.created_at == created_at, IntentsModel.id > index)
+        ))
+
+    query = query.order_by(IntentsModel.created_at, IntentsModel.id).limit(result["limit"] + 1)\
+        .yield_per(config.query.fetch_chunk_size)
+    return Response(stream_with_context(generate_intents_page(query, result["limit"])), mimetype="application/json")
+
+@app.route("/queue", methods=["GET"])
+def queue():
+    '''
+        This function is triggered when the /queue endpoint is called.
+        It returns the statistics of the execution queue of the Task Executor.
+    '''
+    # Checking the access token.
+    check_response = security_manager.check_request(request)
+    if check_response != "OK":
+        return check_response, check_response["code"]
+    else:
+        return TASK_EXECUTOR.queue_statistics(), 200
+
+@app.route("/debug/memory", methods=["GET"])
+def debug_memory():
+    '''
+        This function is triggered when the /debug/memory endpoint is called.
+        It returns the memory and thread statistics of the process and the sizes of its queues.
+    '''
+    # Checking the access token.
+    check_response = security_manager.check_request(request)
+    if check_response != "OK":
+        return check_response, check_response["code"]
+    else:
+        statistics = DIAGNOSTICS.statistics(request.args.get("top", type=int))
+        statistics["workers"] = TASK_EXECUTOR.worker_statistics()
+        statistics["queues"] = {
+            "waiting_queue_length" : TASK_EXECUTOR.scheduler.qsize(),
+            "in_flight_texts" : len(TASK_EXECUTOR.in_flight_tasks),
+            "in_flight_requests" : DRAIN_GATE.in_flight_number,
+            "shadow_queue_length" : shadow.queue.qsize() if shadow is not None else None,
+            "tracing_queue_length" : tracer.queue.qsize() if tracer is not None else None
+        }
+        statistics["database_pool"] = {
+            statistic : get_pool_statistic(statistic) for statistic in ["size", "checkedout", "overflow"]
+        }
+        return statistics, 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    '''
+        This function is triggered when the /metrics endpoint is called.
+        It returns the service metrics in the Prometheus text exposition format.
+    '''
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/reload", methods=["POST"])
+def reload():
+    '''
+        This function is triggered when the /reload endpoint is called.
+        It loads a new version of the model in the background and swaps it in after the validation.
+    '''
+    # Checking the access token.
+    check_response = security_manager.check_request(request)
+    if check_response != "OK":
+        return check_response, check_response["code"]
+
+    # Validation of the optional paths of the new model version.
+    result, status_code = model_reload_schema.validate_json(request.get_json(silent=True) or {})
+    if status_code != 200:
+        return result, status_code
+
+    if not MODEL_RELOADER.reload_in_background(result.get("model_path"), result.get("index2intent_mapper_path")):
+        return {
+            "message" : "A model reload is already running",
+            "code" : 409
+        }, 409
+    return {
+        "message" : "The model reload was started",
+        "code" : 202
+    }, 202
+
+@app.route("/model", methods=["GET"])
+def model():
+    '''
+        This function is triggered when the /model endpoint is called.
+        It returns the active model version, the state of the reloads and the shadow model comparison.
+    '''
+    # Checking the access token.
+    check_response = security_manager.check_request(request)
+    if check_response != "OK":
+        return check_response, check_response["code"]
+    else:
+        statistics = MODEL_RELOADER.statistics()
+        if shadow is not None:
+            statistics["shadow"] = shadow.statistics()
+        return statistics, 200
 
 @app.route("/increase", methods=["POST"])
 def increase():
@@ -186,11 +684,19 @@ def increase():
         return check_response, check_response["code"]
     else:
         # Increasing the number of executor processes on the Task Executor.
-        TASK_EXECUTOR.increase()
+        # The manual scaling overrides the autoscaler for a while.
+        AUTOSCALER.hold()
+        statistics = TASK_EXECUTOR.increase()
+        if statistics is None:
+            return {
+                "message" : f"The number of running threads is already at the upper bound of {TASK_EXECUTOR.max_workers}",
+                "code" : 409
+            }, 409
 
         return {
             "message" : "The number of running threads was increased",
-            "code" : 200
+            "code" : 200,
+            "workers" : statistics
         }, 200
 
 @app.route("/decrease", methods=["POST"])
@@ -205,17 +711,217 @@ def decrease():
         return check_response, check_response["code"]
     else:
         # Decreases the number of executor processes on the Task Executor.
-        TASK_EXECUTOR.decrease()
+        # The manual scaling overrides the autoscaler for a while.
+        AUTOSCALER.hold()
+        statistics = TASK_EXECUTOR.decrease()
+        if statistics is None:
+            return {
+                "message" : f"The number of running threads is already at the lower bound of {TASK_EXECUTOR.min_workers}",
+                "code" : 409
+            }, 409
         return {
                    "message" : "The number of running threads was decreased",
-                   "code" : 200
+                   "code" : 200,
+                   "workers" : statistics
                }, 200
 
+@app.route("/scale", methods=["POST"])
+def scale():
+    '''
+        This function is triggered when the /scale endpoint is called.
+        It scales the Task Executor to the number of workers given by the workers query argument,
+        the stopped workers finish their batch and are joined before the response.
+    '''
+    # Checking the access token.
+    check_response = security_manager.check_request(request)
+    if check_response != "OK":
+        return check_response, check_response["code"]
+
+    # Validation of the number of workers.
+    worker_number = request.args.get("workers", type=int)
+    if worker_number is None or not TASK_EXECUTOR.is_valid_worker_number(worker_number):
+        return {
+            "message" : f"The workers query argument must be an integer between {TASK_EXECUTOR.min_workers} "
+                        f"and {TASK_EXECUTOR.max_workers}",
+            "code" : 400
+        }, 400
+
+    # Scaling the Task Executor, the manual scaling overrides the autoscaler for a while.
+    AUTOSCALER.hold()
+    statistics = TASK_EXECUTOR.scale(worker_number)
+    if statistics["stuck"]:
+        return {
+            "message" : f"The workers were scaled to {worker_number}, {len(statistics['stuck'])} stopped workers are still finishing their batch",
+            "code" : 202,
+            "workers" : statistics
+        }, 202
+    return {
+        "message" : f"The workers were scaled to {worker_number}",
+        "code" : 200,
+        "workers" : statistics
+    }, 200
+
+def start() -> None:
+    '''
+        This function loads the word embedding and the models, starts the workers and the optional
+        background threads, creates the tables and registers the service with the sidecar.
+        The following calls do nothing.
+    '''
+    global glove, profiler, shadow, tracer, TASK_EXECUTOR, DIAGNOSTICS, AUTOSCALER, MODEL_RELOADER, SIDECAR
+    if TASK_EXECUTOR is not None:
+        return
+
+    # Loading the word embedding.
+    glove = WordEmbedderFactory().get_word_embedding(config.word_embedding_dict)
+
+    # Creation of the optional profiler of the slowest requests.
+    profiler = None
+    if config.profiler.enabled:
+        profiler = SlowRequestProfiler(config.profiler)
+        profiler.start()
+
+    # Creation of the optional shadow model evaluated on a sample of the live traffic.
+    shadow = None
+    if config.shadow.enabled:
+        shadow = ShadowEvaluator(config.shadow, config.neural_network.index2intent_mapper_path,
+                                 glove.embedding_vectors() if config.neural_network.fused_embedding else None)
+        shadow.start()
+
+    # Creation of the optional tracer of the sampled requests.
+    tracer = None
+    if config.tracing.enabled:
+        tracer = Tracer(config.tracing, config.general.name)
+        tracer.start()
+
+    # Creation of the Task Executor.
+    TASK_EXECUTOR = TaskExecutorManager(config.neural_network, glove, config.priority_classes_dict, profiler, shadow)
+
+    # Warming up the prediction path before the service registers itself as ready.
+    if config.warm_up.enabled:
+        TASK_EXECUTOR.warm_up(
+            config.warm_up,
+            config.autoscaling.max_batch_size if config.autoscaling.enabled else config.neural_network.batch_size
+        )
+
+    # Creation of the memory diagnostics, the tracemalloc baseline is taken after the warm-up.
+    DIAGNOSTICS = MemoryDiagnostics(config.debug)
+
+    # Creation of the Task Executor autoscaler.
+    AUTOSCALER = ExecutorAutoscaler(TASK_EXECUTOR, config.autoscaling)
+    if config.autoscaling.enabled:
+        AUTOSCALER.start()
+
+    # Registering the gauges of the optional components.
+    if hasattr(glove.tokenize_fun, "cache_statistics"):
+        METRICS.gauge("intent_tokenizer_cache_hits_total", "Number of documents found in the tokenization cache.",
+                      lambda: glove.tokenize_fun.cache_statistics()["hits"], metric_type="counter")
+        METRICS.gauge("intent_tokenizer_cache_misses_total", "Number of documents missing from the tokenization cache.",
+                      lambda: glove.tokenize_fun.cache_statistics()["misses"], metric_type="counter")
+        METRICS.gauge("intent_tokenizer_cache_size", "Number of documents kept in the tokenization cache.",
+                      lambda: glove.tokenize_fun.cache_statistics()["size"])
+    if shadow is not None:
+        METRICS.gauge("intent_shadow_agreement_rate", "Share of the sampled predictions on which the shadow model agrees.",
+                      lambda: shadow.agreement_rate())
+        METRICS.gauge("intent_shadow_compared_predictions_total", "Number of predictions compared with the shadow model.",
+                      lambda: shadow.compared_prediction_number, metric_type="counter")
+        METRICS.gauge("intent_shadow_dropped_batches_total", "Number of sampled batches dropped because the shadow queue was full.",
+                      lambda: shadow.dropped_batch_number, metric_type="counter")
+        METRICS.gauge("intent_shadow_failed_batches_total", "Number of sampled batches the shadow model failed on.",
+                      lambda: shadow.failed_batch_number, metric_type="counter")
+        METRICS.gauge("intent_shadow_forward_latency_delta_seconds", "Mean difference of the forward pass time of the shadow and the primary model.",
+                      lambda: shadow.statistics()["forward_latency_delta"]["mean"])
+    if tracer is not None:
+        METRICS.gauge("intent_traced_requests_total", "Number of requests sampled for tracing.",
+                      lambda: tracer.traced_request_number, metric_type="counter")
+        METRICS.gauge("intent_exported_spans_total", "Number of spans written by the tracing exporter.",
+                      lambda: tracer.exported_span_number, metric_type="counter")
+        METRICS.gauge("intent_dropped_traces_total", "Number of traces dropped because the tracing queue was full.",
+                      lambda: tracer.dropped_trace_number, metric_type="counter")
+
+    # Creation of the model reloader and the optional watcher of the model files.
+    MODEL_RELOADER = ModelReloader(TASK_EXECUTOR, config.model_reload,
+                                   on_reload=lambda statistics: MODEL_RELOAD_HISTOGRAM.observe(statistics["last_reload_duration"]))
+    if config.model_reload.watch:
+        MODEL_RELOADER.start_watcher()
+
+    # Creation of the tables in the database, the columns added to an existing table need the migrations.
+    with app.app_context():
+        db.create_all()
+        db.session.commit()
+        if "created_at" not in [column["name"] for column in inspect(db.engine).get_columns("intents")]:
+            print("database: the intents table has no created_at column, run `flask db upgrade` before serving")
+
+    # Registering the service with the sidecar and starting the load reporting heartbeats, once everything is ready.
+    SIDECAR = SidecarClient(config.service_sidecar, config.heartbeat, config.generate_info_for_service_discovery(),
+                            generate_load_report)
+    SIDECAR.register_until_success()
+    if config.heartbeat.enabled:
+        SIDECAR.start()
+
+
+def drain(server : "BaseWSGIServer" = None) -> bool:
+    '''
+        This function shuts the service down without losing the admitted requests. It stops
+        admitting new requests, leaves the sidecar, finishes the queued and the running tasks and
+        their database writes, and stops the workers, all within the drain timeout.
+            :param server: BaseWSGIServer, default = None
+                The HTTP server stopped at the end, if None only the service is drained.
+            :return: bool
+                True if everything finished before the drain timeout.
+    '''
+    drain_start = time.perf_counter()
+    deadline = drain_start + config.shutdown.drain_timeout
+    print(f"drain: started, {DRAIN_GATE.in_flight_number} requests in flight, {TASK_EXECUTOR.scheduler.qsize()} tasks queued")
+
+    # Stopping the admission and the scaling, the workers shouldn't change while draining.
+    DRAIN_GATE.close()
+    AUTOSCALER.hold(config.shutdown.drain_timeout)
+
+    # Leaving the sidecar, so the ambassador stops routing requests to the service.
+    SIDECAR.stop(max(deadline - time.perf_counter(), 0))
+    SIDECAR.deregister()
+
+    # Waiting for the admitted requests, they are answered after their database write.
+    requests_finished = DRAIN_GATE.wait_idle(max(deadline - time.perf_counter(), 0))
+    workers_stopped = TASK_EXECUTOR.stop(max(deadline - time.perf_counter(), 0))
+
+    # Closing the database connections of the pool.
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+    # Writing the spans of the last traced requests.
+    if tracer is not None:
+        tracer.close(max(deadline - time.perf_counter(), 0))
+
+    print(f"drain: finished in {time.perf_counter() - drain_start:.2f}s, requests_finished={requests_finished}, "
+          f"workers_stopped={workers_stopped}, in_flight={DRAIN_GATE.in_flight_number}, rejected={DRAIN_GATE.rejected_number}")
+    if server is not None:
+        server.shutdown()
+    return requests_finished and workers_stopped
+
+
+def serve() -> None:
+    '''
+        This function starts the service and serves it until SIGTERM or SIGINT, then drains it and returns.
+    '''
+    start()
+    server = make_server("0.0.0.0", config.general.port, app, threaded=True)
+    drain_threads = []
+
+    def handle_signal(signal_number : int, frame : "frame") -> None:
+        # Draining in a separate thread, the main thread keeps serving the 503 responses.
+        if not drain_threads:
+            print(f"received signal {signal_number}, draining the service")
+            drain_threads.append(threading.Thread(target=drain, args=(server,), name="intent-drain"))
+            drain_threads[0].start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    server.serve_forever()
+    for drain_thread in drain_threads:
+        drain_thread.join()
+
 # Running the main flask module.
 if __name__ == "__main__":
-    app.run(
-        port=config.general.port,
-        #port=6001,
-        host="0.0.0.0"
-        #host="0.0.0.0"
-    )
+    serve()
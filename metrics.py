@@ -0,0 +1,271 @@
+# Importing all needed libraries.
+import threading
+import bisect
+
+# Defining the default buckets for latency histograms in seconds.
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class ThreadShards:
+    def __init__(self, size : int) -> None:
+        '''
+            This class keeps a separate list of counters for every thread, so the hot path
+            updates only thread local memory and never takes a lock. The shards of finished
+            threads are folded into a retired shard when the values are collected.
+                :param size: int
+                    The number of counters in every shard.
+        '''
+        self.size = size
+        self.local = threading.local()
+        self.shards = []
+        self.retired = [0] * size
+        self.lock = threading.Lock()
+
+        # The number of shards after which the finished threads are folded without a collection.
+        self.fold_threshold = 64
+
+    def get(self) -> list:
+        '''
+            This function returns the shard of the current thread, creating it on the first use.
+        '''
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = [0] * self.size
+            self.local.shard = shard
+            with self.lock:
+                self.shards.append((threading.current_thread(), shard))
+
+                # Folding the finished threads once the shards doubled, a server starting a thread
+                # for every request would otherwise keep a shard per request until the next scrape.
+                if len(self.shards) >= self.fold_threshold:
+                    self.fold()
+                    self.fold_threshold = max(2 * len(self.shards), 64)
+        return shard
+
+    def fold(self) -> None:
+        '''
+            This function folds the shards of the finished threads into the retired shard,
+            they can't be updated anymore. It must be called with the lock held.
+        '''
+        alive_shards = []
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                alive_shards.append((thread, shard))
+            else:
+                self.retired = [total + value for total, value in zip(self.retired, shard)]
+        self.shards = alive_shards
+
+    def collect(self) -> list:
+        '''
+            This function sums the counters of all shards.
+                :return: list
+                    The summed counters.
+        '''
+        with self.lock:
+            self.fold()
+            totals = list(self.retired)
+            for _, shard in self.shards:
+                totals = [total + value for total, value in zip(totals, shard)]
+        return totals
+
+
+class Counter:
+    def __init__(self, name : str, description : str) -> None:
+        '''
+            This class implements a monotonically increasing counter.
+                :param name: str
+                    The name of the metric.
+                :param description: str
+                    The help text of the metric.
+        '''
+        self.name = name
+        self.description = description
+        self.shards = ThreadShards(1)
+
+    def inc(self, value : float = 1) -> None:
+        '''
+            This function increases the counter.
+                :param value: float, default = 1
+                    The value to add to the counter.
+        '''
+        self.shards.get()[0] += value
+
+    def render(self) -> list:
+        '''
+            This function returns the lines of the counter in the Prometheus text format.
+        '''
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self.shards.collect()[0]}"
+        ]
+
+
+class Histogram:
+    def __init__(self, name : str, description : str, buckets : tuple = DEFAULT_LATENCY_BUCKETS) -> None:
+        '''
+            This class implements a histogram with fixed buckets.
+                :param name: str
+                    The name of the metric.
+                :param description: str
+                    The help text of the metric.
+                :param buckets: tuple, default = DEFAULT_LATENCY_BUCKETS
+                    The sorted upper bounds of the buckets.
+        '''
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+
+        # Every shard keeps the bucket counts, the +Inf bucket count, the sum and the count.
+        self.shards = ThreadShards(len(self.buckets) + 3)
+
+    def observe(self, value : float) -> None:
+        '''
+            This function records a value in the histogram.
+                :param value: float
+                    The observed value.
+        '''
+        if value is None:
+            return
+        shard = self.shards.get()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def totals(self) -> list:
+        '''
+            This function returns the bucket counts, the +Inf bucket count, the sum and the count
+            summed over all threads, used to compute the quantiles of an interval.
+        '''
+        return self.shards.collect()
+
+    def quantile(self, quantile : float, totals : list = None) -> float:
+        '''
+            This function estimates a quantile from the buckets, interpolating linearly inside
+            the bucket like the Prometheus histogram_quantile function.
+                :param quantile: float
+                    The quantile between 0 and 1.
+                :param totals: list, default = None
+                    The totals to use, like the difference of two totals calls to get the quantile
+                    of an interval. If None the current totals are used.
+                :return: float
+                    The estimated quantile or None if no value was observed.
+        '''
+        if totals is None:
+            totals = self.totals()
+        if totals[-1] <= 0:
+            return None
+
+        # Finding the bucket holding the quantile.
+        rank = quantile * totals[-1]
+        cumulative = 0
+        for index, count in enumerate(totals[:len(self.buckets)]):
+            if count > 0 and cumulative + count >= rank:
+                lower_bound = self.buckets[index - 1] if index > 0 else 0.0
+                return lower_bound + (self.buckets[index] - lower_bound) * (rank - cumulative) / count
+            cumulative += count
+
+        # The quantile is in the +Inf bucket, the largest finite bound is returned.
+        return self.buckets[-1]
+
+    def render(self) -> list:
+        '''
+            This function returns the lines of the histogram in the Prometheus text format.
+        '''
+        totals = self.shards.collect()
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram"
+        ]
+
+        # The Prometheus buckets are cumulative.
+        cumulative = 0
+        for bucket, count in zip(self.buckets + ("+Inf",), totals[:-2]):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bucket}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {totals[-2]}")
+        lines.append(f"{self.name}_count {totals[-1]}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name : str, description : str, function : "function", metric_type : str = "gauge") -> None:
+        '''
+            This class implements a metric whose value is read from a function when collected.
+                :param name: str
+                    The name of the metric.
+                :param description: str
+                    The help text of the metric.
+                :param function: function
+                    The function returning the current value.
+                :param metric_type: str, default = 'gauge'
+                    The Prometheus type of the metric, 'counter' for values that only grow.
+        '''
+        self.name = name
+        self.description = description
+        self.function = function
+        self.metric_type = metric_type
+
+    def render(self) -> list:
+        '''
+            This function returns the lines of the gauge in the Prometheus text format.
+        '''
+        value = self.function()
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.metric_type}",
+            f"{self.name} {'NaN' if value is None else value}"
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        '''
+            This class keeps all metrics of the service and renders them for the /metrics endpoint.
+        '''
+        self.metrics = dict()
+        self.lock = threading.Lock()
+
+    def register(self, metric : "Metric") -> "Metric":
+        '''
+            This function adds a metric to the registry.
+                :param metric: Counter, Histogram or Gauge
+                    The metric to add.
+                :return: Counter, Histogram or Gauge
+                    The added metric.
+        '''
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name : str, description : str) -> Counter:
+        '''
+            This function creates and registers a counter.
+        '''
+        return self.register(Counter(name, description))
+
+    def histogram(self, name : str, description : str, buckets : tuple = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        '''
+            This function creates and registers a histogram.
+        '''
+        return self.register(Histogram(name, description, buckets))
+
+    def gauge(self, name : str, description : str, function : "function", metric_type : str = "gauge") -> Gauge:
+        '''
+            This function creates and registers a gauge.
+        '''
+        return self.register(Gauge(name, description, function, metric_type))
+
+    def render(self) -> str:
+        '''
+            This function returns all metrics in the Prometheus text exposition format.
+        '''
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,48 @@
+"""Add the created_at column and the indexes of the intents table
+
+Revision ID: 3f2a9c1d7e4b
+Revises: 
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e4b'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table might have been created by db.create_all() with or without the new column.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('intents'):
+        op.create_table(
+            'intents',
+            sa.Column('id', sa.String(length=64), nullable=False),
+            sa.Column('correlation_id', sa.String(length=64), nullable=True),
+            sa.Column('text', sa.Text(), nullable=True),
+            sa.Column('prediction', sa.String(length=32), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+    elif 'created_at' not in [column['name'] for column in inspector.get_columns('intents')]:
+        # The existing records get the time of the migration.
+        with op.batch_alter_table('intents') as batch_op:
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+
+    indexes = [index['name'] for index in inspector.get_indexes('intents')]
+    if 'ix_intents_correlation_id' not in indexes:
+        op.create_index('ix_intents_correlation_id', 'intents', ['correlation_id'], unique=False)
+    if 'ix_intents_created_at_id' not in indexes:
+        op.create_index('ix_intents_created_at_id', 'intents', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_intents_created_at_id', table_name='intents')
+    op.drop_index('ix_intents_correlation_id', table_name='intents')
+    with op.batch_alter_table('intents') as batch_op:
+        batch_op.drop_column('created_at')
@@ -67,4 +67,34 @@ class LstmModel(nn.Module):
         for i in range(len(self.fully_conected_layers)):
             out = self.fully_conected_layers[i](out)
 
-        return out
\ No newline at end of file
+        return out
+
+
+# Defining the model with the embedding lookup inside the graph.
+class FusedLstmModel(nn.Module):
+    def __init__(self, lstm_model : LstmModel, embedding_vectors : "torch.Tensor") -> None:
+        '''
+            This function wraps the text classification model with the static embedding table of the
+            word embedder, so the model takes the token indices instead of the embeddings.
+            The table is shared with the word embedder, it isn't copied.
+                :param lstm_model: LstmModel
+                    The text classification model.
+                :param embedding_vectors: torch.Tensor
+                    The embedding table of shape (words, vector_dimension).
+        '''
+        super(FusedLstmModel, self).__init__()
+        self.embedding = nn.Embedding.from_pretrained(embedding_vectors, freeze=True)
+        self.lstm_model = lstm_model
+        self.lstm_config = lstm_model.lstm_config
+
+    def forward(self, token_ids : "torch.Tensor"):
+        '''
+            This function looks up the embeddings of the tokens and forwards them through the network.
+                :param token_ids: torch.Tensor
+                    The indices of the tokens of shape (batch, sequence), -1 for the unknown tokens.
+        '''
+        # The unknown tokens get the zero vector, like in the word embedders.
+        known_tokens = (token_ids >= 0).unsqueeze(-1).to(self.embedding.weight.dtype)
+        embeds = self.embedding(token_ids.clamp(min=0)) * known_tokens
+
+        return self.lstm_model(embeds)
\ No newline at end of file
@@ -0,0 +1,45 @@
+# Importing all needed libraries.
+import argparse
+import torch
+
+# Importing the internal libraries.
+from nn_model import LstmModel
+
+
+def export_to_onnx(model : LstmModel, path : str, sequence_length : int = 30, opset_version : int = 13) -> None:
+    '''
+        This function exports the text classification model to the ONNX format.
+        The batch and the sequence axes of the input are dynamic, so one file serves every batch size.
+            :param model: LstmModel
+                The model to export.
+            :param path: str
+                The path of the ONNX file.
+            :param sequence_length: int, default = 30
+                The number of tokens of the example input used to trace the model.
+            :param opset_version: int, default = 13
+                The ONNX operator set version.
+    '''
+    model.eval()
+    example_embeds = torch.zeros(1, sequence_length, model.lstm_config["embedding_dim"])
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            example_embeds,
+            path,
+            input_names=["embeds"],
+            output_names=["logits"],
+            dynamic_axes={"embeds" : {0 : "batch", 1 : "sequence"}, "logits" : {0 : "batch"}},
+            opset_version=opset_version
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export of the PyTorch text classification model to ONNX.")
+    parser.add_argument("model_path", help="The path of the PyTorch model saved with torch.save.")
+    parser.add_argument("onnx_path", help="The path of the exported ONNX model.")
+    parser.add_argument("--sequence-length", type=int, default=30)
+    parser.add_argument("--opset-version", type=int, default=13)
+    args = parser.parse_args()
+
+    export_to_onnx(torch.load(args.model_path), args.onnx_path, args.sequence_length, args.opset_version)
+    print(f"exported {args.model_path} to {args.onnx_path}")
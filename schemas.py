@@ -1,5 +1,8 @@
 # Importing all needed modules.
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, validate, validates, post_load, ValidationError
+import datetime
+import base64
+import json
 
 
 # Defining the Intent Text Schema.
@@ -8,6 +11,119 @@ class IntentTextSchema(Schema):
     text = fields.Str(required=True)
     correlation_id = fields.Str(required=True)
 
+    # Defining the optional scheduling fields.
+    priority = fields.Str(required=False)
+    deadline = fields.Float(required=False, validate=validate.Range(min=0, min_inclusive=False))
+
+    # Defining the optional response fields, the compact profile returns only the prediction.
+    response_profile = fields.Str(required=False, validate=validate.OneOf(["full", "compact"]))
+    scores = fields.Bool(required=False)
+
+    @validates("priority")
+    def validate_priority(self, value : str) -> None:
+        '''
+            This function checks that the priority class is one of the configured ones.
+                :param value: str
+                    The priority class sent in the request body.
+        '''
+        priority_classes = self.context.get("priority_classes", {})
+        if value not in priority_classes:
+            raise ValidationError(f"Must be one of: {', '.join(priority_classes)}.")
+
+    def validate_json(self, json_data : dict):
+        '''
+            This function validates the requests body.
+                :param json_data: dict
+                    The request body.
+                :returns: dict, int
+                    Returns the validated json or the errors in the json
+                    and the status code.
+        '''
+        try:
+            result = self.load(json_data)
+        except ValidationError as err:
+            return err.messages, 400
+        return result, 200
+
+
+# Defining the keyset pagination cursor field.
+class KeysetCursor(fields.Field):
+    '''
+        This field encodes the (created_at, id) key of the last returned record as an opaque string.
+    '''
+    def _serialize(self, value, attr, obj, **kwargs):
+        if value is None:
+            return None
+        created_at, index = value
+        raw_cursor = json.dumps([created_at.isoformat(), index]).encode()
+        return base64.urlsafe_b64encode(raw_cursor).decode()
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            created_at, index = json.loads(base64.urlsafe_b64decode(value.encode()))
+            return datetime.datetime.fromisoformat(created_at), str(index)
+        except (ValueError, TypeError, AttributeError):
+            raise ValidationError("Not a valid cursor.")
+
+
+# Defining the Intent Query Schema.
+class IntentQuerySchema(Schema):
+    # Defining the optional filters.
+    correlation_id = fields.Str(required=False)
+    prediction = fields.Str(required=False)
+    since = fields.DateTime(required=False)
+    until = fields.DateTime(required=False)
+
+    # Defining the pagination fields.
+    limit = fields.Int(required=False)
+    cursor = KeysetCursor(required=False)
+
+    @validates("limit")
+    def validate_limit(self, value : int) -> None:
+        '''
+            This function checks that the page size is between 1 and the configured maximum.
+                :param value: int
+                    The page size sent in the request.
+        '''
+        max_page_size = self.context.get("max_page_size", 1000)
+        if not 1 <= value <= max_page_size:
+            raise ValidationError(f"Must be between 1 and {max_page_size}.")
+
+    @post_load
+    def convert_to_utc(self, data : dict, **kwargs) -> dict:
+        '''
+            This function converts the time range to naive UTC datetimes, as stored in the database.
+                :param data: dict
+                    The validated query parameters.
+        '''
+        for key in ["since", "until"]:
+            if key in data and data[key].tzinfo is not None:
+                data[key] = data[key].astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        data.setdefault("limit", self.context.get("default_page_size", 100))
+        return data
+
+    def validate_json(self, json_data : dict):
+        '''
+            This function validates the query parameters.
+                :param json_data: dict
+                    The query parameters of the request.
+                :returns: dict, int
+                    Returns the validated parameters or the errors in them
+                    and the status code.
+        '''
+        try:
+            result = self.load(json_data)
+        except ValidationError as err:
+            return err.messages, 400
+        return result, 200
+
+
+# Defining the Model Reload Schema.
+class ModelReloadSchema(Schema):
+    # Defining the optional paths, the paths of the active model version are used by default.
+    model_path = fields.Str(required=False)
+    index2intent_mapper_path = fields.Str(required=False)
+
     def validate_json(self, json_data : dict):
         '''
             This function validates the requests body.
@@ -21,4 +137,4 @@ class IntentTextSchema(Schema):
             result = self.load(json_data)
         except ValidationError as err:
             return err.messages, 400
-        return result, 200
\ No newline at end of file
+        return result, 200
@@ -0,0 +1,92 @@
+# Importing all needed libraries.
+from flask import Response, g
+
+# Defining the media types of the bodies, the first MessagePack type is used when the client doesn't name one.
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ["application/msgpack", "application/x-msgpack"]
+
+
+class ContentNegotiator:
+    def __init__(self, config : "BaseConfig") -> None:
+        '''
+            This class reads the request bodies and writes the response bodies in JSON or in MessagePack.
+            A request is read in the format of its Content-Type. The response is written in the format
+            preferred by the Accept header, by default in the format of the request.
+                :param config: BaseConfig
+                    The serialization configurations.
+        '''
+        self.config = config
+        self.mimetypes = [JSON_MIMETYPE]
+        self.msgpack = None
+        if config.msgpack:
+            import msgpack
+
+            self.msgpack = msgpack
+            self.mimetypes += MSGPACK_MIMETYPES
+
+    def is_msgpack(self, request : "Request") -> bool:
+        '''
+            This function checks if the body of the request is declared as MessagePack.
+        '''
+        return request.mimetype in MSGPACK_MIMETYPES
+
+    def is_supported(self, request : "Request") -> bool:
+        '''
+            This function checks if the body of the request can be read, MessagePack needs to be enabled.
+        '''
+        return not self.is_msgpack(request) or self.msgpack is not None
+
+    def load_body(self, request : "Request") -> dict:
+        '''
+            This function reads the body of the request once, the following calls return the same object.
+            The HMAC of the request is checked over the same raw bytes, whatever their format is.
+                :param request: Request
+                    The request.
+                :return: dict
+                    The body of the request or None if it can't be read.
+        '''
+        if "request_body" not in g:
+            g.request_body = self.parse_body(request)
+        return g.request_body
+
+    def parse_body(self, request : "Request") -> dict:
+        '''
+            This function converts the raw body of the request in the format of its Content-Type.
+        '''
+        if not self.is_msgpack(request):
+            return request.get_json(silent=True)
+        if self.msgpack is None:
+            return None
+        try:
+            return self.msgpack.unpackb(request.get_data(cache=True), raw=False)
+        except (ValueError, self.msgpack.UnpackException):
+            return None
+
+    def response_mimetype(self, request : "Request") -> str:
+        '''
+            This function picks the format of the response, the Accept header wins over the format of the request.
+        '''
+        request_mimetype = MSGPACK_MIMETYPES[0] if self.is_msgpack(request) and self.msgpack is not None else JSON_MIMETYPE
+        mimetypes = [request_mimetype] + [mimetype for mimetype in self.mimetypes if mimetype != request_mimetype]
+        return request.accept_mimetypes.best_match(mimetypes, default=request_mimetype)
+
+    def make_response(self, request : "Request", body : dict, status_code : int, headers : dict = None):
+        '''
+            This function writes the response body in the negotiated format. MessagePack packs the floats
+            in single precision, enough for the timings and the scores and half of their size.
+                :param request: Request
+                    The request.
+                :param body: dict
+                    The body of the response.
+                :param status_code: int
+                    The status code of the response.
+                :param headers: dict, default = None
+                    The additional headers of the response.
+                :return:
+                    The response in a form returned by the Flask views.
+        '''
+        mimetype = self.response_mimetype(request)
+        if mimetype == JSON_MIMETYPE:
+            return body, status_code, headers or dict()
+        raw_body = self.msgpack.packb(body, use_bin_type=True, use_single_float=True)
+        return Response(raw_body, status=status_code, headers=headers, mimetype=mimetype)
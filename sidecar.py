@@ -0,0 +1,229 @@
+# Importing all needed libraries.
+from requests.adapters import HTTPAdapter
+import threading
+import requests
+import random
+import json
+import time
+
+# Importing the internal libraries.
+from cerber import SecurityManager
+
+
+class SidecarClient:
+    def __init__(self, sidecar_config : "Service", config : "BaseConfig", service_information : dict,
+                 load_function : "function") -> None:
+        '''
+            This class keeps the service registered with the ambassador sidecar and periodically
+            reports the load of the service to it, so the ambassador can route by capacity.
+            The requests reuse one pooled HTTP session and are signed with HMAC. If the sidecar is
+            unreachable the heartbeats back off exponentially, and the service registers again when
+            the sidecar doesn't know it anymore, for example after a restart.
+                :param sidecar_config: Service
+                    The configurations of the sidecar: host, port, secret key and endpoints.
+                :param config: BaseConfig
+                    The heartbeat configurations.
+                :param service_information: dict
+                    The information sent with the registration.
+                :param load_function: function
+                    The function returning the load report sent with every heartbeat.
+        '''
+        self.config = config
+        self.service_information = service_information
+        self.load_function = load_function
+        self.security_manager = SecurityManager(sidecar_config.secret_key)
+
+        # Setting up the endpoints of the sidecar.
+        sidecar_url = f"http://{sidecar_config.host}:{sidecar_config.port}"
+        self.register_url = f"{sidecar_url}/{sidecar_config.register_endpoint}"
+        self.heartbeat_url = f"{sidecar_url}/{sidecar_config.heartbeat_endpoint}"
+        self.deregister_url = f"{sidecar_url}/{sidecar_config.deregister_endpoint}"
+
+        # Creating the session, its connection is kept alive between the heartbeats.
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        # Setting up the state and the statistics of the heartbeats.
+        self.registered = False
+        self.registration_number = 0
+        self.failed_registration_number = 0
+        self.heartbeat_number = 0
+        self.failed_heartbeat_number = 0
+        self.consecutive_failure_number = 0
+        self.last_heartbeat_time = None
+        self.last_load = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def post(self, url : str, body : dict) -> requests.Response:
+        '''
+            This function sends a signed request to the sidecar.
+            The HMAC is computed over the exact bytes that are sent.
+                :param url: str
+                    The url of the endpoint.
+                :param body: dict
+                    The body of the request.
+                :return: requests.Response
+                    The response of the sidecar.
+        '''
+        request_body = json.dumps(body).encode()
+        return self.session.post(
+            url,
+            data=request_body,
+            headers={"Token" : self.security_manager.encode_hmac_bytes(request_body), "Content-Type" : "application/json"},
+            timeout=self.config.timeout
+        )
+
+    def backoff(self) -> float:
+        '''
+            This function returns the delay before the next attempt after consecutive failures.
+            The delay doubles with every failure up to the maximal backoff, with a random jitter
+            so the replicas don't retry all at once after a sidecar restart.
+        '''
+        delay = min(self.config.initial_backoff * 2 ** (self.consecutive_failure_number - 1), self.config.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    def register(self) -> bool:
+        '''
+            This function registers the service with the sidecar.
+                :return: bool
+                    True if the sidecar accepted the registration.
+        '''
+        try:
+            response = self.post(self.register_url, self.service_information)
+        except requests.RequestException as exception:
+            print(f"sidecar: registration failed: {exception.__class__.__name__}")
+            self.failed_registration_number += 1
+            return False
+        if response.status_code != 200:
+            print(f"sidecar: registration rejected with status {response.status_code}")
+            self.failed_registration_number += 1
+            return False
+
+        self.registered = True
+        self.registration_number += 1
+        print(f"sidecar: registered with {self.register_url} (registration {self.registration_number})")
+        return True
+
+    def register_until_success(self) -> bool:
+        '''
+            This function blocks until the service is registered, backing off between the attempts.
+                :return: bool
+                    True if the service is registered, False if the client was stopped before.
+        '''
+        while not self.register():
+            self.consecutive_failure_number += 1
+            if self.stop_event.wait(self.backoff()):
+                return False
+        self.consecutive_failure_number = 0
+        return True
+
+    def deregister(self) -> bool:
+        '''
+            This function removes the service from the sidecar, so no new requests are routed to it.
+            It is called once when the service shuts down, after the heartbeats are stopped.
+                :return: bool
+                    True if the sidecar accepted the deregistration.
+        '''
+        try:
+            response = self.post(self.deregister_url, self.service_information)
+        except requests.RequestException as exception:
+            print(f"sidecar: deregistration failed: {exception.__class__.__name__}")
+            return False
+
+        self.registered = False
+        print(f"sidecar: deregistered from {self.deregister_url} with status {response.status_code}")
+        return response.status_code == 200
+
+    def send_heartbeat(self) -> bool:
+        '''
+            This function sends the load report of the service to the sidecar.
+            The sidecar answers 404 or 410 if it doesn't know the service, then the service
+            is marked as not registered and registers again.
+                :return: bool
+                    True if the sidecar answered, False if the heartbeat failed.
+        '''
+        load = self.load_function()
+        try:
+            response = self.post(self.heartbeat_url, {"general" : self.service_information["general"], "load" : load})
+        except requests.RequestException as exception:
+            # The sidecar may have restarted and lost the registration.
+            print(f"sidecar: heartbeat failed: {exception.__class__.__name__}")
+            self.registered = False
+            self.failed_heartbeat_number += 1
+            return False
+
+        if response.status_code in (404, 410):
+            print(f"sidecar: the sidecar doesn't know the service (status {response.status_code}), registering again")
+            self.registered = False
+            return True
+        if response.status_code != 200:
+            print(f"sidecar: heartbeat rejected with status {response.status_code}")
+            self.failed_heartbeat_number += 1
+            return False
+
+        self.heartbeat_number += 1
+        self.last_heartbeat_time = time.time()
+        self.last_load = load
+        return True
+
+    def start(self) -> None:
+        '''
+            This function starts sending the heartbeats in a background thread.
+        '''
+        self.thread = threading.Thread(target=self.run, name="intent-sidecar-heartbeat", daemon=True)
+        self.thread.start()
+        print(f"sidecar: heartbeats started every {self.config.interval}s to {self.heartbeat_url}")
+
+    def stop(self, timeout : float = None) -> None:
+        '''
+            This function stops the heartbeats and waits for the background thread.
+                :param timeout: float, default = None
+                    The maximal number of seconds to wait for the thread.
+        '''
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self) -> None:
+        '''
+            This function sends the heartbeats until the client is stopped, registering
+            the service again whenever the registration was lost. A failed step never ends the loop.
+        '''
+        while not self.stop_event.is_set():
+            # A failure outside the request, like in the load report, is logged and backed off
+            # like a failed heartbeat instead of ending the thread.
+            try:
+                if self.registered:
+                    success = self.send_heartbeat()
+                else:
+                    success = self.register()
+            except Exception as e:
+                print(f"sidecar: heartbeat failed with {e!r}")
+                self.failed_heartbeat_number += 1
+                success = False
+
+            # Registering right away if the sidecar forgot the service, otherwise waiting
+            # for the interval or backing off after a failure.
+            if success:
+                self.consecutive_failure_number = 0
+                delay = 0 if not self.registered else self.config.interval
+            else:
+                self.consecutive_failure_number += 1
+                delay = self.backoff()
+            self.stop_event.wait(delay)
+
+    def statistics(self) -> dict:
+        '''
+            This function returns the state of the registration and the heartbeats.
+        '''
+        return {
+            "registered" : self.registered,
+            "registrations" : self.registration_number,
+            "failed_registrations" : self.failed_registration_number,
+            "heartbeats" : self.heartbeat_number,
+            "failed_heartbeats" : self.failed_heartbeat_number,
+            "consecutive_failures" : self.consecutive_failure_number,
+            "seconds_since_last_heartbeat" : time.time() - self.last_heartbeat_time if self.last_heartbeat_time else None,
+            "last_load" : self.last_load
+        }
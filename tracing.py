@@ -0,0 +1,304 @@
+# Importing all needed libraries.
+from contextlib import contextmanager
+from queue import Queue, Full
+import threading
+import hashlib
+import random
+import re
+import json
+import time
+import sys
+
+# Defining the stages of the task recorded by the Task Executor, exported as child spans.
+TASK_STAGES = ("tokenize", "embed", "forward")
+
+# Defining the valid B3 ids, the trace id has 64 or 128 bits and the span id 64 bits, in lowercase hexadecimal.
+TRACE_ID_PATTERN = re.compile(r"[0-9a-f]{16}|[0-9a-f]{32}")
+SPAN_ID_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+
+def new_span_id() -> str:
+    '''
+        This function returns a random 64-bit span id as 16 hexadecimal characters.
+    '''
+    return "%016x" % random.getrandbits(64)
+
+
+class Trace:
+    def __init__(self, tracer : "Tracer", name : str, trace_id : str, parent_id : str = None, tags : dict = None) -> None:
+        '''
+            This class collects the spans of one request. The spans are kept as perf_counter
+            checkpoints and converted to the Zipkin v2 format only when the trace is finished.
+                :param tracer: Tracer
+                    The tracer exporting the trace.
+                :param name: str
+                    The name of the root span.
+                :param trace_id: str
+                    The 128-bit trace id as 32 hexadecimal characters.
+                :param parent_id: str, default = None
+                    The span id of the caller, if the request carries one.
+                :param tags: dict, default = None
+                    The tags of the root span.
+        '''
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = new_span_id()
+        self.tags = tags or dict()
+        self.spans = []
+
+        # Anchoring the perf_counter checkpoints to the wall clock.
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+
+    def tag(self, key : str, value) -> None:
+        '''
+            This function adds a tag to the root span.
+        '''
+        self.tags[key] = value
+
+    @contextmanager
+    def span(self, name : str):
+        '''
+            This function records a child span around a block, the yielded dictionary holds its tags.
+                :param name: str
+                    The name of the span.
+        '''
+        tags = dict()
+        start = time.perf_counter()
+        try:
+            yield tags
+        finally:
+            self.spans.append((name, start, time.perf_counter(), tags))
+
+    def add_span(self, name : str, start : float, end : float, tags : dict = None) -> None:
+        '''
+            This function records a child span measured elsewhere.
+                :param name: str
+                    The name of the span.
+                :param start: float
+                    The perf_counter checkpoint when the span started.
+                :param end: float
+                    The perf_counter checkpoint when the span ended.
+                :param tags: dict, default = None
+                    The tags of the span.
+        '''
+        if start is not None and end is not None:
+            self.spans.append((name, start, end, tags or dict()))
+
+    def add_task_spans(self, task : "Task", queue_start : float) -> None:
+        '''
+            This function records the queue wait and the processing stages of a served task.
+            The stages are shared by the whole batch, a coalesced task has only the wait.
+                :param task: Task
+                    The served task.
+                :param queue_start: float
+                    The perf_counter checkpoint when the task was admitted.
+        '''
+        stages = [stage for stage in TASK_STAGES if task.stage_time(stage) is not None]
+        queue_end = task.stages[stages[0]][0] if stages else time.perf_counter()
+        self.add_span("queue_wait", queue_start, queue_end, {"coalesced" : task.coalesced})
+        for stage in stages:
+            self.add_span(stage, task.stages[stage][0], task.stages[stage][1],
+                          {"model_version" : task.model_version} if stage == "forward" else None)
+
+    def convert_span(self, name : str, span_id : str, parent_id : str, start : float, end : float, tags : dict,
+                     kind : str = None) -> dict:
+        '''
+            This function converts a span to the Zipkin v2 JSON format.
+        '''
+        span = {
+            "traceId" : self.trace_id,
+            "id" : span_id,
+            "name" : name,
+            "timestamp" : int((self.wall_start + start - self.start) * 1e6),
+            "duration" : max(int((end - start) * 1e6), 1),
+            "localEndpoint" : {"serviceName" : self.tracer.service_name},
+            "tags" : {key : str(value) for key, value in tags.items() if value is not None}
+        }
+        if parent_id is not None:
+            span["parentId"] = parent_id
+        if kind is not None:
+            span["kind"] = kind
+        return span
+
+    def finish(self) -> None:
+        '''
+            This function ends the root span and exports the trace.
+        '''
+        end = time.perf_counter()
+        spans = [self.convert_span(self.name, self.span_id, self.parent_id, self.start, end, self.tags, kind="SERVER")]
+        for name, start, span_end, tags in self.spans:
+            spans.append(self.convert_span(name, new_span_id(), self.span_id, start, span_end, tags))
+        self.tracer.export(spans)
+
+
+class NoopTrace:
+    '''
+        This class replaces the trace of the requests that aren't sampled, all its functions do nothing.
+    '''
+    trace_id = None
+
+    def tag(self, key : str, value) -> None:
+        pass
+
+    @contextmanager
+    def span(self, name : str):
+        yield dict()
+
+    def add_span(self, name : str, start : float, end : float, tags : dict = None) -> None:
+        pass
+
+    def add_task_spans(self, task : "Task", queue_start : float) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+NOOP_TRACE = NoopTrace()
+
+
+class Tracer:
+    def __init__(self, config : "BaseConfig", service_name : str) -> None:
+        '''
+            This class samples the requests and exports their spans as Zipkin v2 JSON, one span
+            per line, to a file or to stdout. The spans are written by a background thread, a full
+            queue drops the trace instead of blocking the request.
+            The trace id comes from the B3 headers of the caller if present, otherwise it is derived
+            from the correlation id, so the services of the chatbot pipeline that do the same put
+            their spans of the same conversation turn in one trace. The sampling decision depends
+            only on the trace id, so they also sample the same requests.
+                :param config: BaseConfig
+                    The tracing configurations.
+                :param service_name: str
+                    The name of the service in the spans.
+        '''
+        if config.exporter not in ["file", "stdout"]:
+            raise Exception(f"{config.exporter} is not registered as a valid tracing exporter!")
+        self.config = config
+        self.service_name = service_name
+        self.sample_rate = config.sample_rate
+        self.queue = Queue(maxsize=config.queue_size)
+
+        # Setting up the statistics of the tracer.
+        self.statistics_lock = threading.Lock()
+        self.traced_request_number = 0
+        self.exported_span_number = 0
+        self.dropped_trace_number = 0
+        self.thread = None
+
+    def trace_id(self, headers : "Headers", correlation_id : str = None) -> str:
+        '''
+            This function returns the trace id of a request. The trace id of the caller is used
+            only if it has 16 or 32 lowercase hexadecimal characters.
+                :param headers: Headers
+                    The headers of the request.
+                :param correlation_id: str, default = None
+                    The correlation id of the request.
+                :return: str
+                    The 128-bit trace id as 32 hexadecimal characters.
+        '''
+        # Ignoring a malformed trace id of the caller, it is read before the request is authenticated.
+        trace_id = headers.get("X-B3-TraceId")
+        if trace_id and TRACE_ID_PATTERN.fullmatch(trace_id):
+            return trace_id.rjust(32, "0")
+        if correlation_id:
+            return hashlib.sha256(str(correlation_id).encode()).hexdigest()[:32]
+        return "%032x" % random.getrandbits(128)
+
+    def is_sampled(self, trace_id : str, headers : "Headers") -> bool:
+        '''
+            This function decides if a request is traced. The sampling flag of the caller wins,
+            otherwise the lower 64 bits of the trace id are compared with the sample rate.
+        '''
+        sampled = headers.get("X-B3-Sampled")
+        if sampled is not None:
+            return sampled == "1"
+        return int(trace_id[-16:], 16) / 2 ** 64 < self.sample_rate
+
+    def start_trace(self, name : str, headers : "Headers", correlation_id : str = None) -> "Trace":
+        '''
+            This function starts the trace of a request.
+                :param name: str
+                    The name of the root span.
+                :param headers: Headers
+                    The headers of the request.
+                :param correlation_id: str, default = None
+                    The correlation id of the request.
+                :return: Trace
+                    The trace of the request or NOOP_TRACE if it isn't sampled.
+        '''
+        trace_id = self.trace_id(headers, correlation_id)
+        if not self.is_sampled(trace_id, headers):
+            return NOOP_TRACE
+        with self.statistics_lock:
+            self.traced_request_number += 1
+        parent_id = headers.get("X-B3-SpanId")
+        if parent_id is not None and not SPAN_ID_PATTERN.fullmatch(parent_id):
+            parent_id = None
+        return Trace(self, name, trace_id, parent_id, {"correlation_id" : correlation_id})
+
+    def export(self, spans : list) -> None:
+        '''
+            This function queues the spans of a finished trace for writing, it never blocks.
+                :param spans: list
+                    The spans in the Zipkin v2 format.
+        '''
+        try:
+            self.queue.put_nowait(spans)
+        except Full:
+            with self.statistics_lock:
+                self.dropped_trace_number += 1
+
+    def start(self) -> None:
+        '''
+            This function starts the writer of the spans in a background thread.
+        '''
+        self.thread = threading.Thread(target=self.run, name="intent-tracing", daemon=True)
+        self.thread.start()
+        print(f"tracing started: sample_rate={self.sample_rate}, exporter={self.config.exporter}")
+
+    def close(self, timeout : float = None) -> None:
+        '''
+            This function writes the queued spans and stops the writer.
+                :param timeout: float, default = None
+                    The maximal number of seconds to wait for the writer.
+        '''
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def run(self) -> None:
+        '''
+            This function writes the spans as JSON lines until the tracer is closed.
+        '''
+        output_file = sys.stdout if self.config.exporter == "stdout" else open(self.config.output_path, "a")
+        try:
+            while True:
+                spans = self.queue.get()
+                if spans is None:
+                    break
+                output_file.write("".join(json.dumps(span) + "\n" for span in spans))
+                self.exported_span_number += len(spans)
+
+                # Flushing once the queue is empty, so a burst of traces is written at once.
+                if self.queue.empty():
+                    output_file.flush()
+        finally:
+            output_file.flush()
+            if output_file is not sys.stdout:
+                output_file.close()
+
+    def statistics(self) -> dict:
+        '''
+            This function returns the statistics of the tracer.
+        '''
+        return {
+            "sample_rate" : self.sample_rate,
+            "traced_requests" : self.traced_request_number,
+            "exported_spans" : self.exported_span_number,
+            "dropped_traces" : self.dropped_trace_number,
+            "pending_traces" : self.queue.qsize()
+        }
@@ -3,3 +3,4 @@ from .glove import GloVeEmbedder
 from .fasttext import FastTextEmbedder
 from .word2vec import Word2VecEmbedder
 from .factory import WordEmbedderFactory
+from .tokenizers import Tokenizer
@@ -23,10 +23,86 @@ class BaseWordEmbedder:
         self.max_length = max_length
         self.pad_token = pad_token
 
+    def normalize_length(self, tokens : list) -> list:
+        '''
+            This function pads or prunes the tokens to the maximal length.
+                :param tokens: list
+                    The tokens of the document.
+                :return: list
+                    The tokens of exactly max_length length.
+        '''
+        if len(tokens) > self.max_length:
+            return tokens[:self.max_length]
+        else:
+            return tokens + [self.pad_token] * (self.max_length - len(tokens))
+
+    def tokenize(self, document : str) -> list:
+        '''
+            This function converts a document to the list of tokens padded or pruned to max_length.
+                :param document: str
+                    The document to be tokenized.
+                :return: list
+                    The tokens of the document.
+        '''
+        return self.normalize_length(self.tokenize_fun(document))
+
+    def tokenize_batch(self, documents : list) -> list:
+        '''
+            This function converts a list of documents to the lists of tokens padded or pruned to max_length.
+                :param documents: list
+                    The documents to be tokenized.
+                :return: list
+                    The tokens of every document.
+        '''
+        if hasattr(self.tokenize_fun, "tokenize_batch"):
+            return [self.normalize_length(tokens) for tokens in self.tokenize_fun.tokenize_batch(documents)]
+        return [self.tokenize(document) for document in documents]
+
+    def embed_tokens(self, tokens : list) -> "torch.Tensor":
+        '''
+            This function converts a list of tokens to a torch tensor of grade 2 (matrix).
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+        '''
+        pass
+
+    def embed_tokens_into(self, tokens : list, out : "torch.Tensor", indices : "torch.Tensor" = None) -> None:
+        '''
+            This function writes the embeddings of a list of tokens into a preallocated tensor.
+            Embedders with a static table override it to avoid the intermediate tensor.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :param out: torch.Tensor
+                    The tensor of shape (max_length, vector_dimension) to write into.
+                :param indices: torch.Tensor, default = None
+                    The preallocated int64 tensor of shape (max_length,) for the token indices, used by the embedders with a static table.
+        '''
+        out.copy_(self.embed_tokens(tokens))
+
+    def embedding_vectors(self) -> "torch.Tensor":
+        '''
+            This function returns the static embedding table of the embedder, used to move the lookup
+            of the embeddings into the model. Embedders computing the vectors from subwords or from the
+            context don't have such a table.
+                :return: torch.Tensor
+                    The embedding table of shape (words, vector_dimension) or None.
+        '''
+        return None
+
+    def token_ids(self, tokens : list) -> list:
+        '''
+            This function converts a list of tokens to their rows in the embedding table.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :return: list
+                    The indices of the tokens, -1 for the tokens missing from the table.
+        '''
+        pass
+
     def get_vectors(self, document : str) -> "torch.Tensor":
         '''
             This function converts a document to a torch tensor of grade 2 (matrix).
                 :param document: str
                     The document to be embedded.
         '''
-        pass
\ No newline at end of file
+        return self.embed_tokens(self.tokenize(document))
@@ -51,23 +51,14 @@ class ELMoEmbedder(BaseWordEmbedder):
         # Setting the ELMo embedding to eval.
         self.elmo_embedding.eval()
 
-    def get_vectors(self, document : str) -> "torch.Tensor":
+    def embed_tokens(self, tokens : list) -> "torch.Tensor":
         '''
-            This function converts a document to a torch tensor of grade 2 (matrix).
-                :param document: str
-                    The document to be embedded.
+            This function converts a list of tokens to a torch tensor of grade 2 (matrix).
+                :param tokens: list
+                    The tokens returned by the tokenize function.
                 :return: torch.Tensor
                     The tensor representing the word embeddings for the document.
         '''
-        # Getting the tokens.
-        tokens = self.tokenize_fun(document)
-
-        # Normalizing the length of the tokens by padding or pruning.
-        if len(tokens) > self.max_length:
-            tokens = tokens[:self.max_length]
-        else:
-            tokens = tokens + [self.pad_token] * (self.max_length - len(tokens))
-
         # Converting tokens to allennlp specific Token class.
         tokens = [Token(token) for token in tokens]
 
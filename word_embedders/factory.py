@@ -1,7 +1,5 @@
 # Importing all needed modules.
-from nltk.tokenize import word_tokenize, wordpunct_tokenize, casual_tokenize
-from nltk.tokenize.nist import NISTTokenizer
-from torchtext.data.utils import get_tokenizer
+from .tokenizers import Tokenizer
 from .word2vec import Word2VecEmbedder
 from .elmo import ELMoEmbedder
 from .glove import GloVeEmbedder
@@ -17,9 +15,9 @@ class WordEmbedderFactory:
         '''
         pass
 
-    def create_tokenizer(self, tokenizer : str) -> "function":
+    def create_tokenizer(self, tokenizer : str, cache_size : int = 65536, lowercase : bool = False) -> "Tokenizer":
         '''
-            This function returns a tokenization function by it's name.
+            This function returns a cached fast tokenization function by it's name.
             Now are supported the following list of tokenization functions:
                 - torch.basic_english
                 - nltk.word_tokenizer
@@ -29,21 +27,14 @@ class WordEmbedderFactory:
             If the tokenizer is not in this list then an Exception is raised.
                 :param tokenizer: str
                     The name of the tokenization function to be created.
-                :return: function
+                :param cache_size: int, default = 65536
+                    The maximal number of documents kept in the tokenization cache.
+                :param lowercase: bool, default = False
+                    If True the documents are lowercased before tokenization.
+                :return: Tokenizer
                     The tokenization function. callable.
         '''
-        if tokenizer == "torch.basic_english":
-            return get_tokenizer("basic_english")
-        elif tokenizer == "nltk.word_tokenizer":
-            return word_tokenize
-        elif tokenizer == "nltk.casual_tokenizer":
-            return casual_tokenize
-        elif tokenizer == "nltk.wordpunct_tokenizer":
-            return wordpunct_tokenize
-        elif tokenizer == "nltk.nist_tokenizer":
-            return NISTTokenizer().tokenize
-        else:
-            raise Exception(f"{tokenizer} is not registered as a valid tokenizer!")
+        return Tokenizer(tokenizer, cache_size, lowercase)
 
     def get_word_embedding(self, word_embed_config : dict) -> "WordEmbedder":
         '''
@@ -58,8 +49,12 @@ class WordEmbedderFactory:
         word_embed_method = self.config["method"]
         del self.config["method"]
 
-        # Creation of the tokenization function.
-        self.config["tokenize_fun"] = self.create_tokenizer(self.config["tokenize_fun"])
+        # Creation of the tokenization function, GloVe vocabulary is lowercased.
+        self.config["tokenize_fun"] = self.create_tokenizer(
+            self.config["tokenize_fun"],
+            self.config.pop("tokenizer_cache_size", 65536),
+            lowercase = word_embed_method == "glove"
+        )
 
         # Creation of the word embedder.
         if word_embed_method == "word2vec":
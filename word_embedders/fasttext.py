@@ -54,31 +54,37 @@ class FastTextEmbedder(BaseWordEmbedder):
         elif self.vector_dimension != 300:
             self.ft = fasttext.util.reduce_model(self.ft, self.vector_dimension)
 
-    def get_vectors(self, document : str) -> "torch.Tensor":
+    def embed_tokens(self, tokens : list) -> "torch.Tensor":
         '''
-            This function converts a document to a torch tensor of grade 2 (matrix).
-                :param document: str
-                    The document to be embedded.
+            This function converts a list of tokens to a torch tensor of grade 2 (matrix).
+                :param tokens: list
+                    The tokens returned by the tokenize function.
                 :return: torch.Tensor
                     The tensor representing the word embeddings for the document.
         '''
-        # Getting the tokens.
-        tokens = self.tokenize_fun(document)
+        # Filling the embedding matrix, the out of vocabulary tokens keep the zero vector.
+        # The vocabulary is checked by the word id, ft.words would build the list of all words.
+        embeds = np.zeros((len(tokens), self.vector_dimension), dtype=np.float32)
+        for position, token in enumerate(tokens):
+            if self.ft.get_word_id(token) != -1:
+                embeds[position] = self.ft.get_word_vector(token)
 
-        # Normalizing the length of the tokens by padding or pruning.
-        if len(tokens) > self.max_length:
-            tokens = tokens[:self.max_length]
-        else:
-            tokens = tokens + [self.pad_token] * (self.max_length - len(tokens))
+        # Converting the embeddings to Pytorch tensor and returning it.
+        return torch.from_numpy(embeds)
 
-        # Creating and filling the embedding list.
-        embeds = []
-        for token in tokens:
-            if token in self.ft.words:
-                embeds.append(self.ft.get_word_vector(token))
+    def embed_tokens_into(self, tokens : list, out : "torch.Tensor", indices : "torch.Tensor" = None) -> None:
+        '''
+            This function writes the FastText embeddings of a list of tokens into a preallocated tensor.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :param out: torch.Tensor
+                    The tensor of shape (max_length, vector_dimension) to write into.
+                :param indices: torch.Tensor, default = None
+                    The preallocated int64 tensor of shape (max_length,) for the token indices, not used by FastText.
+        '''
+        out_array = out.numpy()
+        for position, token in enumerate(tokens):
+            if self.ft.get_word_id(token) != -1:
+                out_array[position] = self.ft.get_word_vector(token)
             else:
-                embeds.append(np.zeros(self.vector_dimension, dtype=np.float32))
-
-        # Converting the embeddings to Pytorch tensor and returning it.
-        embeds = np.stack(embeds)
-        return torch.from_numpy(embeds)
\ No newline at end of file
+                out_array[position] = 0
\ No newline at end of file
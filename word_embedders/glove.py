@@ -1,5 +1,6 @@
 # Importing all needed modules.
 from torchtext.vocab import GloVe
+import torch
 from .base import BaseWordEmbedder
 from .errors import *
 
@@ -53,21 +54,76 @@ class GloVeEmbedder(BaseWordEmbedder):
         else:
             raise NotAValidVersion("No version provided")
 
-    def get_vectors(self, document : str) -> "torch.Tensor":
+    def tokenize(self, document : str) -> list:
         '''
-            This function converts a document to a torch tensor of grade 2 (matrix).
+            This function converts a lowercased document to the list of tokens padded or pruned to max_length.
                 :param document: str
-                    The document to be embedded.
+                    The document to be tokenized.
+                :return: list
+                    The tokens of the document.
+        '''
+        # The tokenizers created by the factory already lowercase and cache the documents.
+        if getattr(self.tokenize_fun, "lowercase", False):
+            return self.normalize_length(self.tokenize_fun(document))
+        return self.normalize_length(self.tokenize_fun(document.lower()))
+
+    def tokenize_batch(self, documents : list) -> list:
+        '''
+            This function converts a list of lowercased documents to the lists of tokens padded or pruned to max_length.
+                :param documents: list
+                    The documents to be tokenized.
+                :return: list
+                    The tokens of every document.
+        '''
+        if getattr(self.tokenize_fun, "lowercase", False):
+            return super(GloVeEmbedder, self).tokenize_batch(documents)
+        return [self.tokenize(document) for document in documents]
+
+    def embed_tokens(self, tokens : list) -> "torch.Tensor":
+        '''
+            This function converts a list of tokens to a torch tensor of grade 2 (matrix).
+                :param tokens: list
+                    The tokens returned by the tokenize function.
                 :return: torch.Tensor
                     The tensor representing the word embeddings for the document.
         '''
-        # Getting the tokens.
-        tokens = self.tokenize_fun(document.lower())
+        return self.glove.get_vecs_by_tokens(tokens)
 
-        # Normalizing the length of the tokens by padding or pruning.
-        if len(tokens) > self.max_length:
-            tokens = tokens[:self.max_length]
-        else:
-            tokens = tokens + [self.pad_token] * (self.max_length - len(tokens))
+    def embed_tokens_into(self, tokens : list, out : "torch.Tensor", indices : "torch.Tensor" = None) -> None:
+        '''
+            This function writes the GloVe embeddings of a list of tokens into a preallocated tensor.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :param out: torch.Tensor
+                    The tensor of shape (max_length, vector_dimension) to write into.
+                :param indices: torch.Tensor, default = None
+                    The preallocated int64 tensor of shape (max_length,) for the token indices, if None a new one is created.
+        '''
+        # Filling the token indices in place, -1 for the tokens missing from GloVe.
+        if indices is None:
+            indices = torch.empty(len(tokens), dtype=torch.long)
+        indices.numpy()[:] = self.token_ids(tokens)
+        unknown_tokens = indices < 0
+        torch.index_select(self.glove.vectors, 0, indices.clamp_(min=0), out=out)
+
+        # The tokens missing from GloVe get the zero vector.
+        out[unknown_tokens] = 0
+
+    def embedding_vectors(self) -> "torch.Tensor":
+        '''
+            This function returns the GloVe embedding table.
+                :return: torch.Tensor
+                    The embedding table of shape (words, vector_dimension).
+        '''
+        return self.glove.vectors
 
-        return self.glove.get_vecs_by_tokens(tokens)
\ No newline at end of file
+    def token_ids(self, tokens : list) -> list:
+        '''
+            This function converts a list of tokens to their rows in the GloVe embedding table.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :return: list
+                    The indices of the tokens, -1 for the tokens missing from GloVe.
+        '''
+        stoi = self.glove.stoi
+        return [stoi.get(token, -1) for token in tokens]
\ No newline at end of file
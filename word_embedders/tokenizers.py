@@ -0,0 +1,157 @@
+# Importing all needed modules.
+from nltk.tokenize.casual import TweetTokenizer
+import functools
+import re
+
+# Defining the compiled pattern of nltk.wordpunct_tokenize.
+WORDPUNCT_REGEX = re.compile(r"\w+|[^\w\s]+", re.UNICODE | re.MULTILINE | re.DOTALL)
+
+# Defining the single pass translation of the torchtext basic_english punctuation rules.
+BASIC_ENGLISH_TRANSLATION = str.maketrans({
+    "," : " , ",
+    "(" : " ( ",
+    ")" : " ) ",
+    "!" : " ! ",
+    "?" : " ? ",
+    ";" : " ",
+    ":" : " "
+})
+
+
+def basic_english_tokenize(document : str) -> list:
+    '''
+        This function reproduces torchtext get_tokenizer('basic_english') with str methods
+        instead of twelve regular expression substitutions.
+            :param document: str
+                The document to be tokenized.
+            :return: list
+                The tokens of the document.
+    '''
+    # The replacements before '<br />' are applied in the torchtext order, since removing
+    # a double quote can create a '<br />'.
+    document = document.lower().replace("'", " '  ").replace('"', "").replace(".", " . ").replace("<br />", " ")
+    return document.translate(BASIC_ENGLISH_TRANSLATION).split()
+
+
+def wordpunct_tokenize(document : str) -> list:
+    '''
+        This function reproduces nltk.wordpunct_tokenize with the precompiled pattern.
+            :param document: str
+                The document to be tokenized.
+            :return: list
+                The tokens of the document.
+    '''
+    return WORDPUNCT_REGEX.findall(document)
+
+
+def create_word_tokenize() -> "function":
+    '''
+        This function reproduces nltk.word_tokenize with the Punkt sentence tokenizer and the
+        Treebank word tokenizer resolved once instead of on every call.
+            :return: function
+                The tokenization function.
+    '''
+    from nltk.tokenize import _treebank_word_tokenizer
+    try:
+        from nltk.tokenize import _get_punkt_tokenizer
+        punkt_tokenizer = _get_punkt_tokenizer("english")
+    except ImportError:
+        from nltk import data
+        punkt_tokenizer = data.load("tokenizers/punkt/english.pickle")
+
+    def word_tokenize(document : str) -> list:
+        return [
+            token for sentence in punkt_tokenizer.tokenize(document)
+            for token in _treebank_word_tokenizer.tokenize(sentence)
+        ]
+    return word_tokenize
+
+
+def create_fast_tokenize_fun(tokenizer : str) -> "function":
+    '''
+        This function returns the fast tokenization function equivalent to the registered one.
+            :param tokenizer: str
+                The name of the tokenization function.
+            :return: function
+                The tokenization function.
+    '''
+    if tokenizer == "torch.basic_english":
+        return basic_english_tokenize
+    elif tokenizer == "nltk.word_tokenizer":
+        return create_word_tokenize()
+    elif tokenizer == "nltk.casual_tokenizer":
+        # casual_tokenize creates a new TweetTokenizer on every call.
+        return TweetTokenizer(preserve_case=True, reduce_len=False, strip_handles=False).tokenize
+    elif tokenizer == "nltk.wordpunct_tokenizer":
+        return wordpunct_tokenize
+    elif tokenizer == "nltk.nist_tokenizer":
+        # The NIST tokenizer loads the perluniprops corpus when imported.
+        from nltk.tokenize.nist import NISTTokenizer
+        return NISTTokenizer().tokenize
+    else:
+        raise Exception(f"{tokenizer} is not registered as a valid tokenizer!")
+
+
+class Tokenizer:
+    def __init__(self, name : str, cache_size : int = 65536, lowercase : bool = False) -> None:
+        '''
+            This class wraps the fast tokenization function with a cache of the latest documents.
+            The chatbot traffic repeats a small set of utterances, so most documents are tokenized once.
+                :param name: str
+                    The name of the tokenization function.
+                :param cache_size: int, default = 65536
+                    The maximal number of documents kept in the cache, 0 disables the cache.
+                :param lowercase: bool, default = False
+                    If True the document is lowercased before tokenization.
+        '''
+        self.name = name
+        self.lowercase = lowercase
+        self.tokenize_fun = create_fast_tokenize_fun(name)
+
+        # The cached function returns tuples, so the cached tokens can't be modified by the callers.
+        if cache_size > 0:
+            self.cached_tokenize = functools.lru_cache(maxsize=cache_size)(self.tokenize_document)
+        else:
+            self.cached_tokenize = self.tokenize_document
+
+    def tokenize_document(self, document : str) -> tuple:
+        '''
+            This function tokenizes a document without the cache.
+                :param document: str
+                    The document to be tokenized.
+                :return: tuple
+                    The tokens of the document.
+        '''
+        if self.lowercase:
+            document = document.lower()
+        return tuple(self.tokenize_fun(document))
+
+    def __call__(self, document : str) -> list:
+        '''
+            This function tokenizes a document.
+                :param document: str
+                    The document to be tokenized.
+                :return: list
+                    The tokens of the document.
+        '''
+        return list(self.cached_tokenize(document))
+
+    def tokenize_batch(self, documents : list) -> list:
+        '''
+            This function tokenizes a list of documents, every distinct document is tokenized once.
+                :param documents: list
+                    The documents to be tokenized.
+                :return: list
+                    The list of tokens of every document.
+        '''
+        tokens = {document : self.cached_tokenize(document) for document in set(documents)}
+        return [list(tokens[document]) for document in documents]
+
+    def cache_statistics(self) -> dict:
+        '''
+            This function returns the hits, misses and size of the tokenization cache.
+        '''
+        if not hasattr(self.cached_tokenize, "cache_info"):
+            return {"hits" : 0, "misses" : 0, "size" : 0}
+        cache_info = self.cached_tokenize.cache_info()
+        return {"hits" : cache_info.hits, "misses" : cache_info.misses, "size" : cache_info.currsize}
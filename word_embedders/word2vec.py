@@ -49,31 +49,61 @@ class Word2VecEmbedder(BaseWordEmbedder):
         self.model_version = self.model_mapper[self.version]
         self.w2v = api.load(self.model_version)
 
-    def get_vectors(self, document : str) -> "torch.Tensor":
+        # Creating the tensor view of the Word2Vec vectors, sharing their memory.
+        self.vectors = torch.from_numpy(self.w2v.vectors)
+
+    def embed_tokens(self, tokens : list) -> "torch.Tensor":
         '''
-            This function converts a document to a torch tensor of grade 2 (matrix).
-                :param document: str
-                    The document to be embedded.
+            This function converts a list of tokens to a torch tensor of grade 2 (matrix).
+                :param tokens: list
+                    The tokens returned by the tokenize function.
                 :return: torch.Tensor
                     The tensor representing the word embeddings for the document.
         '''
-        # Getting the tokens.
-        tokens = self.tokenize_fun(document)
-
-        # Normalizing the length of the tokens by padding or pruning.
-        if len(tokens) > self.max_length:
-            tokens = tokens[:self.max_length]
-        else:
-            tokens = tokens + [self.pad_token] * (self.max_length - len(tokens))
-
-        # Creating and filling the embedding list.
-        embeds = []
-        for token in tokens:
+        # Filling the embedding matrix, the tokens missing from Word2Vec keep the zero vector.
+        embeds = np.zeros((len(tokens), self.vector_dimension), dtype=np.float32)
+        for position, token in enumerate(tokens):
             if self.w2v.has_index_for(token):
-                embeds.append(self.w2v.get_vector(token))
-            else:
-                embeds.append(np.zeros(self.vector_dimension, dtype=np.float32))
+                embeds[position] = self.w2v.get_vector(token)
 
         # Converting the embeddings to Pytorch tensor and returning it.
-        embeds = np.stack(embeds)
         return torch.from_numpy(embeds)
+
+    def embed_tokens_into(self, tokens : list, out : "torch.Tensor", indices : "torch.Tensor" = None) -> None:
+        '''
+            This function writes the Word2Vec embeddings of a list of tokens into a preallocated tensor.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :param out: torch.Tensor
+                    The tensor of shape (max_length, vector_dimension) to write into.
+                :param indices: torch.Tensor, default = None
+                    The preallocated int64 tensor of shape (max_length,) for the token indices, if None a new one is created.
+        '''
+        # Filling the token indices in place, -1 for the tokens missing from Word2Vec.
+        if indices is None:
+            indices = torch.empty(len(tokens), dtype=torch.long)
+        indices.numpy()[:] = self.token_ids(tokens)
+        unknown_tokens = indices < 0
+        torch.index_select(self.vectors, 0, indices.clamp_(min=0), out=out)
+
+        # The tokens missing from Word2Vec get the zero vector.
+        out[unknown_tokens] = 0
+
+    def embedding_vectors(self) -> "torch.Tensor":
+        '''
+            This function returns the Word2Vec embedding table, sharing the memory of the gensim vectors.
+                :return: torch.Tensor
+                    The embedding table of shape (words, vector_dimension).
+        '''
+        return self.vectors
+
+    def token_ids(self, tokens : list) -> list:
+        '''
+            This function converts a list of tokens to their rows in the Word2Vec embedding table.
+                :param tokens: list
+                    The tokens returned by the tokenize function.
+                :return: list
+                    The indices of the tokens, -1 for the tokens missing from Word2Vec.
+        '''
+        key_to_index = self.w2v.key_to_index
+        return [key_to_index.get(token, -1) for token in tokens]